@@ -5,7 +5,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
 django.setup()
 
-from library.models import Book, Borrow
+from library.models import Book, Borrow, Reader
 
 def fix_data():
     book_title = "Python Crash Course"
@@ -36,8 +36,14 @@ def fix_data():
     print(f"已恢复库存 +{count}。当前最新库存: {book.quantity}")
 
     # 2. 删除借阅记录
+    reader_ids = list(borrows_to_delete.values_list('reader_id', flat=True))
     borrows_to_delete.delete()
     print("已成功清除相关借阅记录。")
+
+    # 3. 重新计算受影响读者的借阅统计
+    for reader in Reader.objects.filter(user_id__in=reader_ids):
+        reader.refresh_loan_stats()
+    print(f"已刷新 {len(set(reader_ids))} 位读者的借阅统计。")
     print("--- 处理完成 ---")
 
 if __name__ == '__main__':
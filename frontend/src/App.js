@@ -11,6 +11,21 @@ const API_BASE_URL = process.env.NODE_ENV === 'development'
   ? 'http://127.0.0.1:8000' 
   : '';
 
+// 封面图片：优先使用后台生成的多尺寸缩略图（WebP，浏览器不支持时用 JPEG），尚未生成时回退到原图
+const BookCover = ({ book, sizes, fallback, ...props }) => {
+  const variants = Object.values(book.cover_variants || {});
+  if (variants.length === 0) {
+    return <img src={book.cover_image || fallback} alt={book.title} {...props} />;
+  }
+  const srcSet = format => variants.map(v => `${v[format]} ${v.width}w`).join(', ');
+  return (
+    <picture>
+      <source type="image/webp" srcSet={srcSet('webp')} sizes={sizes} />
+      <img src={variants[0].jpeg} srcSet={srcSet('jpeg')} sizes={sizes} alt={book.title} {...props} />
+    </picture>
+  );
+};
+
 // 配置 axios 拦截器，自动在请求头中添加 Token
 axios.interceptors.request.use(
   config => {
@@ -275,6 +290,22 @@ function App() {
       });
   };
 
+  // 处理预约操作：无库存时排队，已为自己保留的书直接借出
+  const handleReserve = (bookId, bookTitle) => {
+    axios.post(`${API_BASE_URL}/api/books/${bookId}/reserve/`)
+      .then(response => {
+        toast.success(response.data.message);
+      })
+      .catch(err => {
+        if (err.response?.data?.reservation_status === 'READY') {
+          handleBorrow(bookId, bookTitle);
+          return;
+        }
+        console.error("Reserve error:", err);
+        toast.error("预约失败：" + (err.response?.data?.message || "未知错误"));
+      });
+  };
+
   // 处理归还操作
   const handleReturn = (bookId, bookTitle) => {
     axios.post(`${API_BASE_URL}/api/books/${bookId}/return_book/`)
@@ -355,8 +386,19 @@ function App() {
   };
 
   const navigateToDetail = (book) => {
-    setSelectedBook(book);
+    // 列表接口只返回卡片所需的精简字段，详情页需要单独获取完整信息
+    setLoading(true);
     setView('detail');
+    axios.get(`${API_BASE_URL}/api/books/${book.id}/`)
+      .then(response => {
+        setSelectedBook(response.data);
+        setLoading(false);
+      })
+      .catch(err => {
+        console.error("Error fetching book detail:", err);
+        setError("无法获取图书详情。");
+        setLoading(false);
+      });
   };
 
   // 处理搜索提交
@@ -383,11 +425,24 @@ function App() {
       );
     } 
     
-    // 2. 无库存
+    // 2. 无库存：登录用户可以预约，轮到时由同一按钮取书
     if (book.quantity <= 0) {
+      if (isGuest) {
+        return (
+          <button className="btn btn-secondary w-100" disabled>
+            暂无库存
+          </button>
+        );
+      }
       return (
-        <button className="btn btn-secondary w-100" disabled>
-          暂无库存
+        <button 
+          className="btn btn-outline-warning w-100"
+          onClick={(e) => {
+            e.stopPropagation();
+            handleReserve(book.id, book.title);
+          }}
+        >
+          预约 / 取书
         </button>
       );
     }
@@ -580,20 +635,19 @@ function App() {
                 <div className="card h-100 shadow-sm" style={{cursor: 'pointer'}} onClick={() => navigateToDetail(book)}>
                   <div className="row g-0">
                     <div className="col-4">
-                      <img 
-                        src={book.cover_image || DEFAULT_COVER} 
+                      <BookCover 
+                        book={book} 
+                        sizes="120px" 
+                        fallback={DEFAULT_COVER} 
                         className="img-fluid rounded-start h-100" 
                         style={{objectFit: 'cover'}}
-                        alt={book.title} 
                       />
                     </div>
                     <div className="col-8">
                       <div className="card-body">
                         <h5 className="card-title">{book.title}</h5>
                         <h6 className="card-subtitle mb-2 text-muted">{book.authors.map(a => a.name).join(', ')}</h6>
-                        <p className="card-text text-truncate">{book.summary}</p>
-                        <div className="d-flex justify-content-between align-items-center mb-2">
-                          <span className="badge bg-primary">{book.categories.map(c => c.name).join(', ')}</span>
+                        <div className="d-flex justify-content-end align-items-center mb-2">
                           <small className="text-muted">库存: {book.quantity}</small>
                         </div>
                       </div>
@@ -748,11 +802,12 @@ function App() {
                       <div className={`card h-100 shadow-sm ${borrow.is_overdue ? 'border-danger' : 'border-primary'}`}>
                         <div className="row g-0">
                           <div className="col-4">
-                            <img 
-                              src={borrow.book.cover_image || DEFAULT_COVER} 
+                            <BookCover 
+                              book={borrow.book} 
+                              sizes="120px" 
+                              fallback={DEFAULT_COVER} 
                               className="img-fluid rounded-start h-100" 
                               style={{objectFit: 'cover'}}
-                              alt={borrow.book.title} 
                             />
                           </div>
                           <div className="col-8">
@@ -837,10 +892,11 @@ function App() {
         <div className="card shadow-lg">
           <div className="row g-0">
             <div className="col-md-4">
-              <img 
-                src={selectedBook.cover_image || DEFAULT_COVER} 
+              <BookCover 
+                book={selectedBook} 
+                sizes="(min-width: 768px) 33vw, 100vw" 
+                fallback={DEFAULT_COVER} 
                 className="img-fluid rounded-start w-100" 
-                alt={selectedBook.title} 
                 style={{maxHeight: '600px', objectFit: 'contain', backgroundColor: '#f8f9fa'}}
               />
             </div>
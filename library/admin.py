@@ -1,31 +1,231 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Publisher, Author, Category, Book, Reader, Borrow
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+
+from .circulation import adjust_stock, refresh_reader_stats, return_borrows
+from .models import Publisher, Author, Category, Book, Reader, Borrow, ArchivedBorrow, Reservation
+from .search import search_book_ids
+
+# 有筛选条件时最多数到的行数，超出部分的页码不显示（请用筛选缩小范围）
+ADMIN_COUNT_LIMIT = 10000
+# 批量动作每批处理的记录数，每批一个短事务
+ADMIN_ACTION_BATCH_SIZE = 1000
+
+
+def estimated_row_count(model):
+    """读取数据库统计信息中的表行数估计值，不扫描表；不支持的数据库返回 None"""
+    connection = connections['default']
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL 从未 ANALYZE 过的表返回 -1
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    大表的列表页不执行完整的 COUNT(*)：
+    - 没有筛选条件时使用数据库统计信息中的估计值
+    - 有筛选条件（或数据库不提供估计值）时最多数到 ADMIN_COUNT_LIMIT 行
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate > ADMIN_COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:ADMIN_COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """大表的通用设置：估计行数、不统计未筛选的总数"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+def run_in_batches(queryset, process):
+    """把选中的记录按主键分批交给 process(主键列表)，返回各批结果之和；“全选”整张表时内存占用也有上限"""
+    total = 0
+    last_pk = None
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = list((ids.filter(pk__gt=last_pk) if last_pk is not None else ids)[:ADMIN_ACTION_BATCH_SIZE])
+        if not batch:
+            return total
+        total += process(batch)
+        last_pk = batch[-1]
+
 
 # 定义一个内联 admin，将 Reader 信息嵌入到 User 页面中
 class ReaderInline(admin.StackedInline):
     model = Reader
     can_delete = False
     verbose_name_plural = '读者信息'
+    # 借阅统计由借书/还书维护，不允许手工修改
+    readonly_fields = ('active_loan_count', 'earliest_due_date')
 
 # 定义新的 User admin
 class UserAdmin(BaseUserAdmin):
     inlines = (ReaderInline,)
     list_display = ('username', 'email', 'first_name', 'is_staff', 'get_phone_number')
-    
+    # 电话号码在读者表中，随列表一次 JOIN 取出
+    list_select_related = ('reader',)
+    # 用户名有唯一索引，按前缀 / 精确匹配检索
+    search_fields = ('^username', '=email')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='电话号码')
     def get_phone_number(self, instance):
-        return instance.reader.phone_number
-    get_phone_number.short_description = '电话号码'
+        reader = getattr(instance, 'reader', None)
+        return reader.phone_number if reader is not None else ''
 
 # 重新注册 User 模型
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
-# Register your models here.
-admin.site.register(Publisher)
-admin.site.register(Author)
-admin.site.register(Category)
-admin.site.register(Book)
-admin.site.register(Reader)
-admin.site.register(Borrow)
+
+# 出版社、作者、分类数据量小，供图书编辑页的自动完成控件检索
+@admin.register(Publisher)
+class PublisherAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+@admin.register(Author)
+class AuthorAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+@admin.register(Book)
+class BookAdmin(LargeTableAdmin):
+    list_display = ('title', 'isbn', 'publisher', 'publication_date', 'quantity')
+    list_select_related = ('publisher',)
+    list_filter = ('publication_date',)
+    ordering = ('-id',)
+    # 出版社、作者、分类使用自动完成控件，不把整张表渲染成下拉框
+    autocomplete_fields = ('publisher', 'authors', 'categories')
+    # 检索走全文倒排索引（书名、作者、ISBN、出版社、分类），不对书名做 LIKE 全表扫描
+    search_fields = ('title',)
+    search_help_text = '按书名、作者、ISBN、出版社或分类检索'
+    actions = ('increase_stock', 'decrease_stock')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_book_ids(search_term)), False
+
+    @admin.action(description='库存加一（有人预约时分配给排队的读者）')
+    def increase_stock(self, request, queryset):
+        count = run_in_batches(queryset, lambda ids: adjust_stock(ids, 1))
+        self.message_user(request, f'已为 {count} 本图书增加库存', messages.SUCCESS)
+
+    @admin.action(description='库存减一（库存为 0 的不变）')
+    def decrease_stock(self, request, queryset):
+        count = run_in_batches(queryset, lambda ids: adjust_stock(ids, -1))
+        self.message_user(request, f'已为 {count} 本图书减少库存', messages.SUCCESS)
+
+
+@admin.register(Reader)
+class ReaderAdmin(LargeTableAdmin):
+    list_display = ('user', 'phone_number', 'active_loan_count', 'earliest_due_date')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('=user__username',)
+    readonly_fields = ('active_loan_count', 'earliest_due_date')
+
+
+@admin.register(Borrow)
+class BorrowAdmin(LargeTableAdmin):
+    list_display = ('id', 'reader', 'book', 'borrow_date', 'due_date', 'return_date', 'status')
+    # __str__ 及读者、图书列都需要关联对象，随列表一次 JOIN 取出
+    list_select_related = ('reader', 'book')
+    # 状态走 (status, due_date) 索引，借阅日期、归还日期筛选走各自的索引；应还日期同时按状态筛选时走 (status, due_date)
+    list_filter = ('status', 'due_date', 'borrow_date', 'return_date')
+    ordering = ('-id',)
+    # 用户名、ISBN 都有唯一索引，只做精确匹配
+    search_fields = ('=reader__username', '=book__isbn')
+    search_help_text = '输入完整的用户名或 ISBN'
+    # 读者、图书表很大，编辑页用 ID 输入框代替下拉框
+    raw_id_fields = ('reader', 'book')
+    actions = ('mark_returned',)
+
+    # 借出、归还都要同步库存、预约和读者统计：借书走借书接口，归还用“标记为已归还”动作，
+    # 编辑页只能修改应还日期（续借），未归还的记录不能删除
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and obj.return_date is None:
+            return False
+        return super().has_delete_permission(request, obj)
+
+    def get_readonly_fields(self, request, obj=None):
+        return ('reader', 'book', 'borrow_date', 'return_date', 'status')
+
+    def get_actions(self, request):
+        # 批量删除不检查单条记录，统一移除
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def save_model(self, request, obj, form, change):
+        # 修改应还日期后重算该读者的最早应还日期
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            refresh_reader_stats([obj.reader_id])
+
+    @admin.action(description='标记为已归还（恢复库存并更新读者借阅统计）')
+    def mark_returned(self, request, queryset):
+        count = run_in_batches(queryset.filter(return_date__isnull=True), return_borrows)
+        self.message_user(request, f'已归还 {count} 条借阅记录', messages.SUCCESS)
+
+
+@admin.register(ArchivedBorrow)
+class ArchivedBorrowAdmin(LargeTableAdmin):
+    list_display = ('id', 'reader', 'book', 'borrow_date', 'due_date', 'return_date', 'status', 'archived_at')
+    list_select_related = ('reader', 'book')
+    list_filter = ('status', 'borrow_date', 'return_date')
+    ordering = ('-id',)
+    search_fields = ('=reader__username', '=book__isbn')
+    search_help_text = '输入完整的用户名或 ISBN'
+    raw_id_fields = ('reader', 'book')
+
+    # 归档记录只读，由 archive_borrows 写入
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Reservation)
+class ReservationAdmin(LargeTableAdmin):
+    list_display = ('id', 'reader', 'book', 'status', 'created_at', 'hold_until')
+    list_select_related = ('reader', 'book')
+    list_filter = ('status',)
+    ordering = ('-id',)
+    search_fields = ('=reader__username', '=book__isbn')
+    raw_id_fields = ('reader', 'book')
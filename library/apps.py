@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class LibraryConfig(AppConfig):
     name = 'library'
+
+    def ready(self):
+        # 注册全文检索索引的增量维护信号、匿名响应缓存的失效信号、条件 GET 的更新时间维护信号、封面衍生图生成信号、
+        # 登录凭证变更及用户缓存的失效信号、删除借阅记录后读者借阅统计的重算信号、
+        # 数据库连接建立时安装请求指标的 SQL 计时
+        from . import authentication, cache, circulation, conditional, images, metrics, search  # noqa: F401
@@ -0,0 +1,193 @@
+"""
+只读接口的原生异步实现，在 ASGI 服务器下使用（见 urls.py 中的 LIBRARY_ASYNC_READS）
+
+查询通过 Django 异步 ORM 执行，等待数据库期间事件循环可以继续处理其他连接；
+鉴权、权限、稀疏字段、缓存、条件 GET 和序列化沿用同步视图集的实现，响应内容与同步接口一致。
+写操作（借书、还书、增删改）仍由原有的同步 DRF 视图处理
+"""
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from .cache import cache_anonymous_response
+from .conditional import conditional_response
+from .pagination import BorrowHistoryCursorPagination
+from .serializers import BorrowSerializer
+from .views import BookViewSet, CurrentUserView
+
+
+def as_async_view(view_class, fallback, actions=None, **initkwargs):
+    """
+    把带有异步处理方法的 DRF 视图包装为原生异步 Django 视图：
+    - GET / HEAD 由 view_class 的异步方法处理（视图集按 actions 分派，普通视图调用 get）
+    - 其他请求方法转交同步视图 fallback
+    DRF 的 dispatch 不支持协程，这里按相同的步骤完成请求初始化、鉴权和异常处理
+    """
+    handler_name = actions['get'] if actions is not None else 'get'
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+
+        self = view_class(**initkwargs)
+        if actions is not None:
+            self.action_map = {'get': handler_name, 'head': handler_name}
+        self.args, self.kwargs = args, kwargs
+        self.headers = self.default_response_headers
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+
+        try:
+            # 鉴权、权限、限流检查可能查询数据库，放到线程中执行
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await getattr(self, handler_name)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    return view
+
+
+class AsyncReadMixin:
+    """视图集混入类：提供 filter_queryset / paginate_queryset / get_object 的异步版本"""
+
+    async def afilter_queryset(self, queryset):
+        for backend_class in list(self.filter_backends):
+            backend = backend_class()
+            if hasattr(backend, 'afilter_queryset'):
+                queryset = await backend.afilter_queryset(self.request, queryset, self)
+            else:
+                queryset = await sync_to_async(backend.filter_queryset)(self.request, queryset, self)
+        return queryset
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, 'apaginate_queryset'):
+            return await paginator.apaginate_queryset(queryset, self.request, view=self)
+        # 页码分页依赖同步的 Paginator（COUNT + 切片），放到线程中执行
+        return await sync_to_async(paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class AsyncBookViewSet(AsyncReadMixin, BookViewSet):
+    """BookViewSet 只读动作的异步版本"""
+
+    async def aget_borrowed_book_ids(self, book_ids):
+        queryset = self.get_borrowed_book_ids_queryset(book_ids)
+        return {book_id async for book_id in queryset} if queryset is not None else set()
+
+    async def aget_user_status_context(self, book_ids):
+        context = self.get_serializer_context()
+        context['borrowed_book_ids'] = await self.aget_borrowed_book_ids(book_ids)
+        return context
+
+    @conditional_response
+    @cache_anonymous_response
+    async def list(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        books = page if page is not None else [book async for book in queryset]
+        context = await self.aget_user_status_context(book.pk for book in books)
+        serializer = self.get_serializer(books, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @conditional_response
+    @cache_anonymous_response
+    async def retrieve(self, request, *args, **kwargs):
+        book = await self.aget_object()
+        context = await self.aget_user_status_context([book.pk])
+        serializer = self.get_serializer(book, context=context)
+        return Response(serializer.data)
+
+    @conditional_response
+    async def my_borrowed_books(self, request):
+        borrows = [borrow async for borrow in self.get_current_borrows_queryset()]
+        context = self.get_serializer_context()
+        context['borrowed_book_ids'] = {borrow.book_id for borrow in borrows}
+        serializer = BorrowSerializer(borrows, many=True, context=context)
+        return Response(serializer.data)
+
+    @conditional_response
+    async def borrow_history(self, request):
+        history = self.get_borrow_history_querysets()
+
+        page = await self.apaginate_queryset(history)
+        if page is not None:
+            records = page
+        else:
+            records = sorted(
+                [borrow for queryset in history async for borrow in queryset],
+                key=attrgetter('return_date', 'id'), reverse=True,
+            )
+        context = await self.aget_user_status_context(borrow.book_id for borrow in records)
+        serializer = BorrowSerializer(records, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+
+class AsyncCurrentUserView(CurrentUserView):
+    """GET /api/me/ 的异步版本"""
+
+    async def aget_conditional_validators(self):
+        return self.build_profile_validators(self.request.user)
+
+    async def get(self, request, *args, **kwargs):
+        return await self.retrieve(request, *args, **kwargs)
+
+    @conditional_response
+    async def retrieve(self, request, *args, **kwargs):
+        # 完整用户连同读者资料在鉴权时已取出，序列化手机号时不再触发同步查询
+        serializer = self.get_serializer(request.user)
+        return Response(serializer.data)
+
+
+book_list = as_async_view(
+    AsyncBookViewSet,
+    BookViewSet.as_view({'get': 'list', 'post': 'create'}, basename='book', detail=False),
+    actions={'get': 'list'}, basename='book', detail=False,
+)
+book_detail = as_async_view(
+    AsyncBookViewSet,
+    BookViewSet.as_view(
+        {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+        basename='book', detail=True,
+    ),
+    actions={'get': 'retrieve'}, basename='book', detail=True,
+)
+my_borrowed_books = as_async_view(
+    AsyncBookViewSet,
+    BookViewSet.as_view({'get': 'my_borrowed_books'}, basename='book', detail=False),
+    actions={'get': 'my_borrowed_books'}, basename='book', detail=False,
+)
+borrow_history = as_async_view(
+    AsyncBookViewSet,
+    BookViewSet.as_view(
+        {'get': 'borrow_history'}, basename='book', detail=False, pagination_class=BorrowHistoryCursorPagination
+    ),
+    actions={'get': 'borrow_history'}, basename='book', detail=False, pagination_class=BorrowHistoryCursorPagination,
+)
+current_user = as_async_view(AsyncCurrentUserView, CurrentUserView.as_view())
@@ -0,0 +1,209 @@
+"""
+JWT 认证：读请求不再为每个请求查询用户表
+
+- 登录时在令牌中写入 username、is_staff 及登录时间 auth_time（刷新得到的访问令牌会复制这些声明）
+- GET / HEAD / OPTIONS 请求的 request.user 是进程内缓存的完整用户（连同读者资料）的副本，
+  缓存 LIBRARY_AUTH_USER_CACHE_TTL 秒，未命中时查询数据库；is_active、is_staff 以数据库为准，不信任令牌中的声明。
+  本进程内的修改立即生效，其他进程最多延迟一个 TTL；缓存中的用户不能保存
+- 写请求（以及缺少上述声明的旧令牌）从数据库读取用户及读者资料，停用、降权对借书、还书、管理操作立即生效；
+  图书视图先限流后鉴权（get_token_user_id 只校验令牌），被限流的请求不执行这次查询
+- 通过 save() 修改密码、管理员权限、停用或删除账号后，此前登录签发的令牌全部失效：
+  变更时间写入读者表的 credentials_changed_at（持久，所有进程都以它为准），
+  同时写入缓存（使用共享缓存时其他进程无需等待用户缓存过期即可拒绝旧令牌；该记录可能被淘汰，只起加速作用）
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_cache
+from .models import Reader
+
+AUTH_TIME_CLAIM = 'auth_time'
+USER_CLAIMS = ('username', 'is_staff')
+# 这些字段变化后，之前签发的令牌失效
+CREDENTIAL_FIELDS = ('password', 'is_staff', 'is_active')
+
+
+def _credentials_changed_key(user_id):
+    return f'library:auth:changed:{user_id}'
+
+
+class LibraryTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """登录接口签发的令牌附带用户名、管理员标记（仅供客户端展示，鉴权以数据库为准）及登录时间"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        token[AUTH_TIME_CLAIM] = time.time()
+        return token
+
+
+class LibraryJWTAuthentication(JWTAuthentication):
+    """读请求使用缓存的完整用户，写请求及旧令牌从数据库读取；都检查账号是否停用、令牌是否已被吊销"""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        self.check_credentials_unchanged(validated_token)
+        user_id = self.get_user_id(validated_token)
+        if request.method in SAFE_METHODS and all(claim in validated_token for claim in USER_CLAIMS):
+            user = get_cached_user(user_id)
+        else:
+            user = User.objects.select_related('reader').filter(pk=user_id).first()
+        self.check_user(user, validated_token)
+        return user, validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken('令牌中没有用户 ID')
+
+    def check_credentials_unchanged(self, validated_token):
+        """缓存中的吊销记录：共享缓存下可立即拒绝旧令牌，未命中时由 check_user 按数据库判断"""
+        changed_at = get_cache().get(_credentials_changed_key(validated_token.get(api_settings.USER_ID_CLAIM)))
+        if changed_at is not None and validated_token.get(AUTH_TIME_CLAIM, 0) < changed_at:
+            raise AuthenticationFailed('登录信息已变更，请重新登录', code='credentials_changed')
+
+    def check_user(self, user, validated_token):
+        """user 为 None 表示用户已删除"""
+        if user is None:
+            raise AuthenticationFailed('用户不存在', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('账号已停用', code='user_inactive')
+        reader = getattr(user, 'reader', None)
+        changed_at = reader.credentials_changed_at if reader is not None else None
+        if changed_at is not None and validated_token.get(AUTH_TIME_CLAIM, 0) < changed_at.timestamp():
+            raise AuthenticationFailed('登录信息已变更，请重新登录', code='credentials_changed')
+
+
+def get_token_user_id(request):
+    """
+    请求头中访问令牌的用户 ID：只校验签名和有效期，不查询数据库（供限流在鉴权之前使用）
+    没有令牌或令牌无效时返回 None
+    """
+    authenticator = LibraryJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None
+
+
+class _UserCache:
+    """进程内的完整用户缓存：按用户 ID 保存，过期或超出容量时淘汰最早写入的条目"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            return user
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._entries[user_id] = (time.monotonic() + settings.LIBRARY_AUTH_USER_CACHE_TTL, user)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_full_users = _UserCache()
+
+
+def get_cached_user(user_id):
+    """
+    带读者资料（select_related）的完整用户，用户不存在时返回 None
+    缓存中的对象在多个请求间共享，这里返回副本
+    """
+    cached = _full_users.get(user_id)
+    if cached is None:
+        cached = User.objects.select_related('reader').filter(pk=user_id).first()
+        if cached is None:
+            return None
+        _full_users.set(user_id, cached)
+    user = copy.copy(cached)
+    user.from_cache = True
+    return user
+
+
+@receiver(pre_save, sender=User)
+def check_credential_changes(sender, instance, update_fields=None, **kwargs):
+    if getattr(instance, 'from_cache', False):
+        raise RuntimeError('来自缓存的用户可能不是最新数据，不能保存')
+    instance._credentials_changed = False
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(CREDENTIAL_FIELDS)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list(*CREDENTIAL_FIELDS).first()
+    current = tuple(getattr(instance, name) for name in CREDENTIAL_FIELDS)
+    instance._credentials_changed = previous is not None and previous != current
+
+
+def revoke_tokens(user_id):
+    """使该用户此前签发的令牌失效：变更时间写入读者表，并在事务提交后写入缓存"""
+    changed_at = timezone.now()
+    Reader.objects.filter(user_id=user_id).update(credentials_changed_at=changed_at)
+    # 缓存记录在刷新令牌有效期内保留，之后旧令牌本身已经过期
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    transaction.on_commit(
+        lambda: get_cache().set(_credentials_changed_key(user_id), changed_at.timestamp(), timeout)
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    _full_users.pop(instance.pk)
+    if getattr(instance, '_credentials_changed', False):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    _full_users.pop(instance.pk)
+    revoke_tokens(instance.pk)
+
+
+@receiver(post_save, sender=Reader)
+def invalidate_reader(sender, instance, **kwargs):
+    _full_users.pop(instance.user_id)
@@ -0,0 +1,7 @@
+"""
+负载测试与基准测试工具
+
+- data：按给定规模批量生成图书、读者和借阅记录（manage.py generate_benchmark_data）
+- scenarios：多个并发客户端按比例回放浏览、检索、借书/还书、我的借阅、借阅历史等请求（manage.py run_benchmark）
+- report：按接口汇总延迟分位数、吞吐量和查询次数，并与保存的基线比较
+"""
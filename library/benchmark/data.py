@@ -0,0 +1,233 @@
+"""
+基准测试数据生成
+
+- 出版社、作者、分类、图书（含多对多关联和检索索引）、用户、读者、借阅记录全部按批 bulk_create，每批一个事务，
+  不触发信号；生成后手动让目录缓存失效
+- 所有用户共用同一个密码哈希（只计算一次），基准客户端直接签发令牌，不经过登录接口
+- 图书热度服从幂律分布，读者借阅量服从对数正态分布；每位读者有几条借阅未归还（部分已逾期），
+  读者的在借数量、最早应还日期与借阅记录一致
+- 生成的数据以 ISBN_PREFIX / PREFIX 标识，clear() 只删除这些数据
+"""
+import datetime
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from ..cache import bump_generation
+from ..models import Author, Book, BookSearchToken, Borrow, Category, Publisher, Reader
+from ..search import field_token_weights
+
+PREFIX = 'bench-'
+# 真实 ISBN-13 以 978 / 979 开头，不会与生成的数据冲突
+ISBN_PREFIX = '999'
+PASSWORD = 'bench-password'
+CATEGORY_COUNT = 50
+LOAN_DAYS = 30
+
+TITLE_WORDS = (
+    'python', 'django', 'data', 'learning', 'systems', 'design', 'history', 'network', 'database',
+    'algorithms', 'modern', 'practical', 'guide', 'introduction', 'advanced', 'patterns', 'science',
+    'economics', 'philosophy', 'art', 'music', 'world', 'language', 'cloud', 'security', 'theory',
+)
+TITLE_PHRASES = ('数据结构', '机器学习', '中国历史', '经济学原理', '软件工程', '计算机网络', '文学评论', '统计方法')
+SURNAMES = ('Smith', 'Chen', 'Wang', 'Garcia', 'Kim', 'Müller', 'Rossi', 'Tanaka', 'Li', 'Brown', 'Zhang', 'Silva')
+GIVEN_NAMES = ('Alex', 'Wei', 'Maria', 'John', 'Yuki', 'Lena', 'Omar', 'Jing', 'Paul', 'Sara', 'Ming', 'Ivan')
+
+
+@contextmanager
+def explicit_borrow_date():
+    """bulk_create 同样会用当天日期覆盖 auto_now_add 字段，写入历史借阅记录时暂时关闭"""
+    field = Borrow._meta.get_field('borrow_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def generated_books():
+    return Book.objects.filter(isbn__startswith=ISBN_PREFIX)
+
+
+def generated_users():
+    return User.objects.filter(username__startswith=PREFIX)
+
+
+class DatasetGenerator:
+    def __init__(self, books, readers, borrows, days=730, seed=0, batch_size=5000, log=print):
+        self.books = books
+        self.readers = readers
+        self.borrows = borrows
+        self.days = days
+        self.batch_size = batch_size
+        self.log = log
+        self.rng = np.random.default_rng(seed)
+        self.today = timezone.localdate()
+
+    def run(self):
+        started = time.perf_counter()
+        publisher_ids, author_ids, category_ids = self.create_names()
+        book_ids = self.create_books(publisher_ids, author_ids, category_ids)
+        self.create_readers(book_ids)
+        for model in (Book, Author, Publisher, Category):
+            bump_generation(model)
+        self.log(f'数据生成完成，耗时 {time.perf_counter() - started:.1f}s')
+
+    def progress(self, label, done, total, started):
+        elapsed = time.perf_counter() - started
+        self.log(f'{label}：{done}/{total}，{done / elapsed if elapsed else 0:.0f} 行/秒')
+
+    def create_names(self):
+        """出版社、作者、分类，返回各自的 [(名称, ID)]"""
+        publishers = [f'{PREFIX}出版社 {i}' for i in range(max(1, self.books // 1000))]
+        authors = [
+            f'{PREFIX}{GIVEN_NAMES[i % len(GIVEN_NAMES)]} {SURNAMES[i // len(GIVEN_NAMES) % len(SURNAMES)]} {i}'
+            for i in range(max(1, self.books // 20))
+        ]
+        categories = [f'{PREFIX}分类 {i}' for i in range(CATEGORY_COUNT)]
+
+        result = []
+        for model, names in ((Publisher, publishers), (Author, authors), (Category, categories)):
+            model.objects.bulk_create([model(name=name) for name in names], batch_size=self.batch_size)
+            ids = dict(model.objects.filter(name__startswith=PREFIX).values_list('name', 'pk'))
+            result.append([(name, ids[name]) for name in names])
+        self.log(f'出版社 {len(publishers)}，作者 {len(authors)}，分类 {len(categories)}')
+        return result
+
+    def random_title(self):
+        words = self.rng.choice(TITLE_WORDS, size=int(self.rng.integers(2, 5)), replace=False)
+        title = ' '.join(words).title()
+        if self.rng.random() < 0.3:
+            title = f'{TITLE_PHRASES[int(self.rng.integers(len(TITLE_PHRASES)))]} {title}'
+        return title
+
+    def create_books(self, publishers, authors, categories):
+        """按批写入图书、作者/分类关联和检索索引，返回按生成顺序排列的图书 ID 数组"""
+        started = time.perf_counter()
+        first_year = datetime.date(1950, 1, 1)
+        date_range = (self.today - first_year).days
+        book_ids = np.empty(self.books, dtype=np.int64)
+
+        for start in range(0, self.books, self.batch_size):
+            stop = min(start + self.batch_size, self.books)
+            rows = []
+            for i in range(start, stop):
+                publisher = publishers[int(self.rng.integers(len(publishers)))]
+                book_authors = [authors[int(k)] for k in set(self.rng.integers(len(authors), size=int(self.rng.integers(1, 4))))]
+                book_categories = [categories[int(k)] for k in set(self.rng.integers(len(categories), size=int(self.rng.integers(1, 3))))]
+                book = Book(
+                    isbn=f'{ISBN_PREFIX}{i:010d}',
+                    title=self.random_title(),
+                    publisher_id=publisher[1],
+                    publication_date=first_year + datetime.timedelta(days=int(self.rng.integers(date_range))),
+                    summary='',
+                    quantity=int(self.rng.integers(1, 6)),
+                )
+                rows.append((book, publisher, book_authors, book_categories))
+
+            with transaction.atomic():
+                Book.objects.bulk_create([row[0] for row in rows])
+                # MySQL 的 bulk_create 不回填主键，统一按 ISBN 取回
+                ids = dict(generated_books().filter(isbn__in=[row[0].isbn for row in rows]).values_list('isbn', 'pk'))
+                authors_links, category_links, tokens = [], [], []
+                for book, publisher, book_authors, book_categories in rows:
+                    book_id = ids[book.isbn]
+                    authors_links += [Book.authors.through(book_id=book_id, author_id=pk) for _, pk in book_authors]
+                    category_links += [Book.categories.through(book_id=book_id, category_id=pk) for _, pk in book_categories]
+                    weights = field_token_weights({
+                        'isbn': [book.isbn],
+                        'title': [book.title],
+                        'authors': [name for name, _ in book_authors],
+                        'publisher': [publisher[0]],
+                        'categories': [name for name, _ in book_categories],
+                    })
+                    tokens += [BookSearchToken(book_id=book_id, token=token, weight=weight) for token, weight in weights.items()]
+                Book.authors.through.objects.bulk_create(authors_links)
+                Book.categories.through.objects.bulk_create(category_links)
+                BookSearchToken.objects.bulk_create(tokens, batch_size=self.batch_size)
+            book_ids[start:stop] = [ids[row[0].isbn] for row in rows]
+            self.progress('图书', stop, self.books, started)
+        return book_ids
+
+    def loan_sizes(self):
+        """每位读者的借阅记录数：对数正态分布，总数缩放到 self.borrows"""
+        mean = self.borrows / self.readers
+        sizes = np.clip(self.rng.lognormal(np.log(mean) - 0.5, 1.0, self.readers), 1, 2000)
+        return np.maximum((sizes * (self.borrows / sizes.sum())).astype(np.int64), 1)
+
+    def create_readers(self, book_ids):
+        """按批写入用户、读者和借阅记录"""
+        started = time.perf_counter()
+        password = make_password(PASSWORD)
+        sizes = self.loan_sizes()
+        popularity = np.arange(1, len(book_ids) + 1, dtype=np.float64) ** -0.8
+        cdf = np.cumsum(popularity / popularity.sum())
+        limit = settings.LIBRARY_MAX_BORROW_LIMIT
+        created = 0
+
+        # 每批的借阅记录数大致为 batch_size 的 10 倍
+        per_batch = max(1, int(self.batch_size * 10 / max(1, sizes.mean())))
+        for start in range(0, self.readers, per_batch):
+            stop = min(start + per_batch, self.readers)
+            usernames = [f'{PREFIX}{i}' for i in range(start, stop)]
+            borrows, readers = [], []
+            with transaction.atomic():
+                User.objects.bulk_create([User(username=name, password=password) for name in usernames])
+                user_ids = dict(generated_users().filter(username__in=usernames).values_list('username', 'pk'))
+                for name, size in zip(usernames, sizes[start:stop]):
+                    user_id = user_ids[name]
+                    loans = self.reader_loans(user_id, int(size), book_ids, cdf, limit)
+                    borrows += loans
+                    active = [loan.due_date for loan in loans if loan.return_date is None]
+                    readers.append(Reader(
+                        user_id=user_id, active_loan_count=len(active), earliest_due_date=min(active, default=None),
+                    ))
+                Reader.objects.bulk_create(readers)
+                with explicit_borrow_date():
+                    Borrow.objects.bulk_create(borrows, batch_size=self.batch_size)
+            created += len(borrows)
+            self.progress(f'读者 {stop}/{self.readers}，借阅记录', created, int(sizes.sum()), started)
+
+    def reader_loans(self, user_id, size, book_ids, cdf, limit):
+        picks = book_ids[np.minimum(np.searchsorted(cdf, self.rng.random(size)), len(book_ids) - 1)]
+        borrow_days = self.rng.integers(0, self.days, size)
+        active_count = min(int(self.rng.integers(0, limit + 1)), size)
+        loans, active_books = [], set()
+        for k, (book_id, days_ago) in enumerate(zip(picks.tolist(), borrow_days.tolist())):
+            # 前几条借阅改为未归还（同一本书只能有一条），借出时间在 45 天内，部分已逾期
+            is_active = k < active_count and book_id not in active_books
+            if is_active:
+                active_books.add(book_id)
+                days_ago = int(self.rng.integers(0, 45))
+            borrow_date = self.today - datetime.timedelta(days=days_ago)
+            due_date = borrow_date + datetime.timedelta(days=LOAN_DAYS)
+            if is_active:
+                return_date = None
+                status = 'OVERDUE' if due_date < self.today else 'ON_LOAN'
+            else:
+                return_date = min(self.today, borrow_date + datetime.timedelta(days=int(self.rng.integers(1, 45))))
+                status = 'RETURNED'
+            loans.append(Borrow(
+                reader_id=user_id, book_id=book_id, borrow_date=borrow_date, due_date=due_date,
+                return_date=return_date, status=status,
+            ))
+        return loans
+
+
+def clear(log=print, batch_size=10000):
+    """删除生成的数据；依赖图书和用户的记录由级联删除处理，分批进行以控制内存占用"""
+    for label, queryset in (('用户', generated_users()), ('图书', generated_books())):
+        ids = list(queryset.values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            queryset.model.objects.filter(pk__in=ids[start:start + batch_size]).delete()
+        log(f'已删除{label} {len(ids)}')
+    for model in (Publisher, Author, Category):
+        model.objects.filter(name__startswith=PREFIX).delete()
+    for model in (Book, Author, Publisher, Category):
+        bump_generation(model)
@@ -0,0 +1,95 @@
+"""
+基准测试结果汇总与基线比较
+
+结果按 "接口@并发数" 分组，每组包含请求数、错误数（5xx / 连接失败）、被拒绝数（4xx，如库存不足、达到借阅上限）、
+吞吐量、p50 / p95 / p99 延迟（毫秒）以及平均 / 最大查询次数；基线是同样结构的 JSON 文件
+"""
+import json
+import os
+import tempfile
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(samples, elapsed):
+    """samples 为 {接口: [(耗时秒, 状态码, 查询次数或 None)]}，返回 {接口: 指标}"""
+    result = {}
+    for endpoint, values in sorted(samples.items()):
+        latencies = sorted(latency for latency, _, _ in values)
+        queries = [count for _, _, count in values if count is not None]
+        result[endpoint] = {
+            'requests': len(values),
+            'errors': sum(1 for _, status, _ in values if status == 0 or status >= 500),
+            'rejected': sum(1 for _, status, _ in values if 400 <= status < 500),
+            'rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries_avg': round(sum(queries) / len(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+        }
+    return result
+
+
+def format_table(results):
+    """results 为 {"接口@并发数": 指标}，返回表格文本行"""
+    lines = [
+        f'{"接口":<20}{"并发":>6}{"请求数":>9}{"错误":>6}{"拒绝":>6}{"请求/秒":>9}'
+        f'{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}{"查询(均)":>10}{"查询(最大)":>10}'
+    ]
+    for key, stats in results.items():
+        endpoint, concurrency = key.rsplit('@', 1)
+        queries_avg = '-' if stats['queries_avg'] is None else f'{stats["queries_avg"]:.1f}'
+        queries_max = '-' if stats['queries_max'] is None else str(stats['queries_max'])
+        lines.append(
+            f'{endpoint:<20}{concurrency:>6}{stats["requests"]:>9}{stats["errors"]:>6}{stats["rejected"]:>6}'
+            f'{stats["rps"]:>9.1f}{stats["p50"]:>10.1f}{stats["p95"]:>10.1f}{stats["p99"]:>10.1f}'
+            f'{queries_avg:>10}{queries_max:>10}'
+        )
+    return lines
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线逐项比较，返回 [(接口@并发数, 指标, 基线值, 当前值, 变化比例, 是否退化)]
+    延迟和吞吐量超过 tolerance 的变化视为退化；查询次数是确定的，任何增加都视为退化
+    """
+    rows = []
+    for key, stats in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, higher_is_better in (('rps', True), ('p50', False), ('p95', False), ('p99', False)):
+            old, new = base.get(metric), stats[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            rows.append((key, metric, old, new, change, regressed))
+        old, new = base.get('queries_max'), stats['queries_max']
+        if old is not None and new is not None:
+            rows.append((key, 'queries_max', old, new, (new - old) / old if old else 0.0, new > old))
+    return rows
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as fp:
+        return json.load(fp)
+
+
+def save_baseline(path, data):
+    """先写临时文件再替换，中途失败不会损坏已有基线"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,192 @@
+"""
+并发回放场景
+
+- serve() 在本进程内启动多线程 WSGI 测试服务器（与 LiveServerTestCase 相同），每个响应附带 X-Query-Count 头，
+  记录该请求执行的 SQL 条数；压测外部部署的服务时没有该响应头，查询次数不统计
+- 每个虚拟客户端对应一位生成的读者，使用直接签发的访问令牌，保持一个长连接，
+  按 SCENARIOS 中的权重随机选择场景，直到时间用完
+- 每个接口单独记录延迟、状态码和查询次数，由 report.summarize() 汇总
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlsplit
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+# 场景: 权重
+SCENARIOS = {
+    'browse': 30,
+    'search': 20,
+    'detail': 15,
+    'borrow_return': 10,
+    'my_borrowed_books': 15,
+    'borrow_history': 10,
+}
+
+
+class QueryCountingApp:
+    """包装 WSGI 应用，在响应头中返回本次请求执行的 SQL 条数"""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        def counting_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [(QUERY_COUNT_HEADER, str(count))], exc_info)
+
+        # Django 在调用 start_response 之前已经生成完整响应（流式响应除外）
+        with connection.execute_wrapper(counter):
+            return self.application(environ, counting_start_response)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(host='127.0.0.1', port=0):
+    """在后台线程中运行测试服务器，返回其地址"""
+    server = ThreadedWSGIServer((host, port), QuietRequestHandler, allow_reuse_address=False)
+    server.set_app(QueryCountingApp(get_internal_wsgi_application()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://{host}:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class VirtualClient:
+    """一个读者的请求序列，samples 为 {接口: [(耗时秒, 状态码, 查询次数或 None)]}"""
+
+    def __init__(self, url, token, book_ids, search_terms, seed):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+        self.headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+        self.book_ids = book_ids
+        self.search_terms = search_terms
+        self.random = random.Random(seed)
+        self.conn = None
+        self.next_page = None
+        self.loans = []
+        self.samples = {}
+
+    def connect(self):
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+    def request(self, endpoint, method, path):
+        """发送请求并记录结果，返回 (状态码, 解析后的 JSON)；连接错误记为状态码 0"""
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, headers=self.headers)
+            response = self.conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.connect()
+            self.samples.setdefault(endpoint, []).append((time.perf_counter() - started, 0, None))
+            return 0, None
+        elapsed = time.perf_counter() - started
+        queries = response.getheader(QUERY_COUNT_HEADER)
+        self.samples.setdefault(endpoint, []).append(
+            (elapsed, response.status, int(queries) if queries is not None else None)
+        )
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        return response.status, data
+
+    def relative(self, link):
+        parts = urlsplit(link)
+        return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+    def browse(self):
+        # 有下一页时一半概率继续翻页，模拟逐页浏览
+        if self.next_page and self.random.random() < 0.5:
+            status, data = self.request('browse', 'GET', self.next_page)
+        else:
+            status, data = self.request('browse', 'GET', '/api/books/')
+        self.next_page = self.relative(data['next']) if status == 200 and data.get('next') else None
+
+    def search(self):
+        terms = self.random.sample(self.search_terms, self.random.randint(1, 2))
+        self.request('search', 'GET', '/api/books/?' + urlencode({'search': ' '.join(terms)}))
+
+    def detail(self):
+        self.request('detail', 'GET', f'/api/books/{self.random.choice(self.book_ids)}/')
+
+    def borrow_return(self):
+        """借一本书再还掉；达到借阅上限时先还一本已借的书"""
+        book_id = self.random.choice(self.book_ids)
+        status, _ = self.request('borrow', 'POST', f'/api/books/{book_id}/borrow/')
+        if status == 200:
+            self.request('return_book', 'POST', f'/api/books/{book_id}/return_book/')
+        elif self.loans:
+            self.request('return_book', 'POST', f'/api/books/{self.loans.pop()}/return_book/')
+
+    def my_borrowed_books(self):
+        status, data = self.request('my_borrowed_books', 'GET', '/api/books/my_borrowed_books/')
+        if status == 200:
+            self.loans = [borrow['book']['id'] for borrow in data]
+
+    def borrow_history(self):
+        self.request('borrow_history', 'GET', '/api/books/borrow_history/')
+
+    def run(self, scenarios, deadline):
+        names = list(scenarios)
+        weights = [scenarios[name] for name in names]
+        self.connect()
+        try:
+            while time.perf_counter() < deadline:
+                getattr(self, self.random.choices(names, weights)[0])()
+        finally:
+            self.close()
+        return self.samples
+
+
+def replay(url, tokens, book_ids, search_terms, scenarios=None, duration=30, seed=0):
+    """每个令牌一个并发客户端，同时开始、持续 duration 秒，返回 (合并后的 samples, 实际耗时秒)"""
+    scenarios = scenarios or SCENARIOS
+    clients = [
+        VirtualClient(url, token, book_ids, search_terms, seed=seed * 100003 + i)
+        for i, token in enumerate(tokens)
+    ]
+    barrier = threading.Barrier(len(clients))
+
+    def worker(client):
+        barrier.wait()
+        return client.run(scenarios, time.perf_counter() + duration)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        results = list(pool.map(worker, clients))
+    elapsed = time.perf_counter() - started
+
+    samples = {}
+    for client_samples in results:
+        for endpoint, values in client_samples.items():
+            samples.setdefault(endpoint, []).extend(values)
+    return samples, elapsed
@@ -0,0 +1,197 @@
+import hashlib
+import inspect
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.response import Response
+
+from .models import Author, Book, Category, Publisher
+
+KEY_PREFIX = 'library'
+# 图书库存的代数：借书、还书、调整库存时递增，供条件 GET 的校验值使用（匿名响应缓存按单本书失效库存，不依赖它）
+STOCK_GENERATION = 'library.book.quantity'
+
+
+def get_cache():
+    return caches[settings.LIBRARY_CACHE_ALIAS]
+
+
+def _generation_key(model):
+    """model 为模型类或代数名称（如 STOCK_GENERATION）"""
+    label = model if isinstance(model, str) else model._meta.label_lower
+    return f'{KEY_PREFIX}:gen:{label}'
+
+
+def _initial_generation():
+    # 以当前时间初始化：计数器被淘汰后重新初始化的值不会与之前发出的缓存键、ETag 重复
+    return time.time_ns()
+
+
+def _stock_key(book_id):
+    return f'{KEY_PREFIX}:stock:{book_id}'
+
+
+def get_generations(models):
+    """读取各模型的代数计数器；缺失（首次使用或被淘汰）时以当前时间初始化"""
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            initial = _initial_generation()
+            cache.add(key, initial, timeout=None)
+            values[key] = cache.get(key, initial)
+    return [values[key] for key in keys]
+
+
+def bump_generation(model):
+    """模型数据变化时递增代数，所有依赖该模型的缓存键随之失效"""
+    cache = get_cache()
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_generation(), timeout=None)
+
+
+def invalidate_stock(book_id):
+    """
+    借书/还书只影响单本书的库存：删除该书的库存缓存，其余缓存页面不受影响；同时递增库存代数
+    先递增代数再删除：正在生成的响应要么看到新代数而不写入库存缓存，要么写入的旧值随后被删除
+    """
+    bump_generation(STOCK_GENERATION)
+    get_cache().delete(_stock_key(book_id))
+
+
+def _build_cache_key(request, view):
+    generations = get_generations(view.cache_models)
+    query = sorted(request.query_params.lists())
+    raw = f'{request.get_host()}|{request.path}|{query}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:resp:{view.basename}:{view.action}:{"-".join(map(str, generations))}:{digest}'
+
+
+def _to_plain(data):
+    """把 ReturnDict / ReturnList 转成普通容器，避免把序列化器一起存进缓存"""
+    if isinstance(data, dict):
+        return {key: _to_plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_to_plain(value) for value in data]
+    return data
+
+
+def _stock_items(data):
+    """取出响应中带库存信息的图书条目（详情为单个对象，列表在 results 中）"""
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        data = data['results']
+    if isinstance(data, dict):
+        data = [data]
+    return [item for item in data if isinstance(item, dict) and 'id' in item and 'quantity' in item]
+
+
+def _apply_stock(data):
+    """
+    用库存缓存覆盖响应中的 quantity / user_status（匿名用户只区分有无库存）
+    任意一本书的库存缓存缺失则返回 None，表示需要重新生成
+    """
+    items = _stock_items(data)
+    stocks = get_cache().get_many([_stock_key(item['id']) for item in items])
+    for item in items:
+        quantity = stocks.get(_stock_key(item['id']))
+        if quantity is None:
+            return None
+        item['quantity'] = quantity
+        if 'user_status' in item:
+            item['user_status'] = 'AVAILABLE' if quantity > 0 else 'NO_STOCK'
+    return data
+
+
+def _lookup(request, view):
+    """
+    返回 (缓存键, 缓存的响应数据, 库存代数)，未命中时数据为 None
+    库存代数在执行视图的查询之前读取，_store 据此判断期间库存是否变化
+    """
+    key = _build_cache_key(request, view)
+    stock_generation = get_generations([STOCK_GENERATION])[0] if getattr(view, 'cache_stock', False) else None
+    data = get_cache().get(key)
+    if data is not None and stock_generation is not None:
+        data = _apply_stock(data)
+    return key, data, stock_generation
+
+
+def _store(view, key, response, stock_generation):
+    data = _to_plain(response.data)
+    get_cache().set(key, data, settings.LIBRARY_CACHE_TIMEOUT)
+    # 查询之后有借书/还书提交时，响应中的库存可能已过期，不写入库存缓存（下次命中时重新生成）
+    if stock_generation is not None and get_generations([STOCK_GENERATION])[0] == stock_generation:
+        get_cache().set_many(
+            {_stock_key(item['id']): item['quantity'] for item in _stock_items(data)},
+            settings.LIBRARY_CACHE_TIMEOUT
+        )
+
+
+def cache_anonymous_response(view_method):
+    """
+    缓存匿名用户的只读目录响应：
+    - 缓存键由请求路径、查询参数及 view.cache_models 中各模型的代数组成，数据变化后自动失效
+    - view.cache_stock 为 True 时，图书库存单独缓存，借书/还书只需失效对应图书的库存
+    登录用户的响应包含个人借阅状态，不做缓存；同时支持同步和异步视图方法
+    """
+    if inspect.iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return await view_method(self, request, *args, **kwargs)
+
+            key, data, stock_generation = await sync_to_async(_lookup)(request, self)
+            if data is not None:
+                return Response(data, headers={'X-Cache': 'HIT'})
+
+            response = await view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                await sync_to_async(_store)(self, key, response, stock_generation)
+                response['X-Cache'] = 'MISS'
+            return response
+
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        key, data, stock_generation = _lookup(request, self)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            _store(self, key, response, stock_generation)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=Category)
+def bump_on_change(sender, **kwargs):
+    bump_generation(sender)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.categories.through)
+def bump_on_m2m_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(Book)
@@ -0,0 +1,117 @@
+"""
+批量借阅操作（管理后台的批量动作及归档任务使用）
+
+与借书/还书接口的语义一致，但按集合执行：
+- 一批借阅记录的归还、库存恢复、读者借阅统计的重算各用一条或少量 SQL 完成，不逐行保存
+- 有人排队预约的图书，空出的副本仍按 release_copy() 分配给队首读者，只有没人排队的书直接加库存
+- 调用方按主键分批，每批一个短事务
+
+删除未归还的借阅记录（管理后台删除、删除图书或用户时的级联删除）后，由 post_delete 信号重算该读者的借阅统计
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate_stock
+from .models import ArchivedBorrow, Book, Borrow, Reader, Reservation
+from .reservations import release_copy
+
+ARCHIVED_FIELDS = ('id', 'reader_id', 'book_id', 'borrow_date', 'due_date', 'return_date', 'status')
+
+
+def refresh_reader_stats(user_ids):
+    """按借阅记录重算一批读者的在借数量和最早应还日期（一条 UPDATE，相关子查询走 (读者, 归还日期, 应还日期) 索引）"""
+    active = Borrow.objects.filter(reader=OuterRef('user'), return_date__isnull=True)
+    return Reader.objects.filter(user_id__in=user_ids).update(
+        active_loan_count=Coalesce(
+            Subquery(active.order_by().values('reader').annotate(n=Count('pk')).values('n')), Value(0)
+        ),
+        earliest_due_date=Subquery(active.order_by('due_date').values('due_date')[:1]),
+    )
+
+
+@receiver(post_delete, sender=Borrow)
+def refresh_stats_after_delete(sender, instance, **kwargs):
+    # 已归还的记录不计入统计（归档任务删除的都是这种），不需要重算
+    if instance.return_date is None:
+        refresh_reader_stats([instance.reader_id])
+
+
+def release_copies(copies):
+    """
+    copies 为 {图书 ID: 空出的副本数}，必须在事务中调用
+    先按主键顺序锁定这些图书行（与预约、还书串行），有人排队的书逐本分配给队首，其余一条 UPDATE 加库存
+    """
+    book_ids = sorted(copies)
+    list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk', flat=True))
+    queued = set(
+        Reservation.objects.filter(book_id__in=book_ids, status='WAITING').values_list('book_id', flat=True).distinct()
+    )
+    for book_id in queued:
+        for _ in range(copies[book_id]):
+            release_copy(book_id)
+
+    plain = [book_id for book_id in book_ids if book_id not in queued]
+    if plain:
+        Book.objects.filter(pk__in=plain).update(
+            quantity=F('quantity') + Case(
+                *[When(pk=book_id, then=Value(copies[book_id])) for book_id in plain],
+                output_field=IntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        transaction.on_commit(lambda: [invalidate_stock(book_id) for book_id in plain])
+
+
+def return_borrows(borrow_ids):
+    """把一批借阅记录标记为已归还，恢复库存（或分配给预约者）并重算读者统计，返回实际归还的条数"""
+    with transaction.atomic():
+        rows = list(
+            Borrow.objects.select_for_update()
+            .filter(pk__in=borrow_ids, return_date__isnull=True)
+            .values_list('pk', 'reader_id', 'book_id')
+        )
+        if not rows:
+            return 0
+        Borrow.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(
+            return_date=timezone.localdate(), status='RETURNED', updated_at=timezone.now()
+        )
+        # 先读者后图书，与借书、还书、预约接口的加锁顺序一致
+        refresh_reader_stats({reader_id for _, reader_id, _ in rows})
+        release_copies(Counter(book_id for _, _, book_id in rows))
+    return len(rows)
+
+
+def adjust_stock(book_ids, delta):
+    """一批图书的库存各增加 delta 本（增加的副本优先分配给排队的预约者）或减少 -delta 本（不低于 0），返回涉及的图书数"""
+    with transaction.atomic():
+        if delta > 0:
+            release_copies({book_id: delta for book_id in book_ids})
+            return len(book_ids)
+        reduced = list(
+            Book.objects.select_for_update().filter(pk__in=book_ids, quantity__gte=-delta)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        Book.objects.filter(pk__in=reduced).update(quantity=F('quantity') + delta, updated_at=timezone.now())
+        transaction.on_commit(lambda: [invalidate_stock(book_id) for book_id in reduced])
+    return len(reduced)
+
+
+def archive_borrows(borrow_ids):
+    """把一批已归还的借阅记录移到归档表（保留原 ID，插入和删除在同一事务中），返回移动的条数"""
+    with transaction.atomic():
+        rows = list(
+            Borrow.objects.select_for_update()
+            .filter(pk__in=borrow_ids, return_date__isnull=False)
+            .values_list(*ARCHIVED_FIELDS)
+        )
+        if not rows:
+            return 0
+        ArchivedBorrow.objects.bulk_create([ArchivedBorrow(**dict(zip(ARCHIVED_FIELDS, row))) for row in rows])
+        Borrow.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
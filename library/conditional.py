@@ -0,0 +1,142 @@
+"""
+条件 GET（ETag / If-None-Match）
+
+- 目录数据的版本取自 library/cache.py 中各模型的代数计数器（新增、修改、删除都会递增），不查询数据库；
+  图书的库存变化另有库存代数（借书、还书、调整库存时递增）
+- 按用户区分的数据（当前用户的借阅记录）用一次走读者索引的聚合 (行数, 最大 updated_at) 概括
+- 不发送 Last-Modified：删除最新的记录会让最大更新时间倒退，无法据此判断是否变化
+"""
+import hashlib
+import inspect
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from .cache import STOCK_GENERATION, get_generations
+from .models import Book
+
+
+def _validator_part(queryset, stats):
+    last_modified = stats['last_modified']
+    return f'{queryset.model._meta.label_lower}:{stats["count"]}:{last_modified.isoformat() if last_modified else ""}'
+
+
+def queryset_validator(queryset):
+    """
+    用一次聚合查询 (最大 updated_at, 行数) 概括一组数据的版本：新增、修改会推高最大时间，删除会改变行数
+    只用于按用户筛选、走索引的小范围查询集，整张表的版本使用代数计数器
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return _validator_part(queryset, stats)
+
+
+async def aqueryset_validator(queryset):
+    """queryset_validator 的异步版本"""
+    stats = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return _validator_part(queryset, stats)
+
+
+def build_validators(parts):
+    """把各部分版本信息合成为 ETag"""
+    return '"%s"' % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def conditional_response(view_method):
+    """
+    条件 GET：在执行查询和序列化之前，用 view.get_conditional_validators() 计算 ETag，
+    命中 If-None-Match 时直接返回 304
+    异步视图方法使用 view.aget_conditional_validators()
+    与 cache_anonymous_response 同用时放在外层：匿名响应的缓存命中同样带 ETag，也可以直接返回 304
+    """
+    if inspect.iscoroutinefunction(view_method):
+        @wraps(view_method)
+        async def async_wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_method(self, request, *args, **kwargs)
+
+            etag = await self.aget_conditional_validators()
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view_method(self, request, *args, **kwargs)
+            return _patch_validators(response, etag)
+
+        return async_wrapper
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_method(self, request, *args, **kwargs)
+
+        etag = self.get_conditional_validators()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        return _patch_validators(response, etag)
+
+    return wrapper
+
+
+def _patch_validators(response, etag):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+    # 同一 URL 的内容因登录用户而异
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    视图集混入类：默认以 cache_models 中各模型的代数（cache_stock 为 True 时加上库存代数）作为校验值，
+    需要按用户区分的视图可以重写 get_conditional_querysets()
+    """
+    cache_models = ()
+
+    def get_conditional_generations(self):
+        names = list(self.cache_models)
+        if getattr(self, 'cache_stock', False):
+            names.append(STOCK_GENERATION)
+        return names
+
+    def get_conditional_querysets(self):
+        return []
+
+    def get_conditional_validators(self):
+        generations = get_generations(self.get_conditional_generations())
+        return self._combine_validators(generations, [queryset_validator(qs) for qs in self.get_conditional_querysets()])
+
+    async def aget_conditional_validators(self):
+        generations = await sync_to_async(get_generations)(self.get_conditional_generations())
+        return self._combine_validators(
+            generations, [await aqueryset_validator(qs) for qs in self.get_conditional_querysets()]
+        )
+
+    def _combine_validators(self, generations, queryset_parts):
+        parts = []
+        user = self.request.user
+        if user.is_authenticated:
+            parts.append(f'user:{user.pk}')
+        parts.append('gen:' + '-'.join(map(str, generations)))
+        parts.extend(queryset_parts)
+        return build_validators(parts)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.categories.through)
+def touch_books_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # 作者/分类关联变化不会修改图书行，手动刷新 updated_at（目录缓存和条件 GET 的代数由 cache.py 的信号递增）
+    if reverse and action == 'pre_clear':
+        instance._touched_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    elif action == 'post_clear':
+        book_ids = getattr(instance, '_touched_book_ids', ())
+    else:
+        book_ids = pk_set or ()
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
@@ -0,0 +1,123 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _flat_columns(serializer, model):
+    """
+    嵌套序列化器只输出本表的普通字段时，返回需要查询的列名，用于 only() 裁剪；
+    含有方法字段、嵌套关系等无法静态判断依赖的情况返回 None
+    """
+    columns = {model._meta.pk.name}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)) or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.is_relation or not model_field.concrete:
+            return None
+        columns.add(model_field.name)
+    return tuple(sorted(columns))
+
+
+def _walk(serializer, model, prefix, select, prefetch, in_prefetch):
+    """
+    递归遍历序列化器的字段树，根据字段对应的模型关系决定预加载方式：
+    - 正向外键 / 一对一：select_related（JOIN）
+    - 多对多 / 反向外键：prefetch_related（额外一次查询）
+    位于 prefetch 路径之下的关系只能继续使用 prefetch_related
+    """
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        is_nested = isinstance(nested, serializers.BaseSerializer)
+
+        # 普通字段只需要加载 source 中间经过的关系，嵌套序列化器还需要加载其自身
+        attrs = field.source.split('.')
+        relation_attrs = attrs if is_nested else attrs[:-1]
+
+        current_model = model
+        path = prefix
+        through_prefetch = in_prefetch
+        for attr in relation_attrs:
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+
+            path = f'{path}__{attr}' if path else attr
+            current_model = model_field.related_model
+            if model_field.many_to_many or model_field.one_to_many:
+                through_prefetch = True
+                columns = _flat_columns(nested, current_model) if is_nested and attr == relation_attrs[-1] else None
+                prefetch[path] = (current_model, columns)
+            elif through_prefetch:
+                prefetch.setdefault(path, (current_model, None))
+            else:
+                select.add(path)
+        else:
+            if is_nested and relation_attrs:
+                _walk(nested, current_model, path, select, prefetch, through_prefetch)
+
+
+@lru_cache(maxsize=None)
+def get_eager_loading_plan(serializer_class):
+    """
+    根据序列化器的字段树计算预加载方案，返回 (select_related 路径, prefetch 方案)
+    prefetch 方案为 (路径, 关联模型, 需要查询的列或 None) 元组，结果按序列化器类缓存
+    """
+    serializer = serializer_class()
+    select, prefetch = set(), {}
+    _walk(serializer, serializer.Meta.model, '', select, prefetch, False)
+    return (
+        tuple(sorted(select)),
+        tuple((path, model, columns) for path, (model, columns) in sorted(prefetch.items())),
+    )
+
+
+def optimize_queryset(queryset, serializer_class, fields=None):
+    """
+    为 queryset 应用 serializer_class 所需的 select_related / prefetch_related
+    fields 为稀疏字段集时，只预加载这些顶层字段涉及的关系
+    """
+    select, prefetch = get_eager_loading_plan(serializer_class)
+    if fields is not None:
+        select = [path for path in select if path.split('__')[0] in fields]
+        prefetch = [plan for plan in prefetch if plan[0].split('__')[0] in fields]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*[
+            Prefetch(path, queryset=model._default_manager.only(*columns)) if columns else path
+            for path, model, columns in prefetch
+        ])
+    return queryset
+
+
+class EagerLoadingMixin:
+    """
+    视图集混入类：自动根据当前序列化器为 get_queryset() 的结果添加预加载，
+    使嵌套序列化的查询数量不随分页大小增长
+    eager_loading_exempt_actions 中的动作（如借书、还书）不会序列化关联对象，跳过预加载
+    """
+    eager_loading_exempt_actions = ()
+
+    def get_eager_loading_fields(self):
+        """返回本次请求实际输出的顶层字段（稀疏字段集），None 表示全部"""
+        return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) in self.eager_loading_exempt_actions:
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer_class(), self.get_eager_loading_fields())
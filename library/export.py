@@ -0,0 +1,168 @@
+"""
+目录与借阅数据的流式导出（CSV / NDJSON，可选 gzip）
+
+- 按主键分块读取（WHERE id > 上一块最大 id ORDER BY id LIMIT n），每块只占用固定内存，
+  不依赖数据库驱动的服务端游标（PyMySQL 默认会把整个结果集读入内存）
+- 每读完一块就编码并产出字节，HTTP 响应可以立即开始发送
+- 图书导出的字段与 import_catalog 的输入格式一致，可直接重新导入
+"""
+import csv
+import io
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
+from .models import ArchivedBorrow, Book, Borrow
+
+DEFAULT_CHUNK_SIZE = 2000
+# CSV 中多值字段（作者、分类）的分隔符，与 import_catalog 的 --list-separator 默认值一致
+LIST_SEPARATOR = '|'
+
+BOOK_FIELDS = ('id', 'isbn', 'title', 'publisher', 'authors', 'categories', 'publication_date', 'quantity', 'summary')
+BORROW_FIELDS = (
+    'id', 'reader_id', 'reader', 'book_id', 'isbn', 'title',
+    'borrow_date', 'due_date', 'return_date', 'status',
+)
+
+
+def _iter_chunks(queryset, chunk_size):
+    """按主键分块遍历 values() 查询，逐块产出字典列表"""
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1]['id']
+
+
+def _names_by_book(through, field, book_ids):
+    names = {}
+    for book_id, name in through.objects.filter(book_id__in=book_ids).values_list('book_id', f'{field}__name'):
+        names.setdefault(book_id, []).append(name)
+    return names
+
+
+def iter_book_chunks(chunk_size=DEFAULT_CHUNK_SIZE):
+    """图书连同出版社、作者、分类名称；每块的多对多关联各用一次查询取出"""
+    queryset = Book.objects.values(
+        'id', 'isbn', 'title', 'publication_date', 'quantity', 'summary', publisher_name=F('publisher__name'),
+    )
+    for rows in _iter_chunks(queryset, chunk_size):
+        book_ids = [row['id'] for row in rows]
+        authors = _names_by_book(Book.authors.through, 'author', book_ids)
+        categories = _names_by_book(Book.categories.through, 'category', book_ids)
+        yield [
+            {
+                'id': row['id'],
+                'isbn': row['isbn'],
+                'title': row['title'],
+                'publisher': row['publisher_name'],
+                'authors': sorted(authors.get(row['id'], ())),
+                'categories': sorted(categories.get(row['id'], ())),
+                'publication_date': row['publication_date'],
+                'quantity': row['quantity'],
+                'summary': row['summary'],
+            }
+            for row in rows
+        ]
+
+
+def iter_borrow_chunks(chunk_size=DEFAULT_CHUNK_SIZE, since=None, until=None, status=None):
+    """借阅记录（先导出归档表，再导出借阅表），可按借阅日期区间和状态筛选"""
+    for model in (ArchivedBorrow, Borrow):
+        queryset = model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(borrow_date__gte=since)
+        if until is not None:
+            queryset = queryset.filter(borrow_date__lte=until)
+        if status is not None:
+            queryset = queryset.filter(status=status)
+        queryset = queryset.values(
+            'id', 'reader_id', 'book_id', 'borrow_date', 'due_date', 'return_date', 'status',
+            reader_name=F('reader__username'), isbn=F('book__isbn'), title=F('book__title'),
+        )
+        for rows in _iter_chunks(queryset, chunk_size):
+            for row in rows:
+                row['reader'] = row.pop('reader_name')
+            yield rows
+
+
+def encode_csv(chunks, fields):
+    """每块编码为一段 CSV 字节，首段带表头；多值字段用 LIST_SEPARATOR 连接"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for rows in chunks:
+        for row in rows:
+            writer.writerow({
+                key: LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                for key, value in row.items()
+            })
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # 只有表头的空导出
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(chunks, fields):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({key: row[key] for key in fields}, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+
+ENCODERS = {
+    'csv': (encode_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def gzip_stream(parts, level=6):
+    """流式 gzip 压缩：逐段压缩输出，不需要先得到完整内容"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for part in parts:
+        compressed = compressor.compress(part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_stream(dataset, output_format, use_gzip=False, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """返回 (字节迭代器, Content-Type)"""
+    if dataset == 'books':
+        chunks, fields = iter_book_chunks(chunk_size), BOOK_FIELDS
+    else:
+        chunks, fields = iter_borrow_chunks(chunk_size, **filters), BORROW_FIELDS
+    encode, content_type = ENCODERS[output_format]
+    parts = encode(chunks, fields)
+    if use_gzip:
+        return gzip_stream(parts), 'application/gzip'
+    return parts, content_type
+
+
+async def _iterate_async(iterator):
+    # ASGI 下同步迭代器会被整体读入内存后再发送，这里逐块在线程中取出
+    sentinel = object()
+    while True:
+        part = await sync_to_async(next)(iterator, sentinel)
+        if part is sentinel:
+            return
+        yield part
+
+
+def streaming_response(request, parts, content_type, filename):
+    if isinstance(request, ASGIRequest):
+        parts = _iterate_async(iter(parts))
+    response = StreamingHttpResponse(parts, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
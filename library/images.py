@@ -0,0 +1,141 @@
+"""
+封面图片衍生图：上传封面后在后台线程池中用 Pillow 生成固定尺寸的 JPEG / WebP 缩略图
+
+- 文件名取自图片内容的哈希，内容不变则文件名不变，可以配合 Cache-Control: immutable 长期缓存
+- 生成结果记录在 Book.cover_variants 中：
+  {"source": 原图路径, "sizes": {"thumb": {"width": .., "height": .., "jpeg": 路径, "webp": 路径}, ...}}
+- 已有封面可通过 manage.py generate_cover_variants 批量补齐
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_generation
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'book_covers/derived'
+# 输出格式：(字段名, Pillow 格式, 扩展名, 编码参数)
+VARIANT_FORMATS = (
+    ('jpeg', 'JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    ('webp', 'WEBP', 'webp', {'quality': 80, 'method': 6}),
+)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.LIBRARY_COVER_WORKERS, thread_name_prefix='cover-variants'
+        )
+    return _executor
+
+
+def _open_rgb(name):
+    """读取原图，按 EXIF 方向摆正，并把透明背景铺成白色（JPEG 不支持透明通道）"""
+    with default_storage.open(name, 'rb') as fp:
+        image = Image.open(fp)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _save_hashed(data, size_name, extension):
+    """以内容哈希命名保存；同样的内容已存在时直接复用"""
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    name = f'{VARIANT_DIR}/{size_name}.{digest}.{extension}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(data))
+    return name
+
+
+def build_cover_variants(name):
+    """为原图 name 生成所有尺寸和格式的衍生图，返回写入 Book.cover_variants 的内容"""
+    image = _open_rgb(name)
+    sizes = {}
+    for size_name, (width, height) in settings.LIBRARY_COVER_SIZES.items():
+        # 按目标比例居中裁剪后缩放，保证网格中的封面尺寸一致
+        resized = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+        entry = {'width': width, 'height': height}
+        for key, image_format, extension, options in VARIANT_FORMATS:
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **options)
+            entry[key] = _save_hashed(buffer.getvalue(), size_name, extension)
+        sizes[size_name] = entry
+    return {'source': name, 'sizes': sizes}
+
+
+def save_cover_variants(book_id, variants):
+    """
+    写回衍生图信息：仅当图书的封面仍是生成时的那张才更新，避免覆盖处理期间新上传的封面。
+    使用 update() 不触发信号，手动刷新 updated_at 和目录缓存
+    """
+    updated = Book.objects.filter(pk=book_id, cover_image=variants['source']).update(
+        cover_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        bump_generation(Book)
+    return updated
+
+
+def process_cover(book_id, name):
+    try:
+        save_cover_variants(book_id, build_cover_variants(name))
+    except Exception:
+        logger.exception('生成图书 %s 的封面衍生图失败：%s', book_id, name)
+
+
+def _process_in_worker(book_id, name):
+    # 后台线程不经过请求周期，需要自行管理数据库连接
+    close_old_connections()
+    try:
+        process_cover(book_id, name)
+    finally:
+        close_old_connections()
+
+
+def schedule_cover_processing(book_id, name):
+    """提交到后台线程池；LIBRARY_COVER_WORKERS 为 0 时在当前线程同步处理"""
+    if settings.LIBRARY_COVER_WORKERS:
+        _get_executor().submit(_process_in_worker, book_id, name)
+    else:
+        process_cover(book_id, name)
+
+
+def needs_processing(book):
+    return bool(book.cover_image) and book.cover_variants.get('source') != book.cover_image.name
+
+
+@receiver(pre_save, sender=Book)
+def reset_stale_variants(sender, instance, raw=False, **kwargs):
+    # 封面被替换或删除后，旧的衍生图不再对应当前封面，在新衍生图生成前先清空
+    source = instance.cover_variants.get('source') if instance.cover_variants else None
+    if not raw and source and source != (instance.cover_image.name or None):
+        instance.cover_variants = {}
+
+
+@receiver(post_save, sender=Book)
+def process_uploaded_cover(sender, instance, raw=False, **kwargs):
+    if raw or not needs_processing(instance):
+        return
+    book_id, name = instance.pk, instance.cover_image.name
+    # 等事务提交、原图落盘后再处理
+    transaction.on_commit(lambda: schedule_cover_processing(book_id, name))
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from library.models import Book, Borrow, Publisher
+
+BENCH_PREFIX = '__bench__'
+
+
+class Command(BaseCommand):
+    help = (
+        '借书/还书并发争用基准测试：N 个线程同时借同一本书，校验不超借、不丢失更新并统计吞吐量。'
+        '请在支持行锁的数据库（MySQL / PostgreSQL）上运行，SQLite 的库级写锁会让部分请求报错'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=50, help='并发借书的读者（线程）数量')
+        parser.add_argument('--stock', type=int, default=20, help='测试图书的初始库存')
+        parser.add_argument('--rounds', type=int, default=3, help='借书+还书的轮数')
+
+    def handle(self, *args, **options):
+        readers = options['readers']
+        stock = options['stock']
+        rounds = options['rounds']
+        if readers <= 0 or stock < 0 or rounds <= 0:
+            raise CommandError('readers / rounds 必须为正数，stock 不能为负数')
+
+        # 库存不足等 400 响应是预期结果，不需要逐条打印警告
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        # 所有请求来自同一 IP、每位读者每轮借还各一次，开启限流时从第二轮起会被拒绝，测的是限流而不是行锁
+        rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        book, users = self._setup(readers, stock)
+        try:
+            with override_settings(REST_FRAMEWORK=rest_framework):
+                for round_no in range(1, rounds + 1):
+                    self._run_round(round_no, book, users, stock)
+        finally:
+            self._teardown()
+
+    def _setup(self, readers, stock):
+        self._teardown()
+        publisher = Publisher.objects.create(name=f'{BENCH_PREFIX}publisher')
+        book = Book.objects.create(
+            title=f'{BENCH_PREFIX}book',
+            isbn=f'{BENCH_PREFIX}isbn',
+            publisher=publisher,
+            publication_date='2000-01-01',
+            summary='',
+            quantity=stock,
+        )
+        users = [User.objects.create_user(username=f'{BENCH_PREFIX}{i}') for i in range(readers)]
+        return book, users
+
+    def _teardown(self):
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        Publisher.objects.filter(name__startswith=BENCH_PREFIX).delete()
+
+    def _hammer(self, users, url):
+        """所有线程在栅栏处对齐后同时发起请求，返回 (成功数, 数据库报错数, 耗时秒)"""
+        barrier = threading.Barrier(len(users))
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                return 'ok' if client.post(url).status_code == 200 else 'rejected'
+            except DatabaseError:
+                return 'error'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            results = list(pool.map(worker, users))
+        return results.count('ok'), results.count('error'), time.perf_counter() - started
+
+    def _run_round(self, round_no, book, users, stock):
+        expected = min(len(users), stock)
+
+        # 借书：成功数不能超过库存，库存和未归还记录必须与成功数严格一致
+        borrowed, errors, borrow_elapsed = self._hammer(users, f'/api/books/{book.pk}/borrow/')
+        book.refresh_from_db(fields=['quantity'])
+        active = Borrow.objects.filter(book=book, return_date__isnull=True).count()
+        ok = active == borrowed and book.quantity == stock - borrowed and borrowed <= expected
+        if not errors:
+            ok = ok and borrowed == expected
+        self._check(round_no, '借书', ok,
+                    f'成功 {borrowed} 次 / 预期 {expected}，数据库报错 {errors} 次，'
+                    f'未归还记录 {active}，剩余库存 {book.quantity}')
+
+        # 还书：每条借阅记录只能归还一次，库存回到初始值
+        returned, errors, return_elapsed = self._hammer(users, f'/api/books/{book.pk}/return_book/')
+        book.refresh_from_db(fields=['quantity'])
+        active = Borrow.objects.filter(book=book, return_date__isnull=True).count()
+        ok = returned + active == borrowed and book.quantity == stock - active
+        self._check(round_no, '还书', ok,
+                    f'成功 {returned} 次 / 预期 {borrowed}，数据库报错 {errors} 次，剩余库存 {book.quantity}')
+        if active:
+            # 报错未还成功的记录直接归还，保证下一轮从满库存开始
+            Borrow.objects.filter(book=book, return_date__isnull=True).delete()
+            Book.objects.filter(pk=book.pk).update(quantity=stock, updated_at=timezone.now())
+
+        total = len(users) * 2
+        elapsed = borrow_elapsed + return_elapsed
+        self.stdout.write(
+            f'  第 {round_no} 轮：{len(users)} 个并发读者，借书 {borrow_elapsed * 1000:.1f} ms，'
+            f'还书 {return_elapsed * 1000:.1f} ms，吞吐量 {total / elapsed:.1f} req/s'
+        )
+
+    def _check(self, round_no, label, ok, detail):
+        if not ok:
+            raise CommandError(f'第 {round_no} 轮{label}结果不一致：{detail}')
+        self.stdout.write(self.style.SUCCESS(f'第 {round_no} 轮{label}正确：{detail}'))
@@ -0,0 +1,184 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('/api/books/', '/api/books/?search=python', '/api/books/?page_size=50')
+AUTH_PATHS = ('/api/books/my_borrowed_books/', '/api/books/borrow_history/', '/api/me/')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        '只读接口的并发吞吐对比：分别以 WSGI（gunicorn 同步 worker）和 ASGI（uvicorn，异步视图）启动服务，'
+        '在不同并发连接数下循环请求图书列表/检索等只读接口，输出吞吐量和延迟分位数。'
+        '也可以用 --wsgi-url / --asgi-url 指向已经部署好的服务'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', help='已运行的 WSGI 服务地址，不指定则自动启动 gunicorn')
+        parser.add_argument('--asgi-url', help='已运行的 ASGI 服务地址，不指定则自动启动 uvicorn')
+        parser.add_argument('--workers', type=int, default=2, help='自动启动服务时的进程数（两种方式相同）')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50], help='并发连接数，可指定多个')
+        parser.add_argument('--duration', type=float, default=10, help='每个并发级别持续请求的秒数')
+        parser.add_argument('--path', action='append', dest='paths', help='请求的路径，可重复指定；默认为列表和检索接口')
+        parser.add_argument('--username', help='以该用户登录（JWT），同时压测我的借阅、借阅历史、个人信息接口')
+        parser.add_argument('--password', help='登录密码')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 0 or options['duration'] <= 0 or min(options['concurrency']) <= 0:
+            raise CommandError('workers / duration / concurrency 必须为正数')
+
+        paths = list(options['paths'] or DEFAULT_PATHS)
+        if options['username']:
+            paths += AUTH_PATHS
+
+        processes = []
+        try:
+            targets = []
+            for name, url in (('wsgi', options['wsgi_url']), ('asgi', options['asgi_url'])):
+                if url is None:
+                    url, process = self.spawn(name, options['workers'])
+                    processes.append(process)
+                targets.append((name, url.rstrip('/')))
+
+            results = []
+            for name, url in targets:
+                token = self.login(url, options['username'], options['password']) if options['username'] else None
+                for concurrency in options['concurrency']:
+                    stats = self.run_level(url, paths, token, concurrency, options['duration'])
+                    results.append((name, concurrency, stats))
+                    self.stdout.write(f'{name} 并发 {concurrency}：{stats["rps"]:.0f} 请求/秒')
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+        self.report(results)
+
+    def spawn(self, name, workers):
+        """以子进程启动服务，等到能正常响应后返回 (地址, 进程)"""
+        port = _free_port()
+        env = os.environ.copy()
+        if name == 'wsgi':
+            env.pop('LIBRARY_ASYNC_READS', None)
+            command = [
+                sys.executable, '-m', 'gunicorn', 'library_system.wsgi',
+                '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'uvicorn', 'library_system.asgi:application',
+                '--workers', str(workers), '--port', str(port), '--log-level', 'warning', '--no-access-log',
+            ]
+        process = subprocess.Popen(command, env=env)
+        url = f'http://127.0.0.1:{port}'
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{name} 服务启动失败：{" ".join(command)}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', '/api/books/')
+                conn.getresponse().read()
+                return url, process
+            except OSError:
+                time.sleep(0.3)
+        process.terminate()
+        raise CommandError(f'{name} 服务在 30 秒内未就绪')
+
+    def login(self, url, username, password):
+        parts = urlsplit(url)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        conn.request(
+            'POST', '/api/token/', body=json.dumps({'username': username, 'password': password}),
+            headers={'Content-Type': 'application/json'},
+        )
+        response = conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise CommandError(f'登录 {url} 失败：{response.status} {body[:200]!r}')
+        return json.loads(body)['access']
+
+    def run_level(self, url, paths, token, concurrency, duration):
+        """concurrency 个线程各自保持一个长连接，轮流请求 paths，直到时间用完"""
+        parts = urlsplit(url)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        barrier = threading.Barrier(concurrency)
+
+        def worker(offset):
+            latencies, errors = [], 0
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            barrier.wait()
+            deadline = time.perf_counter() + duration
+            i = offset
+            while time.perf_counter() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        errors += 1
+                except (OSError, http.client.HTTPException):
+                    errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                    continue
+                latencies.append(time.perf_counter() - started)
+            conn.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for worker_latencies, _ in outcomes for latency in worker_latencies)
+        return {
+            'requests': len(latencies),
+            'errors': sum(errors for _, errors in outcomes),
+            'rps': len(latencies) / elapsed,
+            'p50': _percentile(latencies, 0.50) * 1000,
+            'p95': _percentile(latencies, 0.95) * 1000,
+            'p99': _percentile(latencies, 0.99) * 1000,
+        }
+
+    def report(self, results):
+        self.stdout.write('')
+        self.stdout.write(f'{"服务":<6}{"并发":>6}{"请求数":>10}{"错误":>8}{"请求/秒":>10}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}')
+        for name, concurrency, stats in results:
+            self.stdout.write(
+                f'{name:<6}{concurrency:>6}{stats["requests"]:>10}{stats["errors"]:>8}{stats["rps"]:>10.0f}'
+                f'{stats["p50"]:>10.1f}{stats["p95"]:>10.1f}{stats["p99"]:>10.1f}'
+            )
+
+        # 同一并发级别下 ASGI 相对 WSGI 的吞吐变化
+        by_level = {}
+        for name, concurrency, stats in results:
+            by_level.setdefault(concurrency, {})[name] = stats['rps']
+        for concurrency, rps in sorted(by_level.items()):
+            if rps.get('wsgi') and 'asgi' in rps:
+                self.stdout.write(f'并发 {concurrency}：ASGI 吞吐为 WSGI 的 {rps["asgi"] / rps["wsgi"]:.2f} 倍')
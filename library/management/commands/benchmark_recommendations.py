@@ -0,0 +1,116 @@
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from library.recommendations import CooccurrenceMatrix, distinct_pairs
+
+
+def _synthetic_borrows(rng, borrows, readers, books):
+    """
+    生成模拟的借阅记录：读者借阅量服从对数正态分布（多数读者借得少，少数借得多，单人上限 500 本），
+    图书热度服从幂律分布（少数热门书占大部分借阅）
+    """
+    sizes = np.clip(rng.lognormal(np.log(borrows / readers) - 0.5, 1.0, readers), 1, 500).astype(np.int64)
+    sizes = np.maximum((sizes * (borrows / sizes.sum())).astype(np.int64), 1)
+    reader_ids = np.repeat(np.arange(1, readers + 1), sizes)[:borrows]
+    popularity = np.arange(1, books + 1, dtype=np.float64) ** -0.8
+    book_ids = rng.choice(np.arange(1, books + 1), size=len(reader_ids), p=popularity / popularity.sum())
+    return reader_ids, book_ids
+
+
+def _measure(func):
+    """返回 (结果, 耗时秒数, NumPy 分配的峰值内存字节数)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        '相关图书推荐引擎的基准测试：用模拟数据（不读写数据库）测量共现矩阵全量构建、'
+        '前 K 本计算、增量更新及状态文件读写的耗时和内存占用'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--borrows', type=int, default=1_000_000, help='借阅记录数')
+        parser.add_argument('--readers', type=int, default=50_000, help='读者数')
+        parser.add_argument('--books', type=int, default=20_000, help='图书数')
+        parser.add_argument('--increment', type=int, default=10_000, help='增量更新的新借阅记录数')
+        parser.add_argument('--top-k', type=int, default=20, help='每本书计算的相关图书数量')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+
+    def mb(self, value):
+        return f'{value / 1024 / 1024:.1f} MB'
+
+    def handle(self, *args, **options):
+        if min(options['borrows'], options['readers'], options['books'], options['top_k']) <= 0:
+            raise CommandError('borrows / readers / books / top-k 必须为正数')
+
+        rng = np.random.default_rng(options['seed'])
+        total = options['borrows'] + options['increment']
+        readers, books = _synthetic_borrows(rng, total, options['readers'], options['books'])
+        # 打乱顺序模拟按时间先后产生的借阅，最后一部分作为增量
+        order = rng.permutation(len(readers))
+        readers, books = readers[order], books[order]
+        base = len(readers) - options['increment']
+        distinct = len(distinct_pairs(readers[:base], books[:base])[0])
+        self.stdout.write(
+            f"模拟数据：借阅 {base} 条（去重后 {distinct} 个读者-图书组合），"
+            f"读者 {options['readers']}，图书 {options['books']}"
+        )
+
+        matrix, elapsed, peak = _measure(lambda: CooccurrenceMatrix.build(readers[:base], books[:base]))
+        self.stdout.write(
+            f'全量构建：{elapsed:.2f}s，峰值内存 {self.mb(peak)}，'
+            f'共现矩阵 {len(matrix.keys)} 个非零元，占用 {self.mb(matrix.nbytes)}'
+        )
+
+        book_ids = matrix.books()
+        rows, elapsed, peak = _measure(lambda: sum(1 for _ in matrix.top_k(book_ids, options['top_k'])))
+        self.stdout.write(f'前 {options["top_k"]} 本计算：{rows} 本图书，{elapsed:.2f}s，{rows / elapsed:.0f} 本/秒')
+
+        if options['increment'] > 0:
+            def increment():
+                new_readers, new_books = distinct_pairs(readers[base:], books[base:])
+                touched = np.isin(readers[:base], new_readers)
+                old_readers, old_books = distinct_pairs(readers[:base][touched], books[:base][touched])
+                starts = np.flatnonzero(np.r_[True, old_readers[1:] != old_readers[:-1]]) if len(old_readers) else []
+                history = {
+                    int(old_readers[lo]): old_books[lo:hi]
+                    for lo, hi in zip(starts, np.r_[starts[1:], len(old_readers)])
+                }
+                known = np.isin(
+                    (new_readers << 32) | new_books, (old_readers << 32) | old_books
+                )
+                changed = matrix.update(new_readers[~known], new_books[~known], history)
+                return matrix.affected(changed)
+
+            affected, elapsed, peak = _measure(increment)
+            _, top_elapsed, _ = _measure(lambda: sum(1 for _ in matrix.top_k(affected, options['top_k'])))
+            self.stdout.write(
+                f"增量更新 {options['increment']} 条借阅：矩阵更新 {elapsed:.2f}s（峰值内存 {self.mb(peak)}），"
+                f'受影响图书 {len(affected)} 本，重新计算前 K 本 {top_elapsed:.2f}s'
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recommender.npz')
+            _, save_elapsed, _ = _measure(lambda: matrix.save(path))
+            size = os.path.getsize(path)
+            _, load_elapsed, _ = _measure(lambda: CooccurrenceMatrix.load(path))
+        self.stdout.write(f'状态文件：{self.mb(size)}，保存 {save_elapsed:.2f}s，读取 {load_elapsed:.2f}s')
+
+        # ru_maxrss 在 Linux 上以 KB 为单位
+        self.stdout.write(self.style.SUCCESS(
+            f'进程峰值常驻内存 {self.mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)}'
+        ))
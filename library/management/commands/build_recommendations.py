@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from library.recommendations import rebuild_recommendations, update_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        '根据借阅记录更新"借过这本书的读者也借过"相关图书推荐。'
+        '默认增量更新：只计入上次运行之后的新借阅，并只重新计算受影响图书的前 K 本，适合由定时任务频繁运行；'
+        '--full 从全部借阅记录重建（首次运行、修改 K 值或删除过借阅记录之后）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='全量重建')
+        parser.add_argument(
+            '--top-k', type=int, default=settings.LIBRARY_RECOMMENDATIONS_TOP_K, help='每本书保存的相关图书数量'
+        )
+        parser.add_argument('--state', default=settings.LIBRARY_RECOMMENDER_STATE, help='共现矩阵状态文件路径')
+
+    def handle(self, *args, **options):
+        if options['top_k'] <= 0:
+            raise CommandError('top-k 必须为正数')
+
+        started = time.perf_counter()
+        build = rebuild_recommendations if options['full'] else update_recommendations
+        result = build(options['top_k'], options['state'])
+        self.stdout.write(self.style.SUCCESS(
+            f"相关图书推荐已更新：处理借阅 {result['borrows']} 条，重新计算 {result['books']} 本图书，"
+            f"写入 {result['rows']} 行，矩阵占用 {result['nbytes'] / 1024 / 1024:.1f} MB，"
+            f"耗时 {time.perf_counter() - started:.1f}s"
+        ))
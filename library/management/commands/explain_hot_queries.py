@@ -0,0 +1,64 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from library.models import ArchivedBorrow, Book, Borrow
+
+# 各数据库 EXPLAIN 输出中表示全表扫描的特征
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING (?:COVERING )?INDEX\b)\S+', re.MULTILINE),
+    'postgresql': re.compile(r'\bSeq Scan\b'),
+    'mysql': re.compile(r'\btype\W+ALL\b|\bTable scan\b', re.IGNORECASE),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        '对借书/还书/目录等热点查询执行 EXPLAIN，检查是否命中索引。'
+        '数据量很小时优化器可能仍选择全表扫描，请在接近生产规模的数据上运行'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reader', type=int, help='用于构造查询的读者 (User) ID，默认取第一条借阅记录的读者')
+        parser.add_argument('--book', type=int, help='用于构造查询的图书 ID，默认取第一本书')
+        parser.add_argument('--fail-on-scan', action='store_true', help='任一热点查询出现全表扫描时以非零状态退出')
+
+    def handle(self, *args, **options):
+        reader_id = options['reader'] or Borrow.objects.values_list('reader_id', flat=True).first() or 1
+        book_id = options['book'] or Book.objects.values_list('pk', flat=True).first() or 1
+        today = timezone.now().date()
+        active = Borrow.objects.filter(reader_id=reader_id, return_date__isnull=True)
+
+        hot_queries = [
+            ('借书：逾期检查', active.filter(due_date__lt=today)),
+            ('借书：在借数量', active),
+            ('借书/还书：重复借阅检查', active.filter(book_id=book_id)),
+            ('图书列表：批量计算 user_status', active.filter(book_id__in=[book_id]).values_list('book_id', flat=True)),
+            ('当前借阅 my_borrowed_books', active.order_by('due_date')),
+            ('借阅历史 borrow_history', Borrow.objects.filter(
+                reader_id=reader_id, return_date__isnull=False
+            ).order_by('-return_date', '-id')[:11]),
+            ('借阅历史 borrow_history（归档表）', ArchivedBorrow.objects.filter(
+                reader_id=reader_id
+            ).order_by('-return_date', '-id')[:11]),
+            ('图书目录默认排序', Book.objects.order_by('-publication_date', '-id')[:11]),
+        ]
+
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        scans = []
+        for label, queryset in hot_queries:
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(plan)
+            if pattern and pattern.search(plan):
+                scans.append(label)
+                self.stdout.write(self.style.WARNING('  ⚠ 全表扫描'))
+            self.stdout.write('')
+
+        if not scans:
+            self.stdout.write(self.style.SUCCESS('所有热点查询均命中索引'))
+        elif options['fail_on_scan']:
+            raise CommandError(f'以下热点查询出现全表扫描：{"、".join(scans)}')
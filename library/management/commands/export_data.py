@@ -0,0 +1,67 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from library.export import DEFAULT_CHUNK_SIZE, ENCODERS, export_stream
+from library.models import Borrow
+
+
+class Command(BaseCommand):
+    help = (
+        '流式导出图书目录或借阅记录（CSV / NDJSON，可选 gzip）。'
+        '按主键分块读取并逐块写出，导出数百万行时内存占用保持不变；图书导出的文件可直接用 import_catalog 导入'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=('books', 'borrows'), help='导出的数据集')
+        parser.add_argument('--format', choices=sorted(ENCODERS), default='csv', help='输出格式')
+        parser.add_argument('--gzip', action='store_true', help='gzip 压缩输出')
+        parser.add_argument('--output', '-o', default='-', help='输出文件路径，默认为标准输出')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每次从数据库读取的行数')
+        parser.add_argument('--since', help='借阅记录：借阅日期下限 (YYYY-MM-DD)')
+        parser.add_argument('--until', help='借阅记录：借阅日期上限 (YYYY-MM-DD)')
+        parser.add_argument('--status', choices=[value for value, _ in Borrow.BORROW_STATUS], help='借阅记录：只导出该状态')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('chunk-size 必须为正数')
+
+        filters = {}
+        if options['dataset'] == 'borrows':
+            for name in ('since', 'until'):
+                if options[name]:
+                    try:
+                        filters[name] = parse_date(options[name])
+                    except ValueError:
+                        filters[name] = None
+                    if filters[name] is None:
+                        raise CommandError(f'{name} 日期格式应为 YYYY-MM-DD')
+            if options['status']:
+                filters['status'] = options['status']
+        elif options['since'] or options['until'] or options['status']:
+            raise CommandError('since / until / status 只适用于借阅记录')
+
+        parts, _ = export_stream(
+            options['dataset'], options['format'], options['gzip'], options['chunk_size'], **filters
+        )
+
+        started = time.perf_counter()
+        written = 0
+        to_stdout = options['output'] == '-'
+        fp = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for part in parts:
+                fp.write(part)
+                written += len(part)
+        finally:
+            if to_stdout:
+                fp.flush()
+            else:
+                fp.close()
+
+        # 输出到标准输出时，统计信息写到标准错误，避免混入导出内容
+        (self.stderr if to_stdout else self.stdout).write(
+            f'导出完成：{written / 1024:.1f} KB，耗时 {time.perf_counter() - started:.1f}s'
+        )
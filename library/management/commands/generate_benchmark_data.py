@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from library.benchmark.data import DatasetGenerator, clear, generated_books, generated_users
+
+
+class Command(BaseCommand):
+    help = (
+        '为负载测试批量生成模拟数据（默认 100 万本图书、10 万读者、1000 万条借阅记录），全部使用批量插入。'
+        '生成的数据带固定前缀，可用 --clear 删除；请在专用的数据库上运行。'
+        '生成后可运行 rollup_circulation --all 和 build_recommendations --full 准备统计和推荐数据'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000_000, help='图书数量')
+        parser.add_argument('--readers', type=int, default=100_000, help='读者（用户）数量')
+        parser.add_argument('--borrows', type=int, default=10_000_000, help='借阅记录数量（约数）')
+        parser.add_argument('--days', type=int, default=730, help='借阅记录覆盖的天数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批写入的行数')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+        parser.add_argument('--clear', action='store_true', help='删除之前生成的数据后退出')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear(log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS('已删除生成的数据'))
+            return
+
+        if min(options['books'], options['readers'], options['borrows'], options['days'], options['batch_size']) <= 0:
+            raise CommandError('books / readers / borrows / days / batch-size 必须为正数')
+        if generated_books().exists() or generated_users().exists():
+            raise CommandError('数据库中已有生成的数据，请先运行 generate_benchmark_data --clear')
+
+        DatasetGenerator(
+            books=options['books'],
+            readers=options['readers'],
+            borrows=options['borrows'],
+            days=options['days'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        ).run()
+        self.stdout.write(self.style.SUCCESS(
+            f'图书 {generated_books().count()}，读者 {generated_users().count()}'
+        ))
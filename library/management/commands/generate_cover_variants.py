@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from library.images import build_cover_variants, save_cover_variants
+from library.models import Book
+
+
+def _init_worker():
+    # spawn 方式启动的子进程需要重新初始化 Django；fork 方式下重复调用没有副作用
+    import django
+    django.setup()
+
+
+def _build(task):
+    """在子进程中生成衍生图，只处理图片和文件，不访问数据库"""
+    book_id, name = task
+    try:
+        return book_id, build_cover_variants(name), None
+    except Exception as e:
+        return book_id, None, repr(e)
+
+
+class Command(BaseCommand):
+    help = (
+        '为已有封面批量生成缩略图和 WebP 衍生图。'
+        '图片解码、缩放、编码在多进程中并行执行，结果由主进程写回数据库；默认只处理缺失或过期的衍生图'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='并行处理的进程数')
+        parser.add_argument('--batch-size', type=int, default=200, help='每批提交给进程池的图书数量')
+        parser.add_argument('--force', action='store_true', help='重新生成所有封面的衍生图（例如修改了尺寸配置之后）')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError('workers / batch-size 必须为正数')
+
+        books = Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True).order_by('pk')
+        rows = books.values_list('pk', 'cover_image', 'cover_variants__source')
+        tasks = [(pk, name) for pk, name, source in rows.iterator() if options['force'] or source != name]
+        if not tasks:
+            self.stdout.write(self.style.SUCCESS('所有封面的衍生图均已是最新'))
+            return
+
+        # 子进程不使用数据库，fork 前关闭连接，避免与子进程共享连接
+        connections.close_all()
+
+        started = time.perf_counter()
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            for offset in range(0, len(tasks), options['batch_size']):
+                batch = tasks[offset:offset + options['batch_size']]
+                for book_id, variants, error in pool.map(_build, batch):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f'图书 {book_id} 处理失败：{error}')
+                    elif save_cover_variants(book_id, variants):
+                        done += 1
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'已处理 {offset + len(batch)}/{len(tasks)}，{(offset + len(batch)) / elapsed:.1f} 张/秒')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'衍生图生成完成：成功 {done}，失败 {failed}，耗时 {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,306 @@
+import csv
+import json
+import os
+import time
+import unicodedata
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from library.models import Author, Book, Borrow, Category, Publisher, Reservation
+from library.cache import bump_generation
+from library.circulation import adjust_stock
+from library.search import index_books
+
+# 更新已有图书时写入的字段；quantity 是可借库存（不含借出和保留中的副本），按馆藏总数的差值单独调整
+BOOK_FIELDS = ('title', 'publisher_id', 'publication_date', 'summary', 'updated_at')
+# 各字段的最大长度，与模型定义一致
+MAX_LENGTHS = {
+    'title': Book._meta.get_field('title').max_length,
+    'publisher': Publisher._meta.get_field('name').max_length,
+    'authors': Author._meta.get_field('name').max_length,
+    'categories': Category._meta.get_field('name').max_length,
+}
+FORMATS = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+
+def fold_name(name):
+    """忽略大小写和重音的比较形式，与 MySQL 默认排序规则（*_ai_ci）的名称比较方式一致"""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """流式解析顶层为数组的 JSON 文件，逐条产出元素，内存占用与文件大小无关"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # 跳过空白和分隔符
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('JSON 文件的顶层必须是数组')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        elif eof:
+            raise ValueError('JSON 数组未正确结束')
+
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def iter_ndjson(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(fp, separator):
+    for row in csv.DictReader(fp):
+        for field in ('authors', 'categories'):
+            row[field] = [name.strip() for name in (row.get(field) or '').split(separator)]
+        yield row
+
+
+class Command(BaseCommand):
+    help = (
+        '高吞吐批量导入图书目录（JSON 数组 / NDJSON / CSV，流式解析）。'
+        '出版社、作者、分类通过内存中的名称→ID 映射解析，图书和多对多关联按批 bulk_create，每批一个事务'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='数据文件路径')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())), help='文件格式，默认按扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的图书数量')
+        parser.add_argument('--update-existing', action='store_true', help='ISBN 已存在时更新图书信息及作者/分类（upsert）')
+        parser.add_argument('--list-separator', default='|', help='CSV 中 authors / categories 列的分隔符')
+        parser.add_argument('--skip-index', action='store_true', help='不更新全文检索索引（导入后可运行 rebuild_search_index）')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError('无法根据扩展名判断文件格式，请使用 --format 指定')
+        if options['batch_size'] <= 0:
+            raise CommandError('batch-size 必须为正数')
+
+        self.update_existing = options['update_existing']
+        self.skip_index = options['skip_index']
+        self.publisher_ids = {}
+        self.author_ids = {}
+        self.category_ids = {}
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0, 'invalid': 0, 'stock_conflicts': 0}
+
+        started = time.perf_counter()
+        processed = 0
+        try:
+            with open(path, encoding='utf-8', newline='') as fp:
+                if fmt == 'json':
+                    records = iter_json_array(fp)
+                elif fmt == 'ndjson':
+                    records = iter_ndjson(fp)
+                else:
+                    records = iter_csv(fp, options['list_separator'])
+
+                batch = []
+                for line_no, record in enumerate(records, 1):
+                    row = self.clean(record, line_no)
+                    if row is not None:
+                        batch.append(row)
+                    if len(batch) >= options['batch_size']:
+                        processed += self.import_batch(batch)
+                        batch = []
+                        self.report(processed, started)
+                if batch:
+                    processed += self.import_batch(batch)
+        except FileNotFoundError:
+            raise CommandError(f'找不到文件 {path}')
+        except ValueError as e:
+            raise CommandError(f'解析 {path} 失败：{e}')
+        finally:
+            # bulk_create 不触发信号，手动让目录缓存失效；中途失败时已提交的批次同样需要
+            for model in (Book, Author, Publisher, Category):
+                bump_generation(model)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：新增 {self.stats["created"]}，更新 {self.stats["updated"]}，'
+            f'跳过 {self.stats["skipped"]}，无效 {self.stats["invalid"]}，'
+            f'馆藏减少但可借库存不足而未调整 {self.stats["stock_conflicts"]}；'
+            f'耗时 {elapsed:.1f}s，{processed / elapsed if elapsed else 0:.0f} 行/秒'
+        ))
+
+    def report(self, processed, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'已处理 {processed} 行，{processed / elapsed if elapsed else 0:.0f} 行/秒')
+
+    def clean(self, record, line_no):
+        """规范化单条记录，字段与 books_data.json 一致；不合法的记录返回 None"""
+        try:
+            row = {
+                'isbn': str(record['isbn']).replace('-', '').strip(),
+                'title': record['title'].strip(),
+                'publisher': record['publisher'].strip(),
+                'authors': [name.strip() for name in record.get('authors') or [] if name and name.strip()],
+                'categories': [name.strip() for name in record.get('categories') or [] if name and name.strip()],
+                'publication_date': parse_date(str(record.get('pub_date') or record.get('publication_date') or '')),
+                'summary': record.get('summary') or '',
+                'quantity': int(record.get('quantity', 1)),
+            }
+            if not row['isbn'] or len(row['isbn']) > 13:
+                raise ValueError('ISBN 无效')
+            if row['publication_date'] is None:
+                raise ValueError('出版日期无效')
+            if row['quantity'] < 0:
+                raise ValueError('库存数量不能为负数')
+            # 超长的值会让整批写入失败（DataError），这里逐条检查
+            for field, value in (('title', row['title']), ('publisher', row['publisher'])):
+                if len(value) > MAX_LENGTHS[field]:
+                    raise ValueError(f'{field} 超过 {MAX_LENGTHS[field]} 个字符')
+            for field in ('authors', 'categories'):
+                too_long = [name for name in row[field] if len(name) > MAX_LENGTHS[field]]
+                if too_long:
+                    raise ValueError(f'{field} 中的 {too_long[0]!r} 超过 {MAX_LENGTHS[field]} 个字符')
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            self.stats['invalid'] += 1
+            self.stderr.write(f'第 {line_no} 条记录无效，已跳过：{e!r}')
+            return None
+        return row
+
+    def resolve_names(self, model, cache, names):
+        """
+        把名称解析为 ID：先查内存映射，缺失的批量插入后一次性取回
+        数据库的排序规则忽略大小写、重音时（MySQL 默认），与已有名称等价的新名称（如 José / Jose）不会插入新行，
+        取回的是已存储的写法，这里按忽略大小写和重音的形式对应回输入的名称；仍对应不上的逐个按数据库的规则查询
+        """
+        missing = {name for name in names if name not in cache}
+        if not missing:
+            return
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        folded = {}
+        for name, pk in model.objects.filter(name__in=missing).values_list('name', 'pk'):
+            cache[name] = pk
+            folded.setdefault(fold_name(name), pk)
+        for name in missing:
+            if name in cache:
+                continue
+            pk = folded.get(fold_name(name))
+            if pk is None:
+                pk = model.objects.filter(name=name).values_list('pk', flat=True).first()
+            cache[name] = pk
+
+    def import_batch(self, batch):
+        # 同一批中 ISBN 重复时以最后一条为准
+        rows = {row['isbn']: row for row in batch}
+
+        with transaction.atomic():
+            self.resolve_names(Publisher, self.publisher_ids, {row['publisher'] for row in rows.values()})
+            self.resolve_names(Author, self.author_ids, {name for row in rows.values() for name in row['authors']})
+            self.resolve_names(Category, self.category_ids, {name for row in rows.values() for name in row['categories']})
+
+            existing = dict(Book.objects.filter(isbn__in=rows).values_list('isbn', 'pk'))
+            new_books = [self.build_book(row) for isbn, row in rows.items() if isbn not in existing]
+            Book.objects.bulk_create(new_books)
+            # MySQL 的 bulk_create 不回填主键，统一按 ISBN 取回
+            created_ids = dict(
+                Book.objects.filter(isbn__in=[book.isbn for book in new_books]).values_list('isbn', 'pk')
+            )
+
+            link_ids = dict(created_ids)
+            if self.update_existing and existing:
+                updated_books = []
+                for isbn, pk in existing.items():
+                    book = self.build_book(rows[isbn])
+                    book.pk = pk
+                    updated_books.append(book)
+                Book.objects.bulk_update(updated_books, BOOK_FIELDS)
+                self.sync_stock(existing, rows)
+                Book.authors.through.objects.filter(book_id__in=existing.values()).delete()
+                Book.categories.through.objects.filter(book_id__in=existing.values()).delete()
+                link_ids.update(existing)
+                self.stats['updated'] += len(existing)
+            else:
+                self.stats['skipped'] += len(existing)
+            self.stats['created'] += len(created_ids)
+
+            Book.authors.through.objects.bulk_create([
+                Book.authors.through(book_id=book_id, author_id=self.author_ids[name])
+                for isbn, book_id in link_ids.items()
+                for name in set(rows[isbn]['authors'])
+            ], ignore_conflicts=True)
+            Book.categories.through.objects.bulk_create([
+                Book.categories.through(book_id=book_id, category_id=self.category_ids[name])
+                for isbn, book_id in link_ids.items()
+                for name in set(rows[isbn]['categories'])
+            ], ignore_conflicts=True)
+
+            # bulk_create 不触发信号，需要手动更新检索索引
+            if not self.skip_index:
+                index_books(link_ids.values())
+
+        return len(batch)
+
+    def sync_stock(self, existing, rows):
+        """
+        数据中的 quantity 是馆藏总数：与当前总数（可借库存 + 未归还的借阅 + 保留中的预约）比较，
+        差值通过 adjust_stock 调整，增加的副本优先分配给排队的预约者
+        """
+        active = Borrow.objects.filter(book=OuterRef('pk'), return_date__isnull=True)
+        held = Reservation.objects.filter(book=OuterRef('pk'), status='READY')
+        totals = Book.objects.filter(pk__in=existing.values()).annotate(
+            total=F('quantity')
+            + Coalesce(Subquery(active.order_by().values('book').annotate(n=Count('pk')).values('n')), Value(0))
+            + Coalesce(Subquery(held.order_by().values('book').annotate(n=Count('pk')).values('n')), Value(0))
+        ).values_list('isbn', 'pk', 'total')
+        by_delta = defaultdict(list)
+        for isbn, pk, total in totals:
+            delta = rows[isbn]['quantity'] - total
+            if delta:
+                by_delta[delta].append(pk)
+        for delta, book_ids in by_delta.items():
+            adjusted = adjust_stock(book_ids, delta)
+            if delta < 0 and adjusted < len(book_ids):
+                # 借出的副本尚未归还，可借库存不够扣减，保持不变
+                self.stats['stock_conflicts'] += len(book_ids) - adjusted
+                self.stderr.write(f'{len(book_ids) - adjusted} 本图书的馆藏减少 {-delta} 本，但可借库存不足，未调整')
+
+    def build_book(self, row):
+        return Book(
+            isbn=row['isbn'],
+            title=row['title'],
+            publisher_id=self.publisher_ids[row['publisher']],
+            publication_date=row['publication_date'],
+            summary=row['summary'],
+            quantity=row['quantity'],
+            # bulk_update 不会触发 auto_now，需要显式赋值
+            updated_at=timezone.now(),
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from library.models import Book, BookSearchToken
+from library.search import index_books
+
+
+class Command(BaseCommand):
+    help = '全量重建图书全文检索倒排索引（日常增量更新由信号自动完成）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批重建的图书数量')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        book_ids = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+
+        BookSearchToken.objects.exclude(book_id__in=Book.objects.values('pk')).delete()
+        for start in range(0, len(book_ids), batch_size):
+            index_books(book_ids[start:start + batch_size])
+            self.stdout.write(f'已索引 {min(start + batch_size, len(book_ids))}/{len(book_ids)} 本图书')
+
+        self.stdout.write(self.style.SUCCESS(f'索引重建完成，共 {BookSearchToken.objects.count()} 个词元'))
@@ -0,0 +1,117 @@
+import datetime
+import logging
+import os
+import random
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from library.authentication import LibraryTokenObtainPairSerializer
+from library.benchmark.data import TITLE_PHRASES, TITLE_WORDS, generated_books, generated_users
+from library.benchmark.report import compare, format_table, load_baseline, save_baseline, summarize
+from library.benchmark.scenarios import SCENARIOS, replay, serve
+
+# 检索词：完整单词、前缀、中文词组
+SEARCH_TERMS = list(TITLE_WORDS) + [word[:4] for word in TITLE_WORDS] + list(TITLE_PHRASES)
+SAMPLE_BOOKS = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        '负载测试：多个并发客户端（每个对应一位生成的读者）按比例回放目录浏览、检索、图书详情、借书/还书、'
+        '我的借阅、借阅历史等请求，按接口输出 p50/p95/p99 延迟、吞吐量和查询次数，并与保存的基线比较。'
+        '默认在本进程内启动测试服务器（关闭限流，统计查询次数）；需要先运行 generate_benchmark_data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='压测已运行的服务（不统计查询次数，需自行放宽限流）；默认在本进程内启动测试服务器')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10], help='并发客户端数，可指定多个')
+        parser.add_argument('--duration', type=float, default=30, help='每个并发级别持续的秒数')
+        parser.add_argument('--warmup', type=float, default=3, help='每个并发级别正式计时前的预热秒数')
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=sorted(SCENARIOS),
+                            help='只回放指定场景，可重复指定；默认全部场景')
+        parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+        parser.add_argument('--baseline', default=settings.LIBRARY_BENCHMARK_BASELINE, help='基线文件路径')
+        parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为新的基线')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='延迟 / 吞吐量变化超过该比例视为退化')
+        parser.add_argument('--fail-on-regression', action='store_true', help='与基线相比有退化时以错误退出')
+
+    def handle(self, *args, **options):
+        if options['duration'] <= 0 or options['warmup'] < 0 or min(options['concurrency']) <= 0:
+            raise CommandError('duration / concurrency 必须为正数，warmup 不能为负数')
+
+        rng = random.Random(options['seed'])
+        user_ids = list(generated_users().values_list('pk', flat=True))
+        book_ids = list(generated_books().order_by('?').values_list('pk', flat=True)[:SAMPLE_BOOKS])
+        if not user_ids or not book_ids:
+            raise CommandError('没有生成的数据，请先运行 generate_benchmark_data')
+        if max(options['concurrency']) > len(user_ids):
+            raise CommandError(f'并发数不能超过生成的读者数 {len(user_ids)}')
+
+        scenarios = {name: SCENARIOS[name] for name in options['scenarios']} if options['scenarios'] else SCENARIOS
+        # 库存不足、达到借阅上限等 4xx 响应是预期结果，不逐条打印警告
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        results = {}
+        if options['url']:
+            server, throttling = nullcontext(options['url'].rstrip('/')), nullcontext()
+        else:
+            # 所有客户端来自同一 IP，开启限流时几乎所有写请求都会被拒绝
+            rest_framework = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+            server, throttling = serve(), override_settings(REST_FRAMEWORK=rest_framework)
+        with throttling, server as url:
+            self.stdout.write(f'目标 {url}，图书样本 {len(book_ids)}，场景 {", ".join(scenarios)}')
+            for concurrency in options['concurrency']:
+                tokens = self.issue_tokens(rng.sample(user_ids, concurrency), options['warmup'] + options['duration'])
+                if options['warmup']:
+                    replay(url, tokens, book_ids, SEARCH_TERMS, scenarios, options['warmup'], options['seed'])
+                samples, elapsed = replay(
+                    url, tokens, book_ids, SEARCH_TERMS, scenarios, options['duration'], options['seed'],
+                )
+                for endpoint, stats in summarize(samples, elapsed).items():
+                    results[f'{endpoint}@{concurrency}'] = stats
+                total = sum(len(values) for values in samples.values())
+                self.stdout.write(f'并发 {concurrency}：{total} 个请求，{total / elapsed:.0f} 请求/秒')
+
+        self.stdout.write('')
+        for line in format_table(results):
+            self.stdout.write(line)
+
+        regressed = self.compare(results, options['baseline'], options['tolerance'])
+        if options['save_baseline']:
+            save_baseline(options['baseline'], {
+                'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                'url': options['url'] or 'in-process',
+                'duration': options['duration'],
+                'dataset': {'books': generated_books().count(), 'readers': len(user_ids)},
+                'results': results,
+            })
+            self.stdout.write(self.style.SUCCESS(f'已保存基线 {options["baseline"]}'))
+        if regressed and options['fail_on_regression']:
+            raise CommandError(f'与基线相比有 {regressed} 项指标退化')
+
+    def issue_tokens(self, user_ids, seconds):
+        """直接签发访问令牌，不经过登录接口；有效期覆盖整个压测时间"""
+        tokens = []
+        for user in User.objects.filter(pk__in=user_ids):
+            access = LibraryTokenObtainPairSerializer.get_token(user).access_token
+            access.set_exp(lifetime=datetime.timedelta(seconds=seconds + 60))
+            tokens.append(str(access))
+        return tokens
+
+    def compare(self, results, path, tolerance):
+        """打印与基线的对比，返回退化的指标数"""
+        if not os.path.exists(path):
+            self.stdout.write(f'基线文件 {path} 不存在，跳过比较（可使用 --save-baseline 保存）')
+            return 0
+        baseline = load_baseline(path)
+        rows = compare(results, baseline['results'], tolerance)
+        self.stdout.write('')
+        self.stdout.write(f'与基线比较（{baseline["created"]}，容差 {tolerance:.0%}）：')
+        for key, metric, old, new, change, regressed in rows:
+            line = f'  {key:<26}{metric:<12}{old:>10}{new:>10}{change:>+9.1%}'
+            self.stdout.write(self.style.ERROR(line + '  退化') if regressed else line)
+        return sum(1 for row in rows if row[-1])
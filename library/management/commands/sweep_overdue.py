@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from library.models import Borrow
+
+
+class Command(BaseCommand):
+    help = (
+        '将已过应还日期且未归还的借阅记录标记为 OVERDUE。'
+        '按主键分批执行集合更新，每批一个短事务，锁定范围有上限；适合由 cron / 定时任务每天运行'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批更新的记录数')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，用于降低对线上流量的影响')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要更新的记录数，不写入')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('batch-size 必须为正数')
+
+        today = timezone.now().date()
+        due = Borrow.objects.filter(status='ON_LOAN', return_date__isnull=True, due_date__lt=today)
+
+        if options['dry_run']:
+            self.stdout.write(f'共有 {due.count()} 条借阅记录需要标记为逾期')
+            return
+
+        started = time.perf_counter()
+        total = 0
+        while True:
+            # 已更新的记录不再满足条件，每批直接从 (status, due_date) 索引区间头部取，无需排序或游标
+            batch = list(due.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+
+            with transaction.atomic():
+                # 条件中再次带上状态，与并发的还书请求互不覆盖
+                total += Borrow.objects.filter(
+                    pk__in=batch, status='ON_LOAN', return_date__isnull=True
+                ).update(status='OVERDUE', updated_at=timezone.now())
+
+            self.stdout.write(f'已标记 {total} 条（耗时 {time.perf_counter() - started:.1f}s）')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'逾期扫描完成，共标记 {total} 条借阅记录为逾期'))
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from library.models import Reservation
+from library.reservations import release_copy
+
+
+class Command(BaseCommand):
+    help = (
+        '将保留已过期仍未借阅的预约标记为 EXPIRED，并把保留的副本顺延给下一位预约读者（没有人排队则回到库存）。'
+        '分批执行，每批一个短事务；适合由 cron / 定时任务每小时运行'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='每批处理的预约数')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，用于降低对线上流量的影响')
+        parser.add_argument('--dry-run', action='store_true', help='只统计过期的预约数，不写入')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('batch-size 必须为正数')
+
+        now = timezone.now()
+        expired = Reservation.objects.filter(status='READY', hold_until__lt=now)
+
+        if options['dry_run']:
+            self.stdout.write(f'共有 {expired.count()} 条预约的保留已过期')
+            return
+
+        started = time.perf_counter()
+        total = reallocated = 0
+        while True:
+            # 处理过的记录不再满足条件，每批直接从 (status, hold_until) 索引区间头部取
+            batch = list(expired.values_list('pk', 'book_id')[:batch_size])
+            if not batch:
+                break
+
+            with transaction.atomic():
+                for pk, book_id in batch:
+                    # 条件中再次带上状态，与并发的借书、取消请求互不覆盖
+                    if not Reservation.objects.filter(pk=pk, status='READY').update(status='EXPIRED', updated_at=now):
+                        continue
+                    total += 1
+                    if release_copy(book_id, now) is not None:
+                        reallocated += 1
+
+            self.stdout.write(f'已处理 {total} 条（耗时 {time.perf_counter() - started:.1f}s）')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'预约过期扫描完成：过期 {total} 条，其中 {reallocated} 本顺延给下一位预约读者'
+        ))
@@ -0,0 +1,243 @@
+"""
+请求指标与慢请求日志
+
+MetricsMiddleware 按路由（URL 名称，如 book-list、book-borrow）和请求方法记录：
+- 请求总耗时直方图及按状态码的请求数
+- 每个请求的 SQL 条数和 SQL 总耗时：每个数据库连接建立时安装一个 execute_wrapper，按上下文变量找到当前请求的计时器；
+  上下文变量随 sync_to_async 传入执行 ORM 查询的线程，ASGI 下的异步视图（异步 ORM）和同步视图同样计入
+- 视图内 SQL 以外的耗时（读接口主要是序列化）以及 DRF 响应的渲染（JSON 编码）耗时：
+  DRF 的 Response 在视图返回后、渲染之前经过 process_template_response，以此为分界
+指标保存在进程内存中，GET /api/metrics/ 以 Prometheus 文本格式输出本进程的数据；多进程部署时每个 worker 分别统计。
+流式响应（如导出）在中间件返回之后执行的查询不计入。
+
+总耗时超过 LIBRARY_SLOW_REQUEST_MS 的请求按 LIBRARY_SLOW_REQUEST_SAMPLE_RATE 抽样写入 library.slow_requests 日志，
+附带耗时最长的几条 SQL
+"""
+import contextvars
+import heapq
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+slow_request_logger = logging.getLogger('library.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# 慢请求日志中附带的 SQL 条数及每条的最大长度
+SLOW_SQL_COUNT = 3
+SLOW_SQL_LENGTH = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_format_labels(self.labels, labels)} {value}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # 标签 → [各区间的计数（非累计，最后一个为 +Inf）, 总和]
+        self.values = {}
+
+    def observe(self, labels, value):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        series[0][index] += 1
+        series[1] += value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                bucket = _format_labels(self.labels, labels, f'le="{bound}"')
+                yield f'{self.name}_bucket{bucket} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, labels)} {total}'
+            yield f'{self.name}_count{_format_labels(self.labels, labels)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        route = ('view', 'method')
+        self.requests = Counter('library_http_requests_total', '请求数', route + ('status',))
+        self.latency = Histogram(
+            'library_http_request_duration_seconds', '请求总耗时（秒）', route, LATENCY_BUCKETS
+        )
+        self.queries = Histogram('library_db_queries_per_request', '每个请求的 SQL 条数', route, QUERY_BUCKETS)
+        self.db_time = Histogram('library_db_duration_seconds', '每个请求的 SQL 总耗时（秒）', route, LATENCY_BUCKETS)
+        self.app_time = Histogram(
+            'library_app_duration_seconds', '视图内 SQL 以外的耗时（秒），读接口主要是序列化', route, LATENCY_BUCKETS
+        )
+        self.render_time = Histogram(
+            'library_render_duration_seconds', 'DRF 响应渲染耗时（秒）', route, LATENCY_BUCKETS
+        )
+        self.metrics = (self.requests, self.latency, self.queries, self.db_time, self.app_time, self.render_time)
+
+    def observe(self, view, method, status, total, queries, db_time, app_time, render_time):
+        route = (view, method)
+        with self._lock:
+            self.requests.inc(route + (str(status),))
+            self.latency.observe(route, total)
+            self.queries.observe(route, queries)
+            self.db_time.observe(route, db_time)
+            self.app_time.observe(route, app_time)
+            self.render_time.observe(route, render_time)
+
+    def render(self):
+        with self._lock:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# 当前请求的计时器，没有在处理请求时为 None
+_current_timer = contextvars.ContextVar('library_metrics_timer', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # 连接关闭后重新建立时同一个连接对象会再次触发
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class RequestTimer:
+    """单个请求的计时状态，同时由 _time_query 调用统计 SQL 条数和耗时"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_done = None
+        self.queries = 0
+        self.db_time = 0.0
+        # 耗时最长的几条 SQL：(耗时, 序号, SQL) 的小顶堆
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            item = (elapsed, self.queries, sql)
+            if len(self.slowest) < SLOW_SQL_COUNT:
+                heapq.heappush(self.slowest, item)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def finish(self, request, response):
+        finished = time.perf_counter()
+        total = finished - self.started
+        # 非 DRF 响应（如流式导出）没有单独的渲染阶段
+        view_done = self.view_done or finished
+        render_time = finished - view_done
+        app_time = max(view_done - self.started - self.db_time, 0.0)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        registry.observe(
+            view, request.method, response.status_code, total, self.queries, self.db_time, app_time, render_time,
+        )
+
+        if total * 1000 >= settings.LIBRARY_SLOW_REQUEST_MS and random.random() < settings.LIBRARY_SLOW_REQUEST_SAMPLE_RATE:
+            slowest = sorted(self.slowest, reverse=True)
+            slow_request_logger.warning(
+                '慢请求 %s %s view=%s status=%s total=%.1fms sql=%d sql_time=%.1fms app=%.1fms render=%.1fms%s',
+                request.method, request.get_full_path(), view, response.status_code, total * 1000,
+                self.queries, self.db_time * 1000, app_time * 1000, render_time * 1000,
+                ''.join(f'\n  {elapsed * 1000:.1f}ms {sql[:SLOW_SQL_LENGTH]}' for elapsed, _, sql in slowest),
+            )
+
+
+class MetricsMiddleware:
+    """应放在 MIDDLEWARE 的最前面，以便计入其余中间件的耗时"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # 异步处理链中同步的钩子会被放到线程中执行，这里换成协程版本
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = request._metrics_timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        timer.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        timer = request._metrics_timer = RequestTimer()
+        token = _current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        timer.finish(request, response)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF 的 Response 在此之后渲染
+        request._metrics_timer.view_done = time.perf_counter()
+        return response
+
+    async def aprocess_template_response(self, request, response):
+        request._metrics_timer.view_done = time.perf_counter()
+        return response
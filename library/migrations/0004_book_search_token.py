@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from library.search import build_book_tokens
+
+    Book = apps.get_model('library', 'Book')
+    BookSearchToken = apps.get_model('library', 'BookSearchToken')
+    books = Book.objects.select_related('publisher').prefetch_related('authors', 'categories')
+    rows = [
+        BookSearchToken(book=book, token=token, weight=weight)
+        for book in books.iterator(chunk_size=500)
+        for token, weight in build_book_tokens(book).items()
+    ]
+    BookSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_book_cover_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, verbose_name='词元')),
+                ('weight', models.FloatField(verbose_name='权重')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='library.book', verbose_name='图书')),
+            ],
+            options={
+                'verbose_name': '图书检索词元',
+                'verbose_name_plural': '图书检索词元',
+                'unique_together': {('token', 'book')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_book_search_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-publication_date', '-id'], name='book_pubdate_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(fields=['reader', 'return_date', 'due_date'], name='borrow_reader_ret_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(fields=['reader', '-return_date', '-id'], name='borrow_reader_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(fields=['reader', 'book', 'return_date'], name='borrow_reader_book_ret_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['reader', 'due_date'], name='borrow_active_reader_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['reader', 'book'], name='borrow_active_reader_book_idx'),
+        ),
+    ]
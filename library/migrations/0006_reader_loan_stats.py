@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+def backfill_loan_stats(apps, schema_editor):
+    Borrow = apps.get_model('library', 'Borrow')
+    Reader = apps.get_model('library', 'Reader')
+    stats = (
+        Borrow.objects.filter(return_date__isnull=True)
+        .values('reader_id')
+        .annotate(count=models.Count('id'), earliest=models.Min('due_date'))
+    )
+    for row in stats.iterator():
+        Reader.objects.filter(user_id=row['reader_id']).update(
+            active_loan_count=row['count'],
+            earliest_due_date=row['earliest'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_borrow_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reader',
+            name='active_loan_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='在借数量'),
+        ),
+        migrations.AddField(
+            model_name='reader',
+            name='earliest_due_date',
+            field=models.DateField(blank=True, null=True, verbose_name='最早应还日期'),
+        ),
+        migrations.AddField(
+            model_name='reader',
+            name='max_borrow_limit',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='留空则使用系统默认值', null=True, verbose_name='最大借阅数量'),
+        ),
+        migrations.RunPython(backfill_loan_stats, migrations.RunPython.noop),
+    ]
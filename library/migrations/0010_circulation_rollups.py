@@ -0,0 +1,83 @@
+# Generated by Django 6.0 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_book_cover_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('loans', models.PositiveIntegerField(default=0, verbose_name='借出次数')),
+            ],
+            options={
+                'verbose_name': '每日图书借阅汇总',
+                'verbose_name_plural': '每日图书借阅汇总',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategoryCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('loans', models.PositiveIntegerField(default=0, verbose_name='借出次数')),
+                ('returns', models.PositiveIntegerField(default=0, verbose_name='归还次数')),
+            ],
+            options={
+                'verbose_name': '每日分类借阅汇总',
+                'verbose_name_plural': '每日分类借阅汇总',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='日期')),
+                ('loans', models.PositiveIntegerField(default=0, verbose_name='借出次数')),
+                ('returns', models.PositiveIntegerField(default=0, verbose_name='归还次数')),
+                ('overdue_returns', models.PositiveIntegerField(default=0, verbose_name='逾期归还次数')),
+                ('loan_days', models.PositiveIntegerField(default=0, verbose_name='借阅天数合计')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='汇总时间')),
+            ],
+            options={
+                'verbose_name': '每日借阅汇总',
+                'verbose_name_plural': '每日借阅汇总',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(fields=['borrow_date'], name='borrow_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrow',
+            index=models.Index(fields=['return_date'], name='borrow_return_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailybookcirculation',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.book', verbose_name='图书'),
+        ),
+        migrations.AddField(
+            model_name='dailycategorycirculation',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.category', verbose_name='分类'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailybookcirculation',
+            unique_together={('date', 'book')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailycategorycirculation',
+            unique_together={('date', 'category')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_related_books'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('WAITING', '排队中'), ('READY', '待取书'), ('FULFILLED', '已借出'), ('CANCELLED', '已取消'), ('EXPIRED', '已过期')], default='WAITING', max_length=10, verbose_name='预约状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='预约时间')),
+                ('hold_until', models.DateTimeField(blank=True, null=True, verbose_name='保留截止时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='library.book', verbose_name='图书')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='读者')),
+            ],
+            options={
+                'verbose_name': '预约记录',
+                'verbose_name_plural': '预约记录',
+                'indexes': [models.Index(fields=['book', 'status', 'id'], name='reservation_queue_idx'), models.Index(fields=['reader', 'status'], name='reservation_reader_status_idx'), models.Index(fields=['status', 'hold_until'], name='reservation_status_hold_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['WAITING', 'READY'])), fields=('reader', 'book'), name='reservation_active_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_borrow_due_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBorrow',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('borrow_date', models.DateField(verbose_name='借阅日期')),
+                ('due_date', models.DateField(verbose_name='应还日期')),
+                ('return_date', models.DateField(verbose_name='实际归还日期')),
+                ('status', models.CharField(choices=[('ON_LOAN', '借出中'), ('RETURNED', '已归还'), ('OVERDUE', '逾期')], max_length=10, verbose_name='借阅状态')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='归档时间')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='library.book', verbose_name='图书')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='读者')),
+            ],
+            options={
+                'verbose_name': '归档借阅记录',
+                'verbose_name_plural': '归档借阅记录',
+                'indexes': [models.Index(fields=['reader', '-return_date', '-id'], name='archive_reader_history_idx'), models.Index(fields=['borrow_date'], name='archive_borrow_date_idx'), models.Index(fields=['return_date'], name='archive_return_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_archived_borrow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reader',
+            name='credentials_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='登录凭证变更时间'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 21:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0015_reader_credentials_changed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='borrow',
+            name='borrow_active_reader_due_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='borrow',
+            name='borrow_active_reader_book_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='borrow',
+            name='borrow_due_date_idx',
+        ),
+        migrations.AlterField(
+            model_name='borrow',
+            name='reader',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='读者'),
+        ),
+        migrations.AlterField(
+            model_name='borrow',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+    ]
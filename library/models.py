@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -10,6 +11,7 @@ from django.dispatch import receiver
 class Publisher(models.Model):
     """出版社模型"""
     name = models.CharField(max_length=100, unique=True, verbose_name="出版社名称")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="更新时间")
 
     def __str__(self):
         return self.name
@@ -22,6 +24,7 @@ class Author(models.Model):
     """作者模型"""
     name = models.CharField(max_length=100, unique=True, verbose_name="作者姓名")
     bio = models.TextField(blank=True, null=True, verbose_name="作者简介")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="更新时间")
 
     def __str__(self):
         return self.name
@@ -33,6 +36,7 @@ class Author(models.Model):
 class Category(models.Model):
     """图书分类模型"""
     name = models.CharField(max_length=50, unique=True, verbose_name="分类名称")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="更新时间")
 
     def __str__(self):
         return self.name
@@ -52,6 +56,9 @@ class Book(models.Model):
     summary = models.TextField(verbose_name="简介")
     quantity = models.PositiveIntegerField(default=1, verbose_name="库存数量")
     cover_image = models.ImageField(upload_to='book_covers/', blank=True, null=True, verbose_name="封面图片")
+    # 封面衍生图（缩略图 / WebP）的存储路径，由 library.images 在后台生成
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="封面衍生图")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="更新时间")
 
     def __str__(self):
         return self.title
@@ -59,6 +66,25 @@ class Book(models.Model):
     class Meta:
         verbose_name = "图书"
         verbose_name_plural = verbose_name
+        indexes = [
+            # 支撑目录默认排序与 (出版日期, id) 游标分页
+            models.Index(fields=['-publication_date', '-id'], name='book_pubdate_id_idx'),
+        ]
+
+class BookSearchToken(models.Model):
+    """图书全文检索倒排索引：每行表示一个词元出现在某本书中，weight 为按字段加权后的得分"""
+    token = models.CharField(max_length=64, verbose_name="词元")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='search_tokens', verbose_name="图书")
+    weight = models.FloatField(verbose_name="权重")
+
+    def __str__(self):
+        return f"{self.token} → {self.book_id}"
+
+    class Meta:
+        verbose_name = "图书检索词元"
+        verbose_name_plural = verbose_name
+        # (token, book) 联合唯一索引同时支撑按词元的等值 / 前缀（LIKE 'term%'）查找
+        unique_together = ('token', 'book')
 
 def default_due_date():
     return timezone.now() + timedelta(days=30)
@@ -67,10 +93,35 @@ class Reader(models.Model):
     """读者模型，扩展内置User模型"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name="用户")
     phone_number = models.CharField(max_length=15, blank=True, verbose_name="电话号码")
+    # 借阅策略：留空则使用 settings.LIBRARY_MAX_BORROW_LIMIT
+    max_borrow_limit = models.PositiveSmallIntegerField(
+        null=True, blank=True, verbose_name="最大借阅数量", help_text="留空则使用系统默认值"
+    )
+    # 冗余的借阅统计，由借书/还书在同一事务中维护，借阅资格检查只需读取本行
+    active_loan_count = models.PositiveIntegerField(default=0, verbose_name="在借数量")
+    earliest_due_date = models.DateField(null=True, blank=True, verbose_name="最早应还日期")
+    # 修改密码、管理员权限或停用账号的时间，登录时间早于它的令牌全部失效（见 library/authentication.py）
+    credentials_changed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="登录凭证变更时间")
 
     def __str__(self):
         return self.user.username
 
+    @property
+    def borrow_limit(self):
+        if self.max_borrow_limit is not None:
+            return self.max_borrow_limit
+        return settings.LIBRARY_MAX_BORROW_LIMIT
+
+    def refresh_loan_stats(self):
+        """根据借阅记录重新计算冗余统计，用于修复数据或绕过借书/还书接口修改借阅记录之后"""
+        stats = Borrow.objects.filter(reader_id=self.user_id, return_date__isnull=True).aggregate(
+            count=models.Count('id'),
+            earliest=models.Min('due_date'),
+        )
+        self.active_loan_count = stats['count']
+        self.earliest_due_date = stats['earliest']
+        self.save(update_fields=['active_loan_count', 'earliest_due_date'])
+
     class Meta:
         verbose_name = "读者"
         verbose_name_plural = verbose_name
@@ -85,11 +136,13 @@ def save_user_reader(sender, instance, **kwargs):
     # 确保 reader 存在，防止旧数据没有 reader
     if not hasattr(instance, 'reader'):
         Reader.objects.create(user=instance)
-    instance.reader.save()
+    # 只写资料字段，避免用过期的对象覆盖借阅统计
+    instance.reader.save(update_fields=['phone_number'])
 
 class Borrow(models.Model):
     """借阅记录模型"""
-    reader = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="读者")
+    # 以 reader 开头的复合索引已覆盖按读者的查询和外键约束，不再单独建索引
+    reader = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, verbose_name="读者")
     book = models.ForeignKey(Book, on_delete=models.CASCADE, verbose_name="图书")
     borrow_date = models.DateField(auto_now_add=True, verbose_name="借阅日期")
     due_date = models.DateField(default=default_due_date, verbose_name="应还日期")
@@ -106,6 +159,8 @@ class Borrow(models.Model):
         default='ON_LOAN',
         verbose_name="借阅状态"
     )
+    # 只在按读者筛选后聚合（条件 GET 的校验值），不单独建索引
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
 
     def __str__(self):
         return f"{self.reader.username} 借阅 {self.book.title}"
@@ -113,3 +168,148 @@ class Borrow(models.Model):
     class Meta:
         verbose_name = "借阅记录"
         verbose_name_plural = verbose_name
+        # 每个热点查询一个索引（见 manage.py explain_hot_queries），借书、还书的写入代价随索引数增长，不建重复的索引
+        indexes = [
+            # 逾期检查、在借数量统计、当前借阅（按应还日期排序）、借阅历史（按归还日期排序）
+            models.Index(fields=['reader', 'return_date', 'due_date'], name='borrow_reader_ret_due_idx'),
+            # 借阅历史 (归还日期, id) 游标分页，无需额外排序
+            models.Index(fields=['reader', '-return_date', '-id'], name='borrow_reader_history_idx'),
+            # 重复借阅检查、还书、批量计算 user_status
+            models.Index(fields=['reader', 'book', 'return_date'], name='borrow_reader_book_ret_idx'),
+            # 逾期扫描及按状态筛选
+            models.Index(fields=['status', 'due_date'], name='borrow_status_due_idx'),
+            # 每日汇总任务按借阅日期、归还日期取当天的记录
+            models.Index(fields=['borrow_date'], name='borrow_date_idx'),
+            models.Index(fields=['return_date'], name='borrow_return_date_idx'),
+        ]
+
+class ArchivedBorrow(models.Model):
+    """
+    已归档的借阅记录：archive_borrows 任务把归还日期早于保留期限的记录从 Borrow 移到这里，保留原 ID，
+    借阅表只剩在借和近期归还的记录，借书 / 还书 / 借阅状态查询使用的索引保持较小
+    借阅历史、推荐、每日汇总和导出同时读取两张表；归档记录不再修改
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    reader = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="读者")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, verbose_name="图书")
+    borrow_date = models.DateField(verbose_name="借阅日期")
+    due_date = models.DateField(verbose_name="应还日期")
+    return_date = models.DateField(verbose_name="实际归还日期")
+    status = models.CharField(max_length=10, choices=Borrow.BORROW_STATUS, verbose_name="借阅状态")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="归档时间")
+
+    def __str__(self):
+        return f"{self.reader.username} 借阅 {self.book.title}"
+
+    class Meta:
+        verbose_name = "归档借阅记录"
+        verbose_name_plural = verbose_name
+        indexes = [
+            # 借阅历史 (归还日期, id) 游标分页，与 Borrow 的 borrow_reader_history_idx 相同
+            models.Index(fields=['reader', '-return_date', '-id'], name='archive_reader_history_idx'),
+            # 每日汇总重算历史日期时按借阅日期、归还日期取当天的记录
+            models.Index(fields=['borrow_date'], name='archive_borrow_date_idx'),
+            models.Index(fields=['return_date'], name='archive_return_date_idx'),
+        ]
+
+class DailyCirculation(models.Model):
+    """
+    每日借阅汇总：由 rollup_circulation 任务根据借阅记录生成，统计接口只读取汇总表
+    loan_days 为当天归还的记录的借阅天数合计，用于计算平均借阅时长
+    """
+    date = models.DateField(unique=True, verbose_name="日期")
+    loans = models.PositiveIntegerField(default=0, verbose_name="借出次数")
+    returns = models.PositiveIntegerField(default=0, verbose_name="归还次数")
+    overdue_returns = models.PositiveIntegerField(default=0, verbose_name="逾期归还次数")
+    loan_days = models.PositiveIntegerField(default=0, verbose_name="借阅天数合计")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="汇总时间")
+
+    def __str__(self):
+        return f"{self.date} 借出 {self.loans} 归还 {self.returns}"
+
+    class Meta:
+        verbose_name = "每日借阅汇总"
+        verbose_name_plural = verbose_name
+
+class DailyBookCirculation(models.Model):
+    """每本书每天的借出次数，用于热门图书排行"""
+    date = models.DateField(verbose_name="日期")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, verbose_name="图书")
+    loans = models.PositiveIntegerField(default=0, verbose_name="借出次数")
+
+    class Meta:
+        verbose_name = "每日图书借阅汇总"
+        verbose_name_plural = verbose_name
+        unique_together = ('date', 'book')
+
+class DailyCategoryCirculation(models.Model):
+    """每个分类每天的借出、归还次数"""
+    date = models.DateField(verbose_name="日期")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name="分类")
+    loans = models.PositiveIntegerField(default=0, verbose_name="借出次数")
+    returns = models.PositiveIntegerField(default=0, verbose_name="归还次数")
+
+    class Meta:
+        verbose_name = "每日分类借阅汇总"
+        verbose_name_plural = verbose_name
+        unique_together = ('date', 'category')
+
+class RelatedBook(models.Model):
+    """
+    "借过这本书的读者也借过"：由 build_recommendations 根据借阅记录的共现关系预先计算，
+    每本书保存相似度最高的前 K 本，接口按 (book, rank) 索引直接读取
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='related_books', verbose_name="图书")
+    related = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name="相关图书")
+    score = models.FloatField(verbose_name="相似度")
+    rank = models.PositiveSmallIntegerField(verbose_name="排名")
+
+    class Meta:
+        verbose_name = "相关图书"
+        verbose_name_plural = verbose_name
+        unique_together = ('book', 'rank')
+
+class Reservation(models.Model):
+    """
+    预约记录：图书无库存时读者排队等候，按预约先后（id 顺序）分配归还的副本
+    WAITING 排队中 → READY 已为读者保留一本（hold_until 前借阅有效）→ FULFILLED 已借出
+    排队中或保留中可取消（CANCELLED），保留过期未借由 sweep_reservations 标记为 EXPIRED 并顺延给下一位
+    """
+    reader = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="读者")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='reservations', verbose_name="图书")
+
+    RESERVATION_STATUS = [
+        ('WAITING', '排队中'),
+        ('READY', '待取书'),
+        ('FULFILLED', '已借出'),
+        ('CANCELLED', '已取消'),
+        ('EXPIRED', '已过期'),
+    ]
+    ACTIVE_STATUS = ('WAITING', 'READY')
+    status = models.CharField(max_length=10, choices=RESERVATION_STATUS, default='WAITING', verbose_name="预约状态")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="预约时间")
+    hold_until = models.DateTimeField(null=True, blank=True, verbose_name="保留截止时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    def __str__(self):
+        return f"{self.reader.username} 预约 {self.book.title}"
+
+    class Meta:
+        verbose_name = "预约记录"
+        verbose_name_plural = verbose_name
+        indexes = [
+            # 队首查找（还书分配）和排队位置：(book, status, id) 区间内按 id 顺序
+            models.Index(fields=['book', 'status', 'id'], name='reservation_queue_idx'),
+            # 我的预约、有效预约数量
+            models.Index(fields=['reader', 'status'], name='reservation_reader_status_idx'),
+            # 保留过期扫描
+            models.Index(fields=['status', 'hold_until'], name='reservation_status_hold_idx'),
+        ]
+        constraints = [
+            # 同一读者对同一本书只能有一条有效预约（MySQL 不支持带条件的约束，由接口在锁内检查）
+            models.UniqueConstraint(
+                fields=['reader', 'book'],
+                condition=models.Q(status__in=['WAITING', 'READY']),
+                name='reservation_active_unique',
+            ),
+        ]
@@ -0,0 +1,191 @@
+import base64
+import json
+from itertools import chain
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, aprefetch_related_objects, prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    基于 (排序字段, 主键) 的游标分页：
+    - 不执行 COUNT(*)，也不使用 OFFSET，翻到多深都只扫描一页的数据
+    - 游标记录上一页边界行的 (排序值, id)，并发插入新数据不会导致翻页重复或遗漏
+    ordering 为两个同方向的字段，第二个必须是唯一的 id
+    """
+    ordering = ('-id', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = '无效的游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """异步视图使用的版本，当前页通过异步 ORM 读取"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        """根据游标构造当前页的查询（多取一行用于判断是否还有下一页）"""
+        key, tiebreak = (field.lstrip('-') for field in self.ordering)
+        descending = self.ordering[0].startswith('-')
+        cursor = self.decode_cursor(request, queryset.model, key)
+
+        reverse = False
+        if cursor is not None:
+            value, pk, reverse = cursor
+            # 向后翻页取边界之后的行，向前翻页取边界之前的行
+            after = descending != reverse
+            op = 'lt' if after else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{key}__{op}': value}) | Q(**{key: value, f'{tiebreak}__{op}': pk})
+            )
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        self.key, self.tiebreak = key, tiebreak
+        self.cursor, self.reverse = cursor, reverse
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def set_page(self, results):
+        """由多取的一行判断是否还有更多数据，记录当前页供生成翻页链接"""
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def decode_cursor(self, request, model, key):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value = model._meta.get_field(key).to_python(data['v'])
+            pk = int(data['id'])
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk, reverse
+
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.key)
+        data = {'v': value.isoformat() if hasattr(value, 'isoformat') else value, 'id': getattr(obj, self.tiebreak)}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    数据分布在多张结构相同、id 互不重复的表中时的游标分页，paginate_queryset 接收查询集的列表：
+    - 每张表按同一游标各取一页（每表一次查询，走各自的索引），合并排序后取前 page_size 行
+    - 预加载（prefetch_related）推迟到合并之后对当前页统一执行一次，查询数不随表的数量增加
+    """
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        pages, lookups = [], []
+        for queryset in querysets:
+            lookups = queryset._prefetch_related_lookups
+            pages.append(list(self.get_page_queryset(queryset.prefetch_related(None), request)))
+        page = self.set_page(self.merge(pages))
+        prefetch_related_objects(page, *lookups)
+        return page
+
+    async def apaginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        pages, lookups = [], []
+        for queryset in querysets:
+            lookups = queryset._prefetch_related_lookups
+            pages.append([obj async for obj in self.get_page_queryset(queryset.prefetch_related(None), request)])
+        page = self.set_page(self.merge(pages))
+        await aprefetch_related_objects(page, *lookups)
+        return page
+
+    def merge(self, pages):
+        """按当前页的实际排序方向合并各表的结果，保留 page_size + 1 行供判断是否还有更多数据"""
+        descending = self.ordering[0].startswith('-') != self.reverse
+        rows = sorted(chain.from_iterable(pages), key=attrgetter(self.key, self.tiebreak), reverse=descending)
+        return rows[:self.page_size + 1]
+
+
+class BookCursorPagination(KeysetPagination):
+    """图书目录：按出版日期倒序"""
+    ordering = ('-publication_date', '-id')
+
+
+class BorrowHistoryCursorPagination(MergedKeysetPagination):
+    """借阅历史：借阅表与归档表合并，按归还日期倒序"""
+    ordering = ('-return_date', '-id')
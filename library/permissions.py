@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -13,3 +16,18 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 
         # 否则，必须是管理员
         return request.user and request.user.is_staff
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """
+    指标抓取令牌：请求头 Authorization: Metrics <LIBRARY_METRICS_TOKEN>
+    供 Prometheus 等无法登录的采集程序使用，未配置令牌时不放行
+    """
+    keyword = 'Metrics'
+
+    def has_permission(self, request, view):
+        token = settings.LIBRARY_METRICS_TOKEN
+        if not token:
+            return False
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme == self.keyword and hmac.compare_digest(credentials.strip().encode(), token.encode())
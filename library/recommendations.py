@@ -0,0 +1,347 @@
+"""
+"借过这本书的读者也借过"：基于借阅记录 (读者 × 图书) 共现关系的图书推荐
+
+- 共现矩阵 C[a, b] 为同时借过 a 和 b 的读者数，以 NumPy 数组保存为按键排序的稀疏形式：
+  键为 (a << 32) | b，同一本书的所有邻居在数组中连续，可用二分查找直接定位（相当于 CSR）
+- 相似度使用余弦：C[a, b] / sqrt(n[a] * n[b])，n 为借过该书的读者数
+- 矩阵状态连同已处理的最大借阅记录 ID 保存在 LIBRARY_RECOMMENDER_STATE 文件中，
+  增量更新只读取新增的借阅记录，以及涉及读者此前的借阅，不重新扫描全部历史
+- 主键按分配顺序递增，但事务不按这个顺序提交：ID 较小的借阅可能在更大的 ID 已被读取之后才提交。
+  增量更新会重新读取最大 ID 之前 WATERMARK_MARGIN 条以内的记录，状态中同时保存这一范围内已计入的 ID，
+  只把其中尚未计入的（晚提交的）记录当作新增
+- 已归档的借阅记录保留原 ID，构建和增量更新都同时读取借阅表和归档表
+- 每本书得分最高的前 K 本预先写入 RelatedBook 表，接口查询只需按索引读取
+"""
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedBorrow, Book, Borrow, RelatedBook
+
+KEY_SHIFT = 32
+KEY_MASK = (1 << KEY_SHIFT) - 1
+# 全量构建时每批生成的共现对数量上限，控制峰值内存
+PAIR_CHUNK_SIZE = 4_000_000
+# 至少有这么多读者同时借过才认为两本书相关
+MIN_SUPPORT = 1
+# 从数据库分块读取借阅记录的行数
+LOAD_CHUNK_SIZE = 50_000
+# 增量更新时查询读者历史借阅的每批读者数（IN 列表长度）
+HISTORY_BATCH_SIZE = 500
+# 写入 RelatedBook 时每个事务处理的图书数
+STORE_BATCH_SIZE = 500
+# 增量更新时回看的 ID 范围：在这么多条之后才提交的借阅记录仍会漏记，需全量重建校正
+WATERMARK_MARGIN = 10_000
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _pair_keys(readers, books):
+    """
+    readers / books 已按读者排序并去重，返回同一读者名下两两组合 (a, b)（a != b，两个方向都有）的键
+    每位读者贡献 s * (s - 1) 个键，s 为该读者借过的图书数
+    """
+    if len(readers) == 0:
+        return _EMPTY
+    starts = np.flatnonzero(np.r_[True, readers[1:] != readers[:-1]])
+    sizes = np.diff(np.r_[starts, len(readers)])
+    # 每条记录重复其所在分组大小次，与分组内每条记录配对
+    repeat = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(len(books)), repeat)
+    offset = np.arange(len(left)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+    right = np.repeat(np.repeat(starts, sizes), repeat) + offset
+    keep = left != right
+    return (books[left[keep]] << KEY_SHIFT) | books[right[keep]]
+
+
+def distinct_pairs(readers, books):
+    """去掉重复借阅同一本书的记录，返回按 (读者, 图书) 排序的数组"""
+    pairs = np.unique((readers.astype(np.int64) << KEY_SHIFT) | books.astype(np.int64))
+    return pairs >> KEY_SHIFT, pairs & KEY_MASK
+
+
+class CooccurrenceMatrix:
+    """对称的稀疏共现矩阵及每本书的借阅读者数"""
+
+    def __init__(self, keys=None, counts=None, item_counts=None, watermark=0, recent_ids=_EMPTY):
+        self.keys = _EMPTY if keys is None else keys
+        self.counts = np.empty(0, dtype=np.int32) if counts is None else counts
+        self.item_counts = np.zeros(0, dtype=np.int32) if item_counts is None else item_counts
+        # 已计入矩阵的最大借阅记录 ID
+        self.watermark = int(watermark)
+        # (watermark - WATERMARK_MARGIN, watermark] 范围内已计入的 ID（已排序）；更早的 ID 全部视为已计入
+        # 为 None 表示旧版本状态文件，不回看
+        self.recent_ids = recent_ids
+
+    def advance(self, ids):
+        """把新计入的借阅记录 ID 并入水位线及回看范围内的已计入 ID"""
+        if not len(ids):
+            return
+        self.watermark = max(self.watermark, int(ids.max()))
+        recent = np.union1d(_EMPTY if self.recent_ids is None else self.recent_ids, ids)
+        self.recent_ids = recent[recent > self.watermark - WATERMARK_MARGIN]
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.counts.nbytes + self.item_counts.nbytes
+
+    @classmethod
+    def build(cls, readers, books, ids=_EMPTY):
+        """
+        由 (读者, 图书) 借阅记录全量构建，ids 为这些记录的 ID；
+        按读者分批生成共现对，单批内存不超过 PAIR_CHUNK_SIZE 个键
+        """
+        readers, books = distinct_pairs(readers, books)
+        matrix = cls()
+        matrix.advance(ids)
+        matrix._count_items(books)
+        if len(readers) == 0:
+            return matrix
+
+        starts = np.flatnonzero(np.r_[True, readers[1:] != readers[:-1]])
+        ends = np.r_[starts[1:], len(readers)]
+        # 按累计共现对数量把读者分批；借阅量特别大的读者单独成批
+        cost = (ends - starts) ** 2
+        batches = (np.cumsum(cost) - cost) // PAIR_CHUNK_SIZE
+        bounds = np.flatnonzero(np.r_[True, batches[1:] != batches[:-1]])
+        for first, last in zip(bounds, np.r_[bounds[1:], len(starts)]):
+            lo, hi = starts[first], ends[last - 1]
+            # 每批结果直接合并进矩阵，峰值内存约为矩阵本身的两倍，而不是全部共现对的总量
+            keys, counts = np.unique(_pair_keys(readers[lo:hi], books[lo:hi]), return_counts=True)
+            matrix._merge(keys, counts.astype(np.int32))
+        return matrix
+
+    def _count_items(self, books):
+        if len(books) == 0:
+            return
+        size = int(books.max()) + 1
+        if size > len(self.item_counts):
+            self.item_counts = np.concatenate([self.item_counts, np.zeros(size - len(self.item_counts), dtype=np.int32)])
+        np.add.at(self.item_counts, books, 1)
+
+    def update(self, readers, books, history):
+        """
+        增量计入新的借阅：
+        - readers / books 为新增的 (读者, 图书) 组合，已去重，且不包含读者以前借过的书
+        - history 为 {读者: 此前借过的图书数组}
+        返回借阅读者数发生变化的图书 ID
+        """
+        readers, books = distinct_pairs(readers, books)
+        if len(readers) == 0:
+            return _EMPTY
+
+        parts = []
+        starts = np.flatnonzero(np.r_[True, readers[1:] != readers[:-1]])
+        for lo, hi in zip(starts, np.r_[starts[1:], len(readers)]):
+            new = books[lo:hi]
+            prior = history.get(int(readers[lo]), _EMPTY)
+            if len(prior):
+                # 新借的书与以前借过的书两两共现（两个方向）
+                a, b = np.repeat(new, len(prior)), np.tile(prior, len(new))
+                parts.append((a << KEY_SHIFT) | b)
+                parts.append((b << KEY_SHIFT) | a)
+            if len(new) > 1:
+                parts.append(_pair_keys(readers[lo:hi], new))
+
+        self._count_items(books)
+        if parts:
+            delta_keys, delta_counts = np.unique(np.concatenate(parts), return_counts=True)
+            self._merge(delta_keys, delta_counts.astype(np.int32))
+        return np.unique(books)
+
+    def _merge(self, keys, counts):
+        # 已有的键原地累加，新键按排序位置插入
+        pos = np.searchsorted(self.keys, keys)
+        found = pos < len(self.keys)
+        found[found] = self.keys[pos[found]] == keys[found]
+        self.counts[pos[found]] += counts[found]
+        missing = ~found
+        if missing.any():
+            self.keys = np.insert(self.keys, pos[missing], keys[missing])
+            self.counts = np.insert(self.counts, pos[missing], counts[missing])
+
+    def _row_bounds(self, book_ids):
+        book_ids = np.asarray(book_ids, dtype=np.int64)
+        return (
+            np.searchsorted(self.keys, book_ids << KEY_SHIFT),
+            np.searchsorted(self.keys, (book_ids + 1) << KEY_SHIFT),
+        )
+
+    def books(self):
+        """有共现关系的全部图书 ID"""
+        return np.unique(self.keys >> KEY_SHIFT)
+
+    def affected(self, book_ids):
+        """
+        借阅读者数变化会改变这些书与所有邻居之间的相似度，
+        需要重新计算前 K 本的图书为这些书本身及它们的全部邻居
+        """
+        lows, highs = self._row_bounds(book_ids)
+        neighbours = [self.keys[lo:hi] & KEY_MASK for lo, hi in zip(lows, highs)]
+        return np.unique(np.concatenate([np.asarray(book_ids, dtype=np.int64)] + neighbours))
+
+    def top_k(self, book_ids, k, valid=None):
+        """
+        逐本计算相似度最高的 k 本，产出 (图书 ID, 相关图书 ID 数组, 得分数组)
+        valid 为按图书 ID 索引的布尔数组（长度不小于 item_counts），用于排除已删除的图书
+        """
+        lows, highs = self._row_bounds(book_ids)
+        for book_id, lo, hi in zip(book_ids, lows, highs):
+            neighbours = self.keys[lo:hi] & KEY_MASK
+            counts = self.counts[lo:hi]
+            keep = counts >= MIN_SUPPORT
+            if valid is not None:
+                keep &= valid[neighbours]
+            neighbours, counts = neighbours[keep], counts[keep]
+            if not len(neighbours):
+                yield int(book_id), _EMPTY, np.empty(0)
+                continue
+            scores = counts / np.sqrt(float(self.item_counts[book_id]) * self.item_counts[neighbours])
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                neighbours, scores = neighbours[top], scores[top]
+            # 得分相同的按图书 ID 排序，结果稳定
+            order = np.lexsort((neighbours, -scores))
+            yield int(book_id), neighbours[order], scores[order]
+
+    def save(self, path):
+        """先写临时文件再替换，读取方不会看到写了一半的文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                np.savez(
+                    fp, keys=self.keys, counts=self.counts, item_counts=self.item_counts,
+                    watermark=np.array(self.watermark, dtype=np.int64),
+                    recent_ids=_EMPTY if self.recent_ids is None else self.recent_ids,
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """状态文件不存在时返回 None"""
+        try:
+            data = np.load(path)
+        except FileNotFoundError:
+            return None
+        with data:
+            recent_ids = data['recent_ids'] if 'recent_ids' in data.files else None
+            return cls(data['keys'], data['counts'], data['item_counts'], int(data['watermark']), recent_ids)
+
+
+def load_borrows(min_id=0, chunk_size=LOAD_CHUNK_SIZE):
+    """按主键分块读取 ID 大于 min_id 的借阅记录（包括已归档的），返回 (ID, 读者, 图书) 三个数组"""
+    chunks = []
+    for model in (ArchivedBorrow, Borrow):
+        last_pk = min_id
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'reader_id', 'book_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+            last_pk = rows[-1][0]
+    if not chunks:
+        return _EMPTY, _EMPTY, _EMPTY
+    # 两张表之间读取的间隙中被归档的记录可能读到两次
+    data = np.unique(np.concatenate(chunks), axis=0)
+    return data[:, 0], data[:, 1], data[:, 2]
+
+
+def load_history(reader_ids, max_id, exclude_ids=()):
+    """给定读者在 ID 不超过 max_id 的借阅记录（不含 exclude_ids）中借过的图书：{读者: 图书数组}"""
+    history = {}
+    reader_ids = [int(reader_id) for reader_id in reader_ids]
+    exclude_ids = [int(pk) for pk in exclude_ids]
+    for start in range(0, len(reader_ids), HISTORY_BATCH_SIZE):
+        batch = reader_ids[start:start + HISTORY_BATCH_SIZE]
+        for model in (ArchivedBorrow, Borrow):
+            rows = model.objects.filter(reader_id__in=batch, pk__lte=max_id).exclude(pk__in=exclude_ids)
+            rows = rows.values_list('reader_id', 'book_id').distinct()
+            for reader_id, book_id in rows:
+                history.setdefault(reader_id, set()).add(book_id)
+    return {reader_id: np.fromiter(books, dtype=np.int64) for reader_id, books in history.items()}
+
+
+def store_related(matrix, book_ids, k):
+    """重新计算并替换给定图书的前 K 本相关图书，返回写入的行数"""
+    existing = np.fromiter(Book.objects.values_list('pk', flat=True).iterator(), dtype=np.int64)
+    valid = np.zeros(max(len(matrix.item_counts), int(existing.max()) + 1 if len(existing) else 0), dtype=bool)
+    valid[existing] = True
+    book_ids = [int(book_id) for book_id in book_ids if valid[book_id]]
+
+    written = 0
+    for start in range(0, len(book_ids), STORE_BATCH_SIZE):
+        batch = book_ids[start:start + STORE_BATCH_SIZE]
+        rows = [
+            RelatedBook(book_id=book_id, related_id=int(related_id), score=float(score), rank=rank)
+            for book_id, related, scores in matrix.top_k(batch, k, valid)
+            for rank, (related_id, score) in enumerate(zip(related, scores), start=1)
+        ]
+        with transaction.atomic():
+            RelatedBook.objects.filter(book_id__in=batch).delete()
+            RelatedBook.objects.bulk_create(rows)
+        written += len(rows)
+    return written
+
+
+def rebuild_recommendations(k=None, path=None):
+    """全量重建共现矩阵和全部图书的相关推荐"""
+    k = k or settings.LIBRARY_RECOMMENDATIONS_TOP_K
+    path = path or settings.LIBRARY_RECOMMENDER_STATE
+    ids, readers, books = load_borrows()
+    matrix = CooccurrenceMatrix.build(readers, books, ids)
+    matrix.save(path)
+
+    book_ids = matrix.books()
+    # 不再有共现关系的图书（如借阅记录被删除）清空推荐
+    stale = sorted(set(RelatedBook.objects.values_list('book_id', flat=True).distinct()) - set(book_ids.tolist()))
+    for start in range(0, len(stale), STORE_BATCH_SIZE):
+        RelatedBook.objects.filter(book_id__in=stale[start:start + STORE_BATCH_SIZE]).delete()
+    written = store_related(matrix, book_ids, k)
+    return {'borrows': len(ids), 'books': len(book_ids), 'rows': written, 'nbytes': matrix.nbytes}
+
+
+def update_recommendations(k=None, path=None):
+    """
+    增量更新：只处理上次更新之后新增的借阅记录，并只重新计算受影响图书的相关推荐
+    没有状态文件（首次运行或文件丢失）时执行全量重建
+    借阅记录被删除不会从矩阵中扣除，可定期运行全量重建校正
+    """
+    k = k or settings.LIBRARY_RECOMMENDATIONS_TOP_K
+    path = path or settings.LIBRARY_RECOMMENDER_STATE
+    matrix = CooccurrenceMatrix.load(path)
+    if matrix is None:
+        return rebuild_recommendations(k, path)
+
+    if matrix.recent_ids is None:
+        ids, readers, books = load_borrows(matrix.watermark)
+    else:
+        ids, readers, books = load_borrows(max(matrix.watermark - WATERMARK_MARGIN, 0))
+        fresh = ~np.isin(ids, matrix.recent_ids)
+        ids, readers, books = ids[fresh], readers[fresh], books[fresh]
+    if not len(ids):
+        return {'borrows': 0, 'books': 0, 'rows': 0, 'nbytes': matrix.nbytes}
+
+    # 晚提交的记录 ID 不超过水位线，不能算作读者以前的借阅
+    late = ids[ids <= matrix.watermark]
+    readers, books = distinct_pairs(readers, books)
+    history = load_history(np.unique(readers), matrix.watermark, exclude_ids=late)
+    # 以前借过的书再次借阅不产生新的共现
+    known = np.concatenate([_EMPTY] + [(reader_id << KEY_SHIFT) | prior for reader_id, prior in history.items()])
+    new = ~np.isin((readers << KEY_SHIFT) | books, known)
+    changed = matrix.update(readers[new], books[new], history)
+    matrix.advance(ids)
+    matrix.save(path)
+
+    affected = matrix.affected(changed)
+    written = store_related(matrix, affected, k)
+    return {'borrows': len(ids), 'books': len(affected), 'rows': written, 'nbytes': matrix.nbytes}
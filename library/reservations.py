@@ -0,0 +1,69 @@
+"""
+图书预约队列
+
+- 排队顺序即预约记录的 id 顺序，队首通过 (book, status, id) 索引直接定位，不需要排序整个队列
+- 一本副本空出（还书、保留被取消或过期）时，在同一事务中分配给队首读者并为其保留，队列为空时才回到库存
+- 修改队列前先锁定图书行，预约与还书互相串行，不会出现有库存却有人在排队的情况
+- 同时涉及读者行的事务（借书、还书、预约、批量归还）一律先锁定读者行再锁定图书行，避免互相等待造成死锁
+"""
+import operator
+from datetime import timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .cache import invalidate_stock
+from .models import Book, Reservation
+
+
+def waiting_queue(book_id):
+    return Reservation.objects.filter(book_id=book_id, status='WAITING')
+
+
+def lock_book(book_id):
+    """锁定图书行并返回当前库存，必须在事务中调用"""
+    return Book.objects.select_for_update().filter(pk=book_id).values_list('quantity', flat=True).first()
+
+
+def release_copy(book_id, now=None):
+    """
+    一本副本空出：分配给队首读者（状态改为 READY 并设置保留截止时间），没有人排队则库存加一
+    必须在事务中调用；返回获得保留的预约，回到库存时返回 None
+    """
+    now = now or timezone.now()
+    lock_book(book_id)
+    head = waiting_queue(book_id).order_by('id').first()
+    if head is not None:
+        head.status = 'READY'
+        head.hold_until = now + timedelta(days=settings.LIBRARY_RESERVATION_HOLD_DAYS)
+        head.save(update_fields=['status', 'hold_until', 'updated_at'])
+        return head
+
+    Book.objects.filter(pk=book_id).update(quantity=F('quantity') + 1, updated_at=now)
+    transaction.on_commit(lambda: invalidate_stock(book_id))
+    return None
+
+
+def queue_positions(reservations):
+    """
+    排队中的预约的位置（从 1 开始）：只统计同一本书排在前面的 WAITING 记录，
+    在 (book, status, id) 索引区间内计数，代价与前面的人数成正比而不是整个队列；
+    多条预约合并为一次查询，每条预约对应一个带条件的计数
+    返回 {预约 ID: 位置}
+    """
+    waiting = [reservation for reservation in reservations if reservation.status == 'WAITING']
+    if not waiting:
+        return {}
+    ahead = {
+        f'ahead_{reservation.pk}': Q(book_id=reservation.book_id, pk__lt=reservation.pk)
+        for reservation in waiting
+    }
+    counts = (
+        Reservation.objects.filter(status='WAITING')
+        .filter(reduce(operator.or_, ahead.values()))
+        .aggregate(**{alias: Count('pk', filter=condition) for alias, condition in ahead.items()})
+    )
+    return {reservation.pk: counts[f'ahead_{reservation.pk}'] + 1 for reservation in waiting}
@@ -0,0 +1,225 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework import filters
+
+from .models import Author, Book, BookSearchToken, Category, Publisher
+
+# 各字段命中时的权重，ISBN 精确度最高，书名次之
+FIELD_WEIGHTS = {
+    'isbn': 5.0,
+    'title': 3.0,
+    'authors': 2.0,
+    'publisher': 1.0,
+    'categories': 1.0,
+}
+# 前缀命中（如输入 "pyth" 命中 "python"）的得分折扣
+PREFIX_MATCH_FACTOR = 0.5
+# 单次检索最多返回的候选数量，以及参与检索的最多词元数
+SEARCH_RESULT_LIMIT = 500
+MAX_QUERY_TERMS = 10
+TOKEN_MAX_LENGTH = BookSearchToken._meta.get_field('token').max_length
+
+# 不以空格分词的文字（日文假名、中日韩统一表意文字），按字 / 二元组切分
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff'
+# 其余文字（带变音符的拉丁字母、西里尔字母、谚文等）按 Unicode 字母数字的连续串切分，下划线视为分隔符
+_TOKEN_RE = re.compile(rf'[{_CJK_CHARS}]+|[^\W_{_CJK_CHARS}]+', re.UNICODE)
+_CJK_RE = re.compile(rf'[{_CJK_CHARS}]')
+_ISBN_HYPHEN_RE = re.compile(r'(?<=\d)[-\s](?=\d)')
+
+
+def tokenize(text, for_query=False):
+    """
+    将文本切分为词元：
+    - 统一做 NFKC 规范化并 casefold，数字之间的连字符（如 ISBN）会被去掉
+    - 字母和数字按连续串切分（"café"、"müller" 保持完整）
+    - 中文和日文假名按字切分：建索引时同时生成单字和二元组，检索时优先使用二元组以提高精度
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    text = _ISBN_HYPHEN_RE.sub('', text)
+
+    tokens = []
+    for word in _TOKEN_RE.findall(text):
+        if not _CJK_RE.match(word):
+            tokens.append(word[:TOKEN_MAX_LENGTH])
+            continue
+        bigrams = [word[i:i + 2] for i in range(len(word) - 1)]
+        if for_query:
+            tokens.extend(bigrams or [word])
+        else:
+            tokens.extend(word)
+            tokens.extend(bigrams)
+    return tokens
+
+
+def build_book_tokens(book):
+    """计算一本书的 {词元: 权重}，要求 publisher / authors / categories 已预加载"""
+    return field_token_weights({
+        'isbn': [book.isbn],
+        'title': [book.title],
+        'authors': [author.name for author in book.authors.all()],
+        'publisher': [book.publisher.name],
+        'categories': [category.name for category in book.categories.all()],
+    })
+
+
+def field_token_weights(fields):
+    """按字段计算 {词元: 权重}，fields 为 {字段名: [取值, ...]}，供不经过 ORM 的批量生成数据使用"""
+    weights = defaultdict(float)
+    for field, values in fields.items():
+        # 同一字段内重复出现的词元只计一次，避免长书名刷分
+        tokens = {token for value in values for token in tokenize(value)}
+        for token in tokens:
+            weights[token] += FIELD_WEIGHTS[field]
+    return weights
+
+
+def index_books(book_ids):
+    """重建指定图书的倒排索引（整批替换）"""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return
+    books = (
+        Book.objects.filter(pk__in=book_ids)
+        .select_related('publisher')
+        .prefetch_related('authors', 'categories')
+    )
+    rows = [
+        BookSearchToken(book_id=book.pk, token=token, weight=weight)
+        for book in books
+        for token, weight in build_book_tokens(book).items()
+    ]
+    with transaction.atomic():
+        BookSearchToken.objects.filter(book_id__in=book_ids).delete()
+        BookSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+def _ranked_book_ids(query, limit):
+    """构造按相关度排序的图书 ID 查询；检索词为空时返回 None"""
+    terms = list(dict.fromkeys(tokenize(query, for_query=True)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+
+    term_filters = [Q(token__startswith=term) for term in terms]
+
+    match = Q()
+    for term_filter in term_filters:
+        match |= term_filter
+
+    score_cases = []
+    for term, term_filter in zip(terms, term_filters):
+        score_cases.append(When(token=term, then=F('weight')))
+        score_cases.append(When(term_filter, then=F('weight') * PREFIX_MATCH_FACTOR))
+    coverage = {
+        f'term_{i}': Max(Case(When(term_filter, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, term_filter in enumerate(term_filters)
+    }
+
+    ranked = (
+        BookSearchToken.objects.filter(match)
+        .values('book_id')
+        .annotate(score=Sum(Case(*score_cases, default=Value(0.0), output_field=FloatField())), **coverage)
+        .filter(**{name: 1 for name in coverage})
+        .order_by('-score', 'book_id')
+        .values_list('book_id', flat=True)
+    )
+    return ranked[:limit]
+
+
+def search_book_ids(query, limit=SEARCH_RESULT_LIMIT):
+    """
+    按相关度返回匹配的图书 ID 列表：
+    - 每个检索词都必须命中（等值或前缀），即 AND 语义
+    - 得分为命中词元的字段权重之和，前缀命中打折
+    只扫描倒排索引中与检索词相关的区间，不需要遍历图书表
+    """
+    ranked = _ranked_book_ids(query, limit)
+    return list(ranked) if ranked is not None else []
+
+
+async def asearch_book_ids(query, limit=SEARCH_RESULT_LIMIT):
+    """search_book_ids 的异步版本"""
+    ranked = _ranked_book_ids(query, limit)
+    return [book_id async for book_id in ranked] if ranked is not None else []
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    使用倒排索引替代 SearchFilter 的多表 LIKE 扫描，
+    沿用 ?search= 参数，结果按相关度排序
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return self.filter_by_ranking(queryset, search_book_ids(query))
+
+    async def afilter_queryset(self, request, queryset, view):
+        """异步视图使用的版本，检索查询通过异步 ORM 执行"""
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return self.filter_by_ranking(queryset, await asearch_book_ids(query))
+
+    def filter_by_ranking(self, queryset, book_ids):
+        """只保留命中的图书，并按检索结果中的先后顺序排序"""
+        if not book_ids:
+            return queryset.none()
+        ranking = Case(
+            *[When(pk=book_id, then=Value(position)) for position, book_id in enumerate(book_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=book_ids).order_by(ranking)
+
+
+# --- 增量维护索引 ---
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_books([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.categories.through)
+def index_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_books([instance.pk])
+    elif action == 'pre_clear':
+        # 反向 clear 时 pk_set 为空，需要先记录受影响的书籍
+        instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        index_books(getattr(instance, '_search_book_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        index_books(pk_set or ())
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Publisher)
+def index_renamed_related(sender, instance, created, raw=False, **kwargs):
+    # 新建的作者/分类/出版社还没有关联图书
+    if not created and not raw:
+        index_books(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Category)
+def remember_related_books(sender, instance, **kwargs):
+    # 删除作者/分类时关联行被级联删除且不会触发 m2m_changed，需在删除前记录受影响的书籍
+    instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Category)
+def index_after_related_delete(sender, instance, **kwargs):
+    index_books(getattr(instance, '_search_book_ids', ()))
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
-from .models import Book, Author, Publisher, Category, Borrow, Reader
+from django.core.files.storage import default_storage
+from .models import Book, Author, Publisher, Category, Borrow, Reader, Reservation
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -29,7 +31,7 @@ class UserSerializer(serializers.ModelSerializer):
             if not hasattr(user, 'reader'):
                 Reader.objects.create(user=user)
             user.reader.phone_number = phone_number
-            user.reader.save()
+            user.reader.save(update_fields=['phone_number'])
             
         return user
 
@@ -52,10 +54,60 @@ class UserSerializer(serializers.ModelSerializer):
             if not hasattr(instance, 'reader'):
                 Reader.objects.create(user=instance)
             instance.reader.phone_number = phone_number
-            instance.reader.save()
+            instance.reader.save(update_fields=['phone_number'])
 
         return instance
 
+class SparseFieldsetMixin:
+    """
+    稀疏字段集：视图把需要输出的顶层字段放在 context['sparse_fields'] 中，其余字段不参与序列化
+    - ?fields=a,b 只返回指定字段
+    - ?expand=a,b 在默认字段（default_fields，未设置时为全部字段）之外追加字段
+    嵌套在其他序列化器中时不做裁剪
+    """
+    default_fields = None
+
+    @classmethod
+    def parse_sparse_fields(cls, fields=None, expand=None):
+        """解析查询参数，返回需要输出的字段集合；None 表示输出全部字段"""
+        if fields is None and expand is None and cls.default_fields is None:
+            return None
+
+        def split(value):
+            return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+        available = set(cls.Meta.fields)
+        requested = split(fields) if fields is not None else list(cls.default_fields or available)
+        requested += split(expand)
+        unknown = sorted(set(requested) - available)
+        if unknown:
+            raise ValidationError({'fields': f'未知字段：{", ".join(unknown)}；可选字段：{", ".join(cls.Meta.fields)}'})
+        # id 始终返回，前端依赖它定位图书
+        return frozenset(requested) | {'id'}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        sparse_fields = self.context.get('sparse_fields')
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if sparse_fields is None or parent is not None:
+            return fields
+        return {name: field for name, field in fields.items() if name in sparse_fields}
+
+class CoverVariantsField(serializers.ReadOnlyField):
+    """把 Book.cover_variants 中的存储路径转换为 URL：{尺寸: {width, height, jpeg, webp}}"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        sizes = {}
+        for size_name, entry in (value or {}).get('sizes', {}).items():
+            sizes[size_name] = dict(entry)
+            for key in ('jpeg', 'webp'):
+                url = default_storage.url(entry[key])
+                sizes[size_name][key] = request.build_absolute_uri(url) if request is not None else url
+        return sizes
+
 class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Author
@@ -66,12 +118,18 @@ class PublisherSerializer(serializers.ModelSerializer):
         model = Publisher
         fields = ['id', 'name']
 
+class AuthorBriefSerializer(serializers.ModelSerializer):
+    """列表页只展示作者姓名，不输出简介"""
+    class Meta:
+        model = Author
+        fields = ['id', 'name']
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # 嵌套序列化：直接显示作者和出版社的详细信息，而不是只显示 ID
     authors = AuthorSerializer(many=True, read_only=True)
     publisher = PublisherSerializer(read_only=True)
@@ -79,10 +137,12 @@ class BookSerializer(serializers.ModelSerializer):
     
     # 新增字段：用户状态
     user_status = serializers.SerializerMethodField()
+    # 封面缩略图及 WebP 版本（后台生成，生成前为空）
+    cover_variants = CoverVariantsField()
 
     class Meta:
         model = Book
-        fields = ['id', 'title', 'isbn', 'publisher', 'authors', 'categories', 'publication_date', 'summary', 'quantity', 'user_status', 'cover_image']
+        fields = ['id', 'title', 'isbn', 'publisher', 'authors', 'categories', 'publication_date', 'summary', 'quantity', 'user_status', 'cover_image', 'cover_variants']
 
     def get_user_status(self, obj):
         """
@@ -94,13 +154,17 @@ class BookSerializer(serializers.ModelSerializer):
         # 获取当前请求的用户
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            user = request.user
-            # 检查是否有未归还的借阅记录
-            has_borrowed = Borrow.objects.filter(
-                reader=user, 
-                book=obj, 
-                return_date__isnull=True
-            ).exists()
+            # 优先使用视图批量查询好的借阅书籍 ID 集合，避免逐本查询
+            borrowed_book_ids = self.context.get('borrowed_book_ids')
+            if borrowed_book_ids is not None:
+                has_borrowed = obj.pk in borrowed_book_ids
+            else:
+                # 检查是否有未归还的借阅记录
+                has_borrowed = Borrow.objects.filter(
+                    reader=request.user,
+                    book=obj,
+                    return_date__isnull=True
+                ).exists()
 
             if has_borrowed:
                 return 'BORROWED'
@@ -111,6 +175,18 @@ class BookSerializer(serializers.ModelSerializer):
         else:
             return 'NO_STOCK'
 
+class BookListSerializer(BookSerializer):
+    """
+    图书列表的精简表示：默认只返回目录卡片需要的字段，
+    简介、分类等可通过 ?expand= 或 ?fields= 按需获取，完整信息见详情接口
+    """
+    authors = AuthorBriefSerializer(many=True, read_only=True)
+
+    default_fields = ('id', 'title', 'authors', 'cover_image', 'cover_variants', 'quantity', 'user_status')
+
+    class Meta(BookSerializer.Meta):
+        pass
+
 class BorrowSerializer(serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
     is_overdue = serializers.SerializerMethodField()
@@ -121,6 +197,21 @@ class BorrowSerializer(serializers.ModelSerializer):
 
     def get_is_overdue(self, obj):
         from django.utils import timezone
+        # 状态由 sweep_overdue 定时维护，两次扫描之间到期的记录仍按日期判断
+        if obj.status == 'OVERDUE':
+            return True
         if obj.return_date is None and obj.due_date < timezone.now().date():
             return True
         return False
+
+class ReservationSerializer(serializers.ModelSerializer):
+    book = BookSerializer(read_only=True)
+    # 排队位置由视图批量计算后通过 context['queue_positions'] 传入，非排队中的预约为 null
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Reservation
+        fields = ['id', 'book', 'status', 'created_at', 'hold_until', 'position']
+
+    def get_position(self, obj):
+        return self.context.get('queue_positions', {}).get(obj.pk)
@@ -0,0 +1,78 @@
+"""
+借阅统计的每日汇总
+
+rollup_day() 根据某一天借出、归还的借阅记录重新计算当天的汇总行（幂等，可重复执行）：
+- 只按 borrow_date / return_date 索引取当天的记录（借阅表和归档表各查一次），不扫描全部历史
+- 统计接口只读取汇总表，查询量与选择的日期范围成正比，与借阅历史总量无关
+"""
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ArchivedBorrow, Borrow, DailyBookCirculation, DailyCategoryCirculation, DailyCirculation
+
+
+def _days(value):
+    # 日期相减得到 timedelta；空集合时 Sum 返回 None
+    if value is None:
+        return 0
+    if isinstance(value, datetime.timedelta):
+        return value.days
+    return int(value)
+
+
+def rollup_day(day):
+    """重新计算 day 当天的汇总，返回 DailyCirculation 行"""
+    loans = 0
+    return_stats = {'returns': 0, 'overdue_returns': 0, 'loan_days': 0}
+    book_loans = Counter()
+    categories = {}
+    # 较早日期的记录可能已被 archive_borrows 移到归档表，两张表分别统计后相加
+    for model in (Borrow, ArchivedBorrow):
+        day_loans = model.objects.filter(borrow_date=day)
+        day_returns = model.objects.filter(return_date=day)
+
+        stats = day_returns.aggregate(
+            returns=Count('id'),
+            overdue_returns=Count('id', filter=Q(return_date__gt=F('due_date'))),
+            loan_days=Sum(F('return_date') - F('borrow_date')),
+        )
+        loans += day_loans.count()
+        return_stats['returns'] += stats['returns']
+        return_stats['overdue_returns'] += stats['overdue_returns']
+        return_stats['loan_days'] += _days(stats['loan_days'])
+        book_loans.update(dict(day_loans.values('book').annotate(loans=Count('id')).values_list('book', 'loans')))
+
+        for category_id, count in day_loans.values('book__categories').annotate(n=Count('id')).values_list('book__categories', 'n'):
+            if category_id is not None:
+                categories.setdefault(category_id, {'loans': 0, 'returns': 0})['loans'] += count
+        for category_id, count in day_returns.values('book__categories').annotate(n=Count('id')).values_list('book__categories', 'n'):
+            if category_id is not None:
+                categories.setdefault(category_id, {'loans': 0, 'returns': 0})['returns'] += count
+
+    with transaction.atomic():
+        summary, _ = DailyCirculation.objects.update_or_create(
+            date=day,
+            defaults={
+                'loans': loans,
+                'returns': return_stats['returns'],
+                'overdue_returns': return_stats['overdue_returns'],
+                'loan_days': return_stats['loan_days'],
+            },
+        )
+        DailyBookCirculation.objects.filter(date=day).delete()
+        DailyBookCirculation.objects.bulk_create([
+            DailyBookCirculation(date=day, book_id=book_id, loans=count) for book_id, count in book_loans.items()
+        ])
+        DailyCategoryCirculation.objects.filter(date=day).delete()
+        DailyCategoryCirculation.objects.bulk_create([
+            DailyCategoryCirculation(date=day, category_id=category_id, **counts)
+            for category_id, counts in categories.items()
+        ])
+    return summary
+
+
+def rate(numerator, denominator, digits=4):
+    return round(numerator / denominator, digits) if denominator else None
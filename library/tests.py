@@ -1,3 +1,578 @@
-from django.test import TestCase
+"""
+查询预算回归测试
 
-# Create your tests here.
+每个接口固定一个 SQL 查询次数上限（预算），并在不同的结果规模（分页大小、借阅记录数、关联对象数）下
+断言查询次数保持不变：出现 N+1 查询或多余的查询时测试失败。
+- 每次请求前清空缓存（包括进程内的完整用户缓存），统计的是缓存未命中时的查询次数（最坏情况）
+- 登录用户使用与线上相同的 JWT 令牌，不使用 force_authenticate；用户缓存已清空，读请求的鉴权也计入一次用户查询
+- 测试在事务中运行，写接口的 SAVEPOINT / RELEASE 也计入查询次数
+
+预算之外还覆盖对应的行为：不超借、预约按先后分配及保留过期、限流、读者借阅统计、条件 GET、令牌吊销、检索分词、推荐增量更新
+"""
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import cache as cache_module
+from .authentication import LibraryTokenObtainPairSerializer, _full_users
+from .circulation import archive_borrows
+from .metrics import registry
+from .models import (
+    Author, Book, Borrow, Category, DailyBookCirculation, DailyCategoryCirculation, DailyCirculation,
+    Publisher, RelatedBook, Reservation,
+)
+from .recommendations import CooccurrenceMatrix, rebuild_recommendations, update_recommendations
+
+
+class QueryBudgetTestCase(TestCase):
+    """提供造数据和统计查询次数的辅助方法"""
+
+    def setUp(self):
+        self.clear_caches()
+        self.publisher = Publisher.objects.create(name='出版社')
+        self.category = Category.objects.create(name='分类')
+        self.user = User.objects.create_user('reader', password='pass-1234')
+        self.client = self.client_for(self.user)
+        self.anonymous = APIClient()
+
+    def clear_caches(self):
+        for cache in caches.all():
+            cache.clear()
+        _full_users.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        token = LibraryTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def make_books(self, count, authors=1, quantity=2, prefix='python book'):
+        start = Book.objects.count()
+        books = []
+        for i in range(start, start + count):
+            book = Book.objects.create(
+                title=f'{prefix} {i}',
+                isbn=f'{i:013d}',
+                publisher=self.publisher,
+                publication_date=datetime.date(2000, 1, 1) + datetime.timedelta(days=i),
+                summary='',
+                quantity=quantity,
+            )
+            book.authors.add(*[Author.objects.get_or_create(name=f'作者 {i}-{k}')[0] for k in range(authors)])
+            book.categories.add(self.category)
+            books.append(book)
+        return books
+
+    def make_borrows(self, user, books, returned):
+        today = timezone.localdate()
+        for i, book in enumerate(books):
+            Borrow.objects.create(
+                reader=user,
+                book=book,
+                due_date=today + datetime.timedelta(days=30 - i),
+                return_date=today - datetime.timedelta(days=i) if returned else None,
+                status='RETURNED' if returned else 'ON_LOAN',
+            )
+        user.reader.refresh_loan_stats()
+
+    def count_queries(self, method, url, client=None, status=200, **kwargs):
+        """清空缓存后发送请求，校验状态码并返回执行的查询次数"""
+        self.clear_caches()
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+        self.assertEqual(response.status_code, status, getattr(response, 'data', response))
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, budget, method, url, **kwargs):
+        count = self.count_queries(method, url, **kwargs)
+        self.assertLessEqual(count, budget, f'{method.upper()} {url} 执行了 {count} 条查询，预算为 {budget}')
+        return count
+
+    def assertConstantQueries(self, budget, counts):
+        """counts 为 {规模: 查询次数}：查询次数不随规模变化，且不超过预算"""
+        self.assertEqual(len(set(counts.values())), 1, f'查询次数随结果规模变化：{counts}')
+        self.assertLessEqual(next(iter(counts.values())), budget, f'查询次数超出预算 {budget}：{counts}')
+
+
+class BookQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.books = self.make_books(25, authors=2)
+
+    def test_list_page_sizes(self):
+        for client, budget in ((self.anonymous, 2), (self.client, 5)):
+            counts = {
+                size: self.count_queries('get', f'/api/books/?page_size={size}', client=client)
+                for size in (1, 5, 20)
+            }
+            self.assertConstantQueries(budget, counts)
+
+    def test_list_next_page(self):
+        first = self.client.get('/api/books/?page_size=5').data
+        counts = {
+            'first': self.count_queries('get', '/api/books/?page_size=5'),
+            'next': self.count_queries('get', first['next']),
+        }
+        self.assertConstantQueries(5, counts)
+
+    def test_search(self):
+        self.make_books(1, prefix='rare title')
+        counts = {
+            query: self.count_queries('get', f'/api/books/?search={query}&page_size=20')
+            for query in ('rare', 'python')
+        }
+        self.assertConstantQueries(7, counts)
+
+    def test_retrieve(self):
+        few = self.make_books(1, authors=1)[0]
+        many = self.make_books(1, authors=5)[0]
+        counts = {
+            authors: self.count_queries('get', f'/api/books/{book.pk}/')
+            for authors, book in ((1, few), (5, many))
+        }
+        self.assertConstantQueries(6, counts)
+        self.assertQueryBudget(3, 'get', f'/api/books/{few.pk}/', client=self.anonymous)
+
+    def test_borrow_and_return(self):
+        counts = {}
+        for loans in (0, 3):
+            self.make_borrows(self.user, self.books[10:10 + loans], returned=False)
+            book = self.books[loans]
+            counts[loans] = (
+                self.count_queries('post', f'/api/books/{book.pk}/borrow/'),
+                self.count_queries('post', f'/api/books/{book.pk}/return_book/'),
+            )
+        self.assertEqual(len(set(counts.values())), 1, counts)
+        borrow, return_book = counts[0]
+        self.assertLessEqual(borrow, 11)
+        self.assertLessEqual(return_book, 11)
+
+    def test_my_borrowed_books(self):
+        counts = {}
+        for loans in (1, 5):
+            Borrow.objects.all().delete()
+            self.make_borrows(self.user, self.books[:loans], returned=False)
+            counts[loans] = self.count_queries('get', '/api/books/my_borrowed_books/')
+        self.assertConstantQueries(5, counts)
+
+    def test_borrow_history_page_sizes(self):
+        self.make_borrows(self.user, self.books, returned=True)
+        expected = list(Borrow.objects.order_by('-return_date', '-id').values_list('pk', flat=True))
+        # 较早归还的一半移到归档表，每页需要合并两张表的记录
+        archive_borrows(Borrow.objects.order_by('return_date').values_list('pk', flat=True)[:12])
+        counts = {
+            size: self.count_queries('get', f'/api/books/borrow_history/?page_size={size}')
+            for size in (1, 5, 20)
+        }
+        self.assertConstantQueries(7, counts)
+        first = self.client.get('/api/books/borrow_history/?page_size=20').data
+        second = self.client.get(first['next']).data
+        self.assertEqual([record['id'] for record in first['results'] + second['results']], expected)
+
+    def test_borrow_history_ignores_search(self):
+        # 检索参数只作用于图书列表，借阅历史仍使用合并两张表的游标分页
+        self.make_borrows(self.user, self.books[:3], returned=True)
+        response = self.client.get('/api/books/borrow_history/?search=python&page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_reservations(self):
+        out_of_stock = self.make_books(6, quantity=0)
+        counts = {}
+        for reserved in (1, 5):
+            Reservation.objects.all().delete()
+            for book in out_of_stock[:reserved - 1]:
+                Reservation.objects.create(reader=self.user, book=book)
+            book = out_of_stock[reserved - 1]
+            counts[reserved] = (
+                self.count_queries('post', f'/api/books/{book.pk}/reserve/'),
+                self.count_queries('get', '/api/books/my_reservations/'),
+                self.count_queries('post', f'/api/books/{book.pk}/cancel/'),
+            )
+        self.assertEqual(len(set(counts.values())), 1, counts)
+        reserve, my_reservations, cancel = counts[1]
+        self.assertLessEqual(reserve, 11)
+        self.assertLessEqual(my_reservations, 5)
+        self.assertLessEqual(cancel, 7)
+
+    def test_related(self):
+        counts = {}
+        for related in (1, 10):
+            book = self.books[related]
+            RelatedBook.objects.bulk_create([
+                RelatedBook(book=book, related=other, score=1.0 / (rank + 1), rank=rank)
+                for rank, other in enumerate(self.books[12:12 + related])
+            ])
+            counts[related] = self.count_queries('get', f'/api/books/{book.pk}/related/', client=self.anonymous)
+        self.assertConstantQueries(3, counts)
+
+    def test_recommendations(self):
+        counts = {}
+        for history in (1, 10):
+            Borrow.objects.all().delete()
+            self.make_borrows(self.user, self.books[:history], returned=True)
+            RelatedBook.objects.all().delete()
+            RelatedBook.objects.bulk_create([
+                RelatedBook(book=book, related=self.books[20 + rank], score=0.5, rank=rank)
+                for book in self.books[:history]
+                for rank in range(3)
+            ])
+            counts[history] = self.count_queries('get', '/api/me/recommendations/')
+        self.assertConstantQueries(5, counts)
+
+
+class AccountQueryBudgetTests(QueryBudgetTestCase):
+    def test_me(self):
+        self.assertQueryBudget(1, 'get', '/api/me/')
+        self.assertQueryBudget(5, 'patch', '/api/me/', data={'phone_number': '123'}, format='json')
+
+    def test_register(self):
+        self.assertQueryBudget(4, 'post', '/api/register/', client=self.anonymous, status=201, data={
+            'username': 'new-reader', 'password': 'pass-1234', 'email': 'new@example.com',
+        }, format='json')
+
+    def test_token(self):
+        self.assertQueryBudget(1, 'post', '/api/token/', client=self.anonymous, data={
+            'username': 'reader', 'password': 'pass-1234',
+        }, format='json')
+
+
+class CatalogQueryBudgetTests(QueryBudgetTestCase):
+    def test_lists(self):
+        for model, url in ((Author, '/api/authors/'), (Publisher, '/api/publishers/'), (Category, '/api/categories/')):
+            counts = {}
+            for total in (3, 15):
+                model.objects.bulk_create(
+                    [model(name=f'{model.__name__} {total}-{i}') for i in range(total - model.objects.count())]
+                )
+                counts[total] = self.count_queries('get', url, client=self.anonymous)
+            self.assertConstantQueries(2, counts)
+            self.assertQueryBudget(1, 'get', f'{url}{model.objects.first().pk}/', client=self.anonymous)
+
+
+class StatsQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', password='pass-1234')
+        self.client = self.client_for(self.admin)
+        books = self.make_books(5)
+        today = timezone.localdate()
+        for days_ago in range(30):
+            day = today - datetime.timedelta(days=days_ago)
+            DailyCirculation.objects.create(date=day, loans=5, returns=3, overdue_returns=1, loan_days=30)
+            DailyCategoryCirculation.objects.create(date=day, category=self.category, loans=5, returns=3)
+            DailyBookCirculation.objects.bulk_create([DailyBookCirculation(date=day, book=book, loans=1) for book in books])
+
+    def test_stats_date_ranges(self):
+        today = timezone.localdate()
+        for url, budget in (
+            ('/api/stats/', 4),
+            ('/api/stats/daily/', 2),
+            ('/api/stats/top-books/', 2),
+            ('/api/stats/categories/', 2),
+        ):
+            counts = {
+                days: self.count_queries('get', f'{url}?since={today - datetime.timedelta(days=days - 1)}')
+                for days in (3, 30)
+            }
+            self.assertConstantQueries(budget, counts)
+
+
+@override_settings(LIBRARY_METRICS_TOKEN='metrics-token')
+class MetricsQueryBudgetTests(QueryBudgetTestCase):
+    def test_metrics(self):
+        self.count_queries('get', '/api/books/', client=self.anonymous)
+        scraper = APIClient()
+        scraper.credentials(HTTP_AUTHORIZATION='Metrics metrics-token')
+        self.assertQueryBudget(0, 'get', '/api/metrics/', client=scraper)
+        self.count_queries('get', '/api/metrics/', client=self.client, status=403)
+
+    def sql_count(self, view):
+        series = registry.queries.values.get((view, 'GET'))
+        return series[1] if series else 0
+
+    def test_sql_metrics(self):
+        before = self.sql_count('book-list')
+        queries = self.count_queries('get', '/api/books/', client=self.anonymous)
+        self.assertEqual(self.sql_count('book-list') - before, queries)
+
+    async def test_sql_metrics_asgi(self):
+        # 与 ASGI 部署相同，中间件链中没有同步的 WhiteNoiseMiddleware，指标中间件以异步方式运行；
+        # 异步 ORM（LIBRARY_ASYNC_READS）或同步视图的查询同样计入
+        middleware = [name for name in settings.MIDDLEWARE if not name.startswith('whitenoise.')]
+        before = self.sql_count('book-list')
+        with self.settings(MIDDLEWARE=middleware):
+            response = await self.async_client.get('/api/books/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.sql_count('book-list') - before, 0)
+
+
+class CirculationTests(QueryBudgetTestCase):
+    """借书、预约队列及限流的行为：不超借、按预约先后分配、保留过期后顺延"""
+
+    def setUp(self):
+        super().setUp()
+        self.book = self.make_books(1, quantity=1)[0]
+        self.readers = [User.objects.create_user(f'queued-{i}') for i in range(2)]
+        self.clients = [self.client_for(user) for user in self.readers]
+
+    def post(self, client, action, status=200):
+        response = client.post(f'/api/books/{self.book.pk}/{action}/')
+        self.assertEqual(response.status_code, status, response.data)
+        return response
+
+    def reservation_status(self, user):
+        return Reservation.objects.get(reader=user, book=self.book).status
+
+    def test_no_oversell(self):
+        self.post(self.client, 'borrow')
+        self.post(self.clients[0], 'borrow', status=400)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 0)
+        self.assertEqual(Borrow.objects.filter(book=self.book).count(), 1)
+
+    def test_reservation_queue(self):
+        self.post(self.client, 'borrow')
+        for client in self.clients:
+            self.post(client, 'reserve')
+        self.assertEqual(self.post(self.clients[1], 'reserve', status=400).data['reservation_status'], 'WAITING')
+
+        # 归还的副本按预约先后保留给第一位，不回到库存，第二位借不到
+        response = self.post(self.client, 'return_book')
+        self.assertEqual((response.data['quantity'], response.data['user_status']), (0, 'NO_STOCK'))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 0)
+        self.assertEqual(self.reservation_status(self.readers[0]), 'READY')
+        self.assertEqual(self.reservation_status(self.readers[1]), 'WAITING')
+        self.post(self.clients[1], 'borrow', status=400)
+        self.post(self.clients[0], 'borrow')
+        self.assertEqual(self.reservation_status(self.readers[0]), 'FULFILLED')
+
+    def test_hold_expiry(self):
+        self.post(self.client, 'borrow')
+        for client in self.clients:
+            self.post(client, 'reserve')
+        self.post(self.client, 'return_book')
+        Reservation.objects.filter(reader=self.readers[0]).update(
+            hold_until=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        call_command('sweep_reservations', stdout=io.StringIO())
+        self.assertEqual(self.reservation_status(self.readers[0]), 'EXPIRED')
+        self.assertEqual(self.reservation_status(self.readers[1]), 'READY')
+
+        # 最后一位的保留也过期后，副本回到库存
+        Reservation.objects.filter(reader=self.readers[1]).update(
+            hold_until=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        call_command('sweep_reservations', stdout=io.StringIO())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantity, 1)
+
+    def test_throttling(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'borrow': '2/min'}
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            self.post(self.client, 'borrow')
+            self.post(self.client, 'borrow', status=400)
+            # 先限流后鉴权：被限流的请求不查询数据库
+            with CaptureQueriesContext(connection) as context:
+                response = self.post(self.client, 'borrow', status=429)
+            self.assertEqual(len(context.captured_queries), 0)
+            self.assertIn('Retry-After', response)
+            # 按用户限流，其他读者不受影响
+            self.post(self.clients[0], 'borrow', status=400)
+
+
+class SearchTests(QueryBudgetTestCase):
+    def search(self, query):
+        response = self.client.get('/api/books/', {'search': query})
+        return [item['id'] for item in response.data['results']]
+
+    def test_non_ascii_tokens(self):
+        # 带变音符的拉丁字母、假名、谚文不能被丢弃或把词切断
+        latin = self.make_books(1, prefix='Café Müller')[0]
+        kana = self.make_books(1, prefix='プログラミング')[0]
+        hangul = self.make_books(1, prefix='한국어 책')[0]
+        self.make_books(1, prefix='caf ller')
+        for query, book in (('café', latin), ('MÜLLER', latin), ('mül', latin),
+                            ('プログラ', kana), ('한국', hangul)):
+            self.assertEqual(self.search(query), [book.pk], query)
+
+
+class RecommendationTests(QueryBudgetTestCase):
+    def test_late_commit_within_margin(self):
+        # ID 较小的借阅在更大的 ID 被增量更新读取之后才提交，不能被水位线永久跳过，也不能重复计入
+        books = self.make_books(2)
+        first = Borrow.objects.create(reader=self.user, book=books[0], due_date=timezone.localdate(), status='RETURNED')
+        first_pk = first.pk
+        first.delete()
+        Borrow.objects.create(reader=self.user, book=books[1], due_date=timezone.localdate(), status='RETURNED')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recommender.npz')
+            rebuild_recommendations(path=path)
+            self.assertFalse(RelatedBook.objects.exists())
+
+            Borrow.objects.create(
+                pk=first_pk, reader=self.user, book=books[0], due_date=timezone.localdate(), status='RETURNED',
+            )
+            for _ in range(2):
+                update_recommendations(path=path)
+                matrix = CooccurrenceMatrix.load(path)
+                self.assertEqual(matrix.counts.tolist(), [1, 1])
+                self.assertEqual(matrix.item_counts[[books[0].pk, books[1].pk]].tolist(), [1, 1])
+        self.assertEqual(
+            set(RelatedBook.objects.values_list('book_id', 'related_id')),
+            {(books[0].pk, books[1].pk), (books[1].pk, books[0].pk)},
+        )
+
+
+class AnonymousCacheTests(QueryBudgetTestCase):
+    def test_stock_not_overwritten_by_stale_response(self):
+        # 响应生成期间有借书/还书提交（库存缓存已失效），不能把查询时读到的旧库存写回缓存
+        book = self.make_books(1)[0]
+        to_plain = cache_module._to_plain
+
+        def borrowed_meanwhile(data):
+            cache_module.invalidate_stock(book.pk)
+            return to_plain(data)
+
+        with mock.patch.object(cache_module, '_to_plain', borrowed_meanwhile):
+            self.assertEqual(self.anonymous.get('/api/books/')['X-Cache'], 'MISS')
+        self.assertIsNone(cache_module.get_cache().get(cache_module._stock_key(book.pk)))
+        # 库存缓存缺失时不使用缓存的响应，重新生成后恢复
+        self.assertEqual(self.anonymous.get('/api/books/')['X-Cache'], 'MISS')
+        self.assertEqual(self.anonymous.get('/api/books/')['X-Cache'], 'HIT')
+
+
+class ConditionalGetTests(QueryBudgetTestCase):
+    """ETag 随目录、库存及本人借阅记录的变化而变化，未变化时返回 304"""
+
+    def setUp(self):
+        super().setUp()
+        self.books = self.make_books(3)
+
+    def assertChanged(self, etag, changed=True):
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200 if changed else 304)
+        self.assertNotIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_unchanged(self):
+        etag = self.client.get('/api/books/')['ETag']
+        self.assertChanged(etag, changed=False)
+
+    def test_delete_newest_book(self):
+        etag = self.client.get('/api/books/')['ETag']
+        self.books[-1].delete()
+        self.assertChanged(etag)
+
+    def test_anonymous_cache_hit(self):
+        # 匿名响应缓存命中时同样带 ETag；未变化时直接返回 304，不查询数据库
+        first = self.anonymous.get('/api/books/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        etag = first['ETag']
+        hit = self.anonymous.get('/api/books/')
+        self.assertEqual((hit['X-Cache'], hit['ETag']), ('HIT', etag))
+        with CaptureQueriesContext(connection) as context:
+            response = self.anonymous.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.books[0].delete()
+        self.assertEqual(self.anonymous.get('/api/books/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_stock_and_borrow_changes(self):
+        etag = self.client.get('/api/books/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(User.objects.create_user('other')).post(f'/api/books/{self.books[0].pk}/borrow/')
+        etag = self.assertChanged(etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/books/{self.books[1].pk}/borrow/')
+        self.assertChanged(etag)
+
+
+class TokenRevocationTests(QueryBudgetTestCase):
+    """停用、改密、降权后旧令牌失效；吊销记录以数据库为准，缓存被清空（淘汰或其他进程）时仍然有效"""
+
+    def test_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.count_queries('get', '/api/books/my_borrowed_books/', status=401)
+
+    def test_deactivated_user_cannot_borrow(self):
+        book = self.make_books(1)[0]
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.count_queries('post', f'/api/books/{book.pk}/borrow/', status=401)
+        self.assertFalse(Borrow.objects.exists())
+
+    def test_password_change(self):
+        self.user.set_password('new-pass-1234')
+        self.user.save()
+        self.count_queries('get', '/api/me/', status=401)
+        self.count_queries('get', '/api/me/', client=self.client_for(self.user))
+
+    def test_staff_demoted(self):
+        admin = User.objects.create_superuser('admin', password='pass-1234')
+        client = self.client_for(admin)
+        self.count_queries('get', '/api/stats/', client=client)
+        # 改为不经过 save() 的更新，不写吊销记录：权限仍以数据库中的 is_staff 为准，而不是令牌中的声明
+        User.objects.filter(pk=admin.pk).update(is_staff=False)
+        self.count_queries('get', '/api/stats/', client=client, status=403)
+        self.count_queries('post', '/api/authors/', client=client, status=403, data={'name': '作者'}, format='json')
+
+
+class ReaderStatsTests(QueryBudgetTestCase):
+    """绕过借书/还书接口删除或修改借阅记录后，读者的在借数量和最早应还日期随之更新"""
+
+    def setUp(self):
+        super().setUp()
+        self.books = self.make_books(2)
+        self.make_borrows(self.user, self.books, returned=False)
+
+    def assertReaderStats(self, count, earliest):
+        self.user.reader.refresh_from_db()
+        self.assertEqual(self.user.reader.active_loan_count, count)
+        self.assertEqual(self.user.reader.earliest_due_date, earliest)
+
+    def test_delete_borrow(self):
+        today = timezone.localdate()
+        Borrow.objects.get(book=self.books[1]).delete()
+        self.assertReaderStats(1, today + datetime.timedelta(days=30))
+        Borrow.objects.all().delete()
+        self.assertReaderStats(0, None)
+
+    def test_book_cascade_delete(self):
+        self.books[0].delete()
+        self.assertReaderStats(1, timezone.localdate() + datetime.timedelta(days=29))
+
+    def test_admin_change(self):
+        admin = User.objects.create_superuser('admin', password='pass-1234')
+        self.client.force_login(admin)
+        borrow = Borrow.objects.get(book=self.books[0])
+        due_date = timezone.localdate() + datetime.timedelta(days=1)
+        response = self.client.post(f'/admin/library/borrow/{borrow.pk}/change/', {'due_date': due_date.isoformat()})
+        self.assertEqual(response.status_code, 302)
+        self.assertReaderStats(2, due_date)
+
+    def test_admin_cannot_delete_active_borrow(self):
+        admin = User.objects.create_superuser('admin', password='pass-1234')
+        self.client.force_login(admin)
+        borrow = Borrow.objects.get(book=self.books[0])
+        self.assertEqual(self.client.post(f'/admin/library/borrow/{borrow.pk}/delete/', {'post': 'yes'}).status_code, 403)
+        self.client.post('/admin/library/borrow/', {
+            'action': 'delete_selected', '_selected_action': [borrow.pk], 'post': 'yes',
+        })
+        self.assertEqual(Borrow.objects.count(), 2)
+        self.assertNotContains(self.client.get('/admin/library/borrow/'), 'delete_selected')
@@ -0,0 +1,111 @@
+"""
+令牌桶限流
+
+- 每个 (范围, 用户或 IP) 一个桶：容量为 N，以 N / 周期 的速率连续补充，允许 N 次以内的突发，长期速率不超过配置值
+- 桶状态 (剩余令牌数, 更新时间) 保存在 LIBRARY_CACHE_ALIAS 缓存中，每次检查一次读一次写，不访问数据库；
+  多进程并发时可能偶尔多放行一两个请求，限流场景可以接受
+- 速率在 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] 中按范围配置，格式同 DRF（如 '10/min'）：
+  '<范围>' 为按用户的速率，'<范围>_ip' 为按客户端 IP 的速率，未配置的不限流
+- 范围取视图的 throttle_scope，视图集未设置时取当前动作名（如 borrow、return_book）
+- 被限流时由 DRF 返回 429 及 Retry-After（距下一个令牌可用的秒数）
+- 视图使用 ThrottleBeforeAuthenticationMixin 时先限流后鉴权：按用户的桶直接取访问令牌中的用户 ID，
+  被限流的请求不查询数据库（写请求的鉴权会查询用户表）
+"""
+import hashlib
+import time
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from .authentication import get_token_user_id
+from .cache import get_cache
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' → (10, 60)"""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    rate_suffix = ''
+
+    def __init__(self):
+        self.tokens_per_second = None
+        self.deficit = 0
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None) or getattr(view, 'action', None)
+
+    def get_ident_key(self, request, view):
+        """返回限流对象的标识，None 表示不适用（不限流）"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}{self.rate_suffix}') if scope else None
+        if rate is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        self.tokens_per_second = capacity / period
+        key = f'library:throttle:{scope}{self.rate_suffix}:{ident}'
+        cache = get_cache()
+        now = time.time()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * self.tokens_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.deficit = 1 - tokens
+        # 桶补满所需的时间之后状态与新桶相同，可以过期
+        cache.set(key, (tokens, now), timeout=int(period) + 1)
+        return allowed
+
+    def wait(self):
+        if not self.tokens_per_second:
+            return None
+        return self.deficit / self.tokens_per_second
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    按用户限流：用户 ID 直接取自访问令牌（校验签名，不触发鉴权，不查询数据库）；
+    登录接口（无令牌）按请求中的用户名限流，限制针对单个账号的密码尝试
+    """
+
+    def get_ident_key(self, request, view):
+        user_id = get_token_user_id(request)
+        if user_id is not None:
+            return f'user:{user_id}'
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if username:
+            return 'name:' + hashlib.sha256(str(username).encode('utf-8')).hexdigest()[:32]
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """按客户端 IP 限流（反向代理后需配置 REST_FRAMEWORK['NUM_PROXIES']）"""
+    rate_suffix = '_ip'
+
+    def get_ident_key(self, request, view):
+        return f'ip:{self.get_ident(request)}'
+
+
+class ThrottleBeforeAuthenticationMixin:
+    """视图混入类：在鉴权之前检查限流（DRF 默认顺序是鉴权、权限、限流），每个请求只检查一次"""
+
+    def initial(self, request, *args, **kwargs):
+        # 限流范围取动作名，action 在 initialize_request 中已经设置
+        self.check_throttles(request)
+        self._throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, '_throttles_checked', False):
+            super().check_throttles(request)
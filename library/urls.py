@@ -1,4 +1,5 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -7,9 +8,26 @@ router.register(r'books', views.BookViewSet)
 router.register(r'authors', views.AuthorViewSet)
 router.register(r'publishers', views.PublisherViewSet)
 router.register(r'categories', views.CategoryViewSet)
+router.register(r'stats', views.StatsViewSet, basename='stats')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', views.RegisterView.as_view(), name='register'),
     path('me/', views.CurrentUserView.as_view(), name='current-user'),
+    path('me/recommendations/', views.RecommendationView.as_view(), name='recommendations'),
+    path('export/<str:dataset>/', views.ExportView.as_view(), name='export'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
+
+# 通过 ASGI 入口运行时，只读接口改用原生异步视图（同一 URL 上的写操作仍由同步视图处理）
+if settings.LIBRARY_ASYNC_READS:
+    from . import async_views
+
+    urlpatterns = [
+        path('books/', async_views.book_list, name='book-list'),
+        path('books/my_borrowed_books/', async_views.my_borrowed_books, name='book-my-borrowed-books'),
+        path('books/borrow_history/', async_views.borrow_history, name='book-borrow-history'),
+        # 只匹配数字 ID，my_reservations 等不在上面列出的列表动作交给同步路由
+        re_path(r'^books/(?P<pk>[0-9]+)/$', async_views.book_detail, name='book-detail'),
+        path('me/', async_views.current_user, name='current-user'),
+    ] + urlpatterns
@@ -1,13 +1,42 @@
+import datetime
+from itertools import chain
+from operator import attrgetter
+
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
-from rest_framework import viewsets, status, generics, filters
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.views import APIView
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from .models import Book, Author, Publisher, Category, Borrow
-from .serializers import BookSerializer, AuthorSerializer, PublisherSerializer, CategorySerializer, UserSerializer, BorrowSerializer
-from .permissions import IsAdminOrReadOnly
+from .models import (
+    Book, Author, Publisher, Category, Borrow, ArchivedBorrow, Reader, default_due_date,
+    DailyCirculation, DailyBookCirculation, DailyCategoryCirculation, RelatedBook,
+    Reservation,
+)
+from .serializers import BookSerializer, BookListSerializer, AuthorSerializer, PublisherSerializer, CategorySerializer, UserSerializer, BorrowSerializer, ReservationSerializer
+from .permissions import HasMetricsToken, IsAdminOrReadOnly
+from .eager_loading import EagerLoadingMixin, optimize_queryset
+from .search import FullTextSearchFilter
+from .pagination import BookCursorPagination, BorrowHistoryCursorPagination
+from .cache import cache_anonymous_response, invalidate_stock
+from .conditional import ConditionalGetMixin, build_validators, conditional_response
+from .export import ENCODERS, export_stream, streaming_response
+from .reservations import lock_book, queue_positions, release_copy
+from .metrics import registry
+from .stats import rate
+from .throttling import IPTokenBucketThrottle, ThrottleBeforeAuthenticationMixin, UserTokenBucketThrottle
 
 # Create your views here.
 
@@ -15,6 +44,13 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = UserSerializer
+    throttle_classes = [IPTokenBucketThrottle]
+    throttle_scope = 'register'
+
+class TokenObtainView(TokenObtainPairView):
+    """登录（签发 JWT），按用户名和 IP 限流"""
+    throttle_classes = [UserTokenBucketThrottle, IPTokenBucketThrottle]
+    throttle_scope = 'token'
 
 class CurrentUserView(generics.RetrieveUpdateAPIView):
     """
@@ -26,18 +62,40 @@ class CurrentUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
+        # 鉴权时已取出完整用户及读者资料：读请求来自进程内缓存，修改时是刚从数据库读取的最新数据
         return self.request.user
 
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.all().order_by('-publication_date')
+    def get_conditional_validators(self):
+        return self.build_profile_validators(self.get_object())
+
+    def build_profile_validators(self, user):
+        # 用户资料没有更新时间字段，直接以展示的字段值作为校验依据
+        reader = getattr(user, 'reader', None)
+        phone_number = reader.phone_number if reader is not None else ''
+        parts = [f'user:{user.pk}', user.username, user.email, str(user.is_staff), phone_number]
+        return build_validators(parts)
+
+    @conditional_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class BookViewSet(ThrottleBeforeAuthenticationMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = Book.objects.all().order_by('-publication_date', '-id')
     serializer_class = BookSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['title', 'authors__name', 'isbn', 'publisher__name', 'categories__name']
+    eager_loading_exempt_actions = ('borrow', 'return_book', 'reserve', 'cancel')
+    # 按动作名限流（borrow、return_book 等），速率见 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    throttle_classes = [UserTokenBucketThrottle, IPTokenBucketThrottle]
+    # 检索范围：书名、作者、ISBN、出版社、分类（倒排索引，按相关度排序）
+    filter_backends = [FullTextSearchFilter]
+    pagination_class = BookCursorPagination
+    # 匿名访问缓存：依赖的模型及单独缓存的库存
+    cache_models = (Book, Author, Publisher, Category)
+    cache_stock = True
     
     # 权限控制
     def get_permissions(self):
         # 1. 允许任何人浏览 (GET)
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'related']:
             return [AllowAny()]
         # 2. 只有管理员可以管理图书 (POST, PUT, DELETE)
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -45,144 +103,693 @@ class BookViewSet(viewsets.ModelViewSet):
         # 3. 其他操作（如借书、还书）需要登录用户
         return [IsAuthenticated()]
 
+    def get_serializer_class(self):
+        # 列表及相关图书使用精简表示，详情保留完整信息
+        if self.action in ('list', 'related'):
+            return BookListSerializer
+        return super().get_serializer_class()
+
+    def get_sparse_fields(self):
+        """解析 ?fields= / ?expand=，返回列表和详情需要输出的顶层字段，None 表示全部"""
+        if self.action not in ('list', 'retrieve', 'related'):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            params = self.request.query_params
+            self._sparse_fields = self.get_serializer_class().parse_sparse_fields(
+                params.get('fields'), params.get('expand')
+            )
+        return self._sparse_fields
+
+    def get_eager_loading_fields(self):
+        return self.get_sparse_fields()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        # 只查询输出字段对应的列，避免读取 summary 等大字段
+        columns = {'id'}
+        for name in fields:
+            try:
+                model_field = Book._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(name)
+        # user_status 依据库存计算，排序字段用于生成分页游标
+        if 'user_status' in fields:
+            columns.add('quantity')
+        columns.update(name.lstrip('-') for name in queryset.query.order_by if isinstance(name, str))
+        return queryset.only(*columns)
+
+    @property
+    def paginator(self):
+        # 图书列表的检索结果按相关度排序且数量有上限，不适用游标分页，改用页码分页；其他动作不处理检索参数
+        if (
+            not hasattr(self, '_paginator')
+            and self.action == 'list'
+            and self.request.query_params.get(FullTextSearchFilter.search_param)
+        ):
+            self._paginator = PageNumberPagination()
+        return super().paginator
+
+    def get_conditional_querysets(self):
+        # 登录用户的响应还包含个人借阅状态
+        if self.request.user.is_authenticated:
+            return [Borrow.objects.filter(reader=self.request.user)]
+        return []
+
+    def get_borrowed_book_ids(self, book_ids):
+        """
+        一次查询取出当前用户在给定书籍中正在借阅的书籍 ID 集合，
+        供 BookSerializer 批量计算 user_status，避免逐本查询
+        """
+        queryset = self.get_borrowed_book_ids_queryset(book_ids)
+        return set(queryset) if queryset is not None else set()
+
+    def get_borrowed_book_ids_queryset(self, book_ids):
+        """未登录或没有书籍时无需查询，返回 None"""
+        user = self.request.user
+        book_ids = set(book_ids)
+        if not user.is_authenticated or not book_ids:
+            return None
+        return Borrow.objects.filter(
+            reader=user,
+            book_id__in=book_ids,
+            return_date__isnull=True
+        ).values_list('book_id', flat=True)
+
+    def get_user_status_context(self, book_ids):
+        context = self.get_serializer_context()
+        context['borrowed_book_ids'] = self.get_borrowed_book_ids(book_ids)
+        return context
+
+    def get_current_borrows_queryset(self):
+        """当前用户未归还的借阅记录，按应还日期排序"""
+        borrows = Borrow.objects.filter(reader=self.request.user, return_date__isnull=True).order_by('due_date')
+        return optimize_queryset(borrows, BorrowSerializer)
+
+    def get_borrow_history_querysets(self):
+        """当前用户已归还的借阅记录：借阅表与归档表各一个查询集，均按归还日期倒序排列"""
+        history = Borrow.objects.filter(reader=self.request.user, return_date__isnull=False)
+        archived = ArchivedBorrow.objects.filter(reader=self.request.user)
+        return [
+            optimize_queryset(queryset.order_by('-return_date', '-id'), BorrowSerializer)
+            for queryset in (history, archived)
+        ]
+
+    @conditional_response
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        books = page if page is not None else list(queryset)
+        context = self.get_user_status_context(book.pk for book in books)
+        serializer = self.get_serializer(books, many=True, context=context)
+
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @conditional_response
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        book = self.get_object()
+        context = self.get_user_status_context([book.pk])
+        serializer = self.get_serializer(book, context=context)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def borrow(self, request, pk=None):
         """
         借书接口：POST /api/books/{id}/borrow/
+        资格检查、扣减库存和创建借阅记录在同一个事务中完成：
+        - 锁定当前读者行，串行化同一用户的并发借书请求
+        - 库存使用条件原子更新 (quantity > 0 时 quantity - 1)，并发时不会超借
         """
         book = self.get_object()
         user = request.user # 使用当前登录用户
-        
-        # 借阅限制配置
-        MAX_BORROW_LIMIT = 5
-
-        # 0. 检查是否有逾期未还书籍
-        overdue_books = Borrow.objects.filter(
-            reader=user, 
-            return_date__isnull=True, 
-            due_date__lt=timezone.now().date()
-        )
-        if overdue_books.exists():
-            return Response(
-                {'status': 'error', 'message': '您有逾期未还的书籍，请先归还后再借阅'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
 
-        # 1. 检查借阅数量限制
-        current_borrow_count = Borrow.objects.filter(reader=user, return_date__isnull=True).count()
-        if current_borrow_count >= MAX_BORROW_LIMIT:
-            return Response(
-                {'status': 'error', 'message': f'您已达到最大借阅数量限制 ({MAX_BORROW_LIMIT}本)，请先归还部分书籍'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        with transaction.atomic():
+            reader, _ = Reader.objects.select_for_update().get_or_create(user=user)
+            today = timezone.now().date()
+            # 借阅限制配置（按读者的借阅策略）
+            borrow_limit = reader.borrow_limit
 
-        # 2. 检查是否已借阅该书
-        if Borrow.objects.filter(reader=user, book=book, return_date__isnull=True).exists():
-            return Response(
-                {'status': 'error', 'message': '您已借阅该书，尚未归还'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            # 0. 检查是否有逾期未还书籍：只需比较读者行上冗余的最早应还日期
+            if reader.earliest_due_date is not None and reader.earliest_due_date < today:
+                return Response(
+                    {'status': 'error', 'message': '您有逾期未还的书籍，请先归还后再借阅'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 1. 检查借阅数量限制
+            if reader.active_loan_count >= borrow_limit:
+                return Response(
+                    {'status': 'error', 'message': f'您已达到最大借阅数量限制 ({borrow_limit}本)，请先归还部分书籍'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 2. 检查是否已借阅该书
+            if Borrow.objects.filter(reader=user, book=book, return_date__isnull=True).exists():
+                return Response(
+                    {'status': 'error', 'message': '您已借阅该书，尚未归还'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        if book.quantity > 0:
-            # 3. 扣减库存
-            book.quantity -= 1
-            book.save()
-            
-            # 4. 创建借阅记录
-            Borrow.objects.create(reader=user, book=book)
-            
-            return Response({
-                'status': 'success', 
-                'message': f'成功借阅《{book.title}》',
-                'quantity': book.quantity,
-                'user_status': 'BORROWED'
-            })
-        else:
-            return Response(
-                {'status': 'error', 'message': '库存不足，无法借阅'}, 
-                status=status.HTTP_400_BAD_REQUEST
+            # 3. 有为该读者保留的副本时直接借出这一本（保留过期但尚未被扫描的仍然有效）；
+            #    否则条件扣减库存：只更新 quantity 一列，库存为 0 时不更新任何行
+            reservation = Reservation.objects.filter(
+                reader=user, book=book, status__in=Reservation.ACTIVE_STATUS
+            ).values_list('pk', 'status').first()
+            if reservation is not None and reservation[1] == 'READY':
+                updated = Reservation.objects.filter(pk=reservation[0], status='READY').update(
+                    status='FULFILLED', updated_at=timezone.now()
+                )
+            else:
+                updated = Book.objects.filter(pk=book.pk, quantity__gt=0).update(
+                    quantity=F('quantity') - 1, updated_at=timezone.now()
+                )
+                if updated and reservation is not None:
+                    # 有库存时借到了书，排队中的预约随之完成
+                    Reservation.objects.filter(pk=reservation[0], status='WAITING').update(
+                        status='FULFILLED', updated_at=timezone.now()
+                    )
+            if not updated:
+                message = '库存不足，无法借阅，可以预约该书'
+                if reservation is not None:
+                    message = '库存不足，您已预约该书，有副本归还时将按预约顺序为您保留'
+                return Response(
+                    {'status': 'error', 'message': message}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 4. 更新读者借阅统计：数量上限在同一条条件更新中再次校验
+            due_date = timezone.localdate(default_due_date())
+            updated = Reader.objects.filter(pk=reader.pk, active_loan_count__lt=borrow_limit).update(
+                active_loan_count=F('active_loan_count') + 1,
+                earliest_due_date=Least(Coalesce('earliest_due_date', Value(due_date)), Value(due_date)),
             )
+            if not updated:
+                transaction.set_rollback(True)
+                return Response(
+                    {'status': 'error', 'message': f'您已达到最大借阅数量限制 ({borrow_limit}本)，请先归还部分书籍'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # 5. 创建借阅记录
+            Borrow.objects.create(reader=user, book=book, due_date=due_date)
+            book.refresh_from_db(fields=['quantity'])
+            transaction.on_commit(lambda: invalidate_stock(book.pk))
+
+        return Response({
+            'status': 'success', 
+            'message': f'成功借阅《{book.title}》',
+            'quantity': book.quantity,
+            'user_status': 'BORROWED'
+        })
 
     @action(detail=True, methods=['post'])
     def return_book(self, request, pk=None):
         """
         归还图书接口：POST /api/books/{id}/return_book/
+        归还记录和恢复库存在同一个事务中以条件原子更新完成，重复提交不会重复加库存
+        有人预约时，归还的副本直接分配给排在最前面的读者，不回到库存
         """
         book = self.get_object()
         user = request.user # 使用当前登录用户
 
-        # 查找未归还的借阅记录
-        borrow_record = Borrow.objects.filter(
-            reader=user, 
-            book=book, 
-            return_date__isnull=True
-        ).first()
+        with transaction.atomic():
+            # 查找未归还的借阅记录
+            borrow_id = Borrow.objects.filter(
+                reader=user, 
+                book=book, 
+                return_date__isnull=True
+            ).values_list('pk', flat=True).first()
 
-        if not borrow_record:
-            return Response(
-                {'status': 'error', 'message': '您没有正在借阅该书'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            # 执行归还逻辑：仅当记录仍未归还时才更新，并发的重复归还只有一个会成功
+            returned = 0
+            if borrow_id is not None:
+                returned = Borrow.objects.filter(pk=borrow_id, return_date__isnull=True).update(
+                    return_date=timezone.now().date(),
+                    status='RETURNED',
+                    updated_at=timezone.now()
+                )
+
+            if not returned:
+                return Response(
+                    {'status': 'error', 'message': '您没有正在借阅该书'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        # 执行归还逻辑
-        borrow_record.return_date = timezone.now().date()
-        borrow_record.status = 'RETURNED'
-        borrow_record.save()
+            # 更新读者借阅统计：最早应还日期从剩余在借记录中取（走 (读者, 归还日期, 应还日期) 索引）
+            # 先更新（锁定）读者行再锁定图书行，与借书、预约的加锁顺序一致，避免死锁
+            Reader.objects.filter(user=user).update(
+                active_loan_count=Greatest(F('active_loan_count') - 1, Value(0)),
+                earliest_due_date=Subquery(
+                    Borrow.objects.filter(reader=OuterRef('user'), return_date__isnull=True)
+                    .order_by('due_date')
+                    .values('due_date')[:1]
+                ),
+            )
 
-        # 恢复库存
-        book.quantity += 1
-        book.save()
+            # 分配给预约队首，没有人排队则恢复库存
+            release_copy(book.pk)
+            book.refresh_from_db(fields=['quantity'])
 
         return Response({
             'status': 'success', 
             'message': f'成功归还《{book.title}》',
             'quantity': book.quantity,
-            'user_status': 'AVAILABLE'
+            # 与 BookSerializer.get_user_status 一致：已归还，只看库存（副本分配给预约者时库存仍为 0）
+            'user_status': 'AVAILABLE' if book.quantity > 0 else 'NO_STOCK'
+        })
+
+    @action(detail=True, methods=['post'])
+    def reserve(self, request, pk=None):
+        """
+        预约接口：POST /api/books/{id}/reserve/
+        只能预约当前无库存的图书；有副本归还时按预约先后分配，分配后保留 LIBRARY_RESERVATION_HOLD_DAYS 天
+        """
+        book = self.get_object()
+        user = request.user
+
+        with transaction.atomic():
+            # 锁定读者行串行化同一用户的请求，锁定图书行与还书串行化
+            Reader.objects.select_for_update().get_or_create(user=user)
+            quantity = lock_book(book.pk)
+
+            if Borrow.objects.filter(reader=user, book=book, return_date__isnull=True).exists():
+                return Response(
+                    {'status': 'error', 'message': '您已借阅该书，尚未归还'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            existing = Reservation.objects.filter(
+                reader=user, book=book, status__in=Reservation.ACTIVE_STATUS
+            ).values_list('status', flat=True).first()
+            if existing is not None:
+                message = '该书已为您保留，请直接借阅' if existing == 'READY' else '您已预约该书'
+                return Response(
+                    {'status': 'error', 'message': message, 'reservation_status': existing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if quantity > 0:
+                return Response(
+                    {'status': 'error', 'message': '该书有库存，可以直接借阅'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            limit = settings.LIBRARY_MAX_RESERVATIONS
+            if Reservation.objects.filter(reader=user, status__in=Reservation.ACTIVE_STATUS).count() >= limit:
+                return Response(
+                    {'status': 'error', 'message': f'您已达到最大预约数量限制 ({limit}本)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            reservation = Reservation.objects.create(reader=user, book=book)
+
+        position = queue_positions([reservation])[reservation.pk]
+        return Response({
+            'status': 'success',
+            'message': f'成功预约《{book.title}》，当前排在第 {position} 位',
+            'reservation_id': reservation.pk,
+            'position': position,
         })
 
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        取消预约：POST /api/books/{id}/cancel/
+        已为读者保留的副本顺延给下一位，没有人排队则回到库存
+        """
+        book = self.get_object()
+        user = request.user
+
+        with transaction.atomic():
+            lock_book(book.pk)
+            reservation = Reservation.objects.filter(
+                reader=user, book=book, status__in=Reservation.ACTIVE_STATUS
+            ).values_list('pk', 'status').first()
+            if reservation is None:
+                return Response(
+                    {'status': 'error', 'message': '您没有预约该书'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            Reservation.objects.filter(pk=reservation[0], status=reservation[1]).update(
+                status='CANCELLED', updated_at=timezone.now()
+            )
+            if reservation[1] == 'READY':
+                release_copy(book.pk)
+
+        return Response({'status': 'success', 'message': f'已取消预约《{book.title}》'})
+
+    @action(detail=False, methods=['get'])
+    def my_reservations(self, request):
+        """
+        获取当前用户的有效预约（排队中、待取书），排队中的附带当前位置
+        GET /api/books/my_reservations/
+        """
+        reservations = list(optimize_queryset(
+            Reservation.objects.filter(reader=request.user, status__in=Reservation.ACTIVE_STATUS).order_by('id'),
+            ReservationSerializer,
+        ))
+        context = self.get_serializer_context()
+        context['queue_positions'] = queue_positions(reservations)
+        # 预约的书当前都未被本人借阅
+        context['borrowed_book_ids'] = set()
+        serializer = ReservationSerializer(reservations, many=True, context=context)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        """
+        借过这本书的读者也借过：GET /api/books/{id}/related/
+        读取 build_recommendations 预先计算的结果，按相似度排序，每项附带 score
+        """
+        try:
+            book_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        relations = list(
+            RelatedBook.objects.filter(book_id=book_id).order_by('rank').values_list('related_id', 'score')
+        )
+        if not relations:
+            if not Book.objects.filter(pk=book_id).exists():
+                raise NotFound()
+            return Response([])
+
+        scores = dict(relations)
+        books = self.get_queryset().filter(pk__in=scores).in_bulk()
+        books = [books[related_id] for related_id, _ in relations if related_id in books]
+        context = self.get_user_status_context(book.pk for book in books)
+        data = self.get_serializer(books, many=True, context=context).data
+        for item, book in zip(data, books):
+            item['score'] = round(scores[book.pk], 4)
+        return Response(data)
+
     @action(detail=False, methods=['get'])
+    @conditional_response
     def my_borrowed_books(self, request):
         """
         获取当前用户正在借阅的书籍
         GET /api/books/my_borrowed_books/
         """
-        user = request.user
         # 找到该用户未归还的借阅记录
-        borrows = Borrow.objects.filter(reader=user, return_date__isnull=True).order_by('due_date')
+        borrows = list(self.get_current_borrows_queryset())
+        # 这些记录本身就是未归还的借阅，书籍 ID 可直接得出，无需再查询
+        context = self.get_serializer_context()
+        context['borrowed_book_ids'] = {borrow.book_id for borrow in borrows}
         # 序列化借阅记录，而不是书籍
-        serializer = BorrowSerializer(borrows, many=True, context={'request': request})
+        serializer = BorrowSerializer(borrows, many=True, context=context)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=BorrowHistoryCursorPagination)
+    @conditional_response
     def borrow_history(self, request):
         """
         获取当前用户的借阅历史（已归还的书籍）
         GET /api/books/borrow_history/
+        使用 (归还日期, id) 游标分页，通过 next / previous 链接翻页
         """
-        user = request.user
-        # 找到该用户已归还的借阅记录，按归还日期倒序排列
-        history = Borrow.objects.filter(reader=user, return_date__isnull=False).order_by('-return_date')
-        
-        # 使用分页
+        # 找到该用户已归还的借阅记录（包括已归档的）
+        history = self.get_borrow_history_querysets()
+
+        # 使用游标分页，两张表各取一页后合并
         page = self.paginate_queryset(history)
+        records = page if page is not None else sorted(
+            chain.from_iterable(history), key=attrgetter('return_date', 'id'), reverse=True
+        )
+        # 已归还的书可能又被重新借出，需批量查一次当前借阅状态
+        context = self.get_user_status_context(borrow.book_id for borrow in records)
+        serializer = BorrowSerializer(records, many=True, context=context)
+
         if page is not None:
-            serializer = BorrowSerializer(page, many=True, context={'request': request})
             return self.get_paginated_response(serializer.data)
-
-        serializer = BorrowSerializer(history, many=True, context={'request': request})
         return Response(serializer.data)
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class RecommendationView(generics.GenericAPIView):
+    """
+    个性化推荐：GET /api/me/recommendations/?limit=20
+    汇总当前用户最近借阅的图书的预计算相关图书，按相似度之和排序，排除借过的书
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = BookListSerializer
+    # 参与推荐的最近借阅图书数量
+    recent_borrows = 20
+    default_limit = 20
+    max_limit = 50
+
+    def get_queryset(self):
+        fields = BookListSerializer.parse_sparse_fields(None, None)
+        return optimize_queryset(Book.objects.all(), BookListSerializer, fields)
+
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': '必须为整数'})
+
+        borrows = Borrow.objects.filter(reader=request.user)
+        archived = ArchivedBorrow.objects.filter(reader=request.user)
+        # 借阅表与归档表的记录 ID 互不重复，合并后按 ID 取最近的借阅（一条 UNION ALL 查询）
+        recent = [
+            book_id for _, book_id in
+            borrows.values_list('id', 'book_id').union(archived.values_list('id', 'book_id'), all=True)
+            .order_by('-id')[:self.recent_borrows]
+        ]
+        if not recent:
+            return Response([])
+        rows = list(
+            RelatedBook.objects.filter(book_id__in=set(recent))
+            .exclude(related_id__in=borrows.values('book_id'))
+            .exclude(related_id__in=archived.values('book_id'))
+            .values('related_id')
+            .annotate(total=Sum('score'))
+            .order_by('-total', 'related_id')
+            .values_list('related_id', 'total')[:max(limit, 1)]
+        )
+
+        books = self.get_queryset().in_bulk([related_id for related_id, _ in rows])
+        books = [(books[related_id], total) for related_id, total in rows if related_id in books]
+        # 推荐结果都是没有借过的书，user_status 只取决于库存
+        context = self.get_serializer_context()
+        context['borrowed_book_ids'] = set()
+        context['sparse_fields'] = BookListSerializer.parse_sparse_fields(None, None)
+        data = self.get_serializer([book for book, _ in books], many=True, context=context).data
+        for item, (_, total) in zip(data, books):
+            item['score'] = round(total, 4)
+        return Response(data)
+
+class AuthorViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Author.objects.all().order_by('name')
     serializer_class = AuthorSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_models = (Author,)
+
+    @conditional_response
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class PublisherViewSet(viewsets.ModelViewSet):
+    @conditional_response
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class PublisherViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Publisher.objects.all().order_by('name')
     serializer_class = PublisherSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_models = (Publisher,)
+
+    @conditional_response
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+    @conditional_response
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class CategoryViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_models = (Category,)
+
+    @conditional_response
+    @cache_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    @cache_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class ExportView(APIView):
+    """
+    管理员数据导出（流式响应，内存占用与数据量无关）
+    GET /api/export/books/    图书目录（作者、分类展开为名称列表）
+    GET /api/export/borrows/  借阅记录，可用 since / until（借阅日期，YYYY-MM-DD）和 status 筛选
+    参数 output=csv（默认）或 ndjson，gzip=1 时输出 gzip 压缩文件
+    """
+    permission_classes = [IsAdminUser]
+    datasets = ('books', 'borrows')
+
+    def perform_content_negotiation(self, request, force=False):
+        # 响应是文件下载，不受 Accept 头影响
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset):
+        if dataset not in self.datasets:
+            return Response({'detail': f'未知的数据集 {dataset}'}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        output_format = params.get('output', 'csv')
+        if output_format not in ENCODERS:
+            raise ValidationError({'output': f'可选格式：{", ".join(ENCODERS)}'})
+        use_gzip = params.get('gzip') in ('1', 'true')
+
+        filters = {}
+        if dataset == 'borrows':
+            for name in ('since', 'until'):
+                if params.get(name):
+                    try:
+                        filters[name] = parse_date(params[name])
+                    except ValueError:
+                        filters[name] = None
+                    if filters[name] is None:
+                        raise ValidationError({name: '日期格式应为 YYYY-MM-DD'})
+            if params.get('status'):
+                if params['status'] not in dict(Borrow.BORROW_STATUS):
+                    raise ValidationError({'status': f'可选状态：{", ".join(dict(Borrow.BORROW_STATUS))}'})
+                filters['status'] = params['status']
+
+        parts, content_type = export_stream(dataset, output_format, use_gzip, **filters)
+        filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{output_format}' + ('.gz' if use_gzip else '')
+        return streaming_response(request._request, parts, content_type, filename)
+
+class StatsViewSet(viewsets.ViewSet):
+    """
+    借阅统计（仅管理员），数据来自 rollup_circulation 生成的每日汇总表
+    所有接口接受 since / until 参数（YYYY-MM-DD），默认为最近 30 天
+    GET /api/stats/                     区间汇总：借出、归还、平均借阅天数、逾期归还率及当前逾期数
+    GET /api/stats/daily/               每日借出、归还
+    GET /api/stats/top-books/?limit=10  借出次数最多的图书
+    GET /api/stats/categories/          各分类借出、归还次数
+    """
+    permission_classes = [IsAdminUser]
+    default_days = 30
+    max_limit = 100
+
+    def get_date_range(self):
+        until = self._parse_date('until') or timezone.localdate()
+        since = self._parse_date('since') or until - datetime.timedelta(days=self.default_days - 1)
+        if since > until:
+            raise ValidationError({'since': 'since 不能晚于 until'})
+        return since, until
+
+    def _parse_date(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: '日期格式应为 YYYY-MM-DD'})
+        return day
+
+    def list(self, request):
+        since, until = self.get_date_range()
+        totals = DailyCirculation.objects.filter(date__range=(since, until)).aggregate(
+            loans=Sum('loans'), returns=Sum('returns'),
+            overdue_returns=Sum('overdue_returns'), loan_days=Sum('loan_days'),
+            last_rollup=Max('updated_at'),
+        )
+        loans, returns = totals['loans'] or 0, totals['returns'] or 0
+        overdue_returns, loan_days = totals['overdue_returns'] or 0, totals['loan_days'] or 0
+
+        # 当前在借 / 逾期数量只涉及未归还的记录，走 (status, due_date) 索引实时统计
+        active = Borrow.objects.filter(status__in=['ON_LOAN', 'OVERDUE'])
+        return Response({
+            'since': since,
+            'until': until,
+            'loans': loans,
+            'returns': returns,
+            'overdue_returns': overdue_returns,
+            'overdue_return_rate': rate(overdue_returns, returns),
+            'average_loan_days': rate(loan_days, returns, digits=1),
+            'active_loans': active.count(),
+            'current_overdue': active.filter(due_date__lt=timezone.localdate()).count(),
+            'last_rollup': totals['last_rollup'],
+        })
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        since, until = self.get_date_range()
+        rows = DailyCirculation.objects.filter(date__range=(since, until)).order_by('date')
+        return Response([
+            {
+                'date': row.date,
+                'loans': row.loans,
+                'returns': row.returns,
+                'overdue_returns': row.overdue_returns,
+                'average_loan_days': rate(row.loan_days, row.returns, digits=1),
+            }
+            for row in rows
+        ])
+
+    @action(detail=False, methods=['get'], url_path='top-books')
+    def top_books(self, request):
+        since, until = self.get_date_range()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': '必须为整数'})
+        rows = (
+            DailyBookCirculation.objects.filter(date__range=(since, until))
+            .values('book_id', 'book__title')
+            .annotate(loans=Sum('loans'))
+            .order_by('-loans', 'book_id')[:max(limit, 1)]
+        )
+        return Response([
+            {'book_id': row['book_id'], 'title': row['book__title'], 'loans': row['loans']} for row in rows
+        ])
+
+    @action(detail=False, methods=['get'])
+    def categories(self, request):
+        since, until = self.get_date_range()
+        rows = (
+            DailyCategoryCirculation.objects.filter(date__range=(since, until))
+            .values('category_id', 'category__name')
+            .annotate(loans=Sum('loans'), returns=Sum('returns'))
+            .order_by('-loans', 'category_id')
+        )
+        return Response([
+            {
+                'category_id': row['category_id'],
+                'name': row['category__name'],
+                'loans': row['loans'],
+                'returns': row['returns'],
+            }
+            for row in rows
+        ])
+
+class MetricsView(APIView):
+    """
+    本进程的请求指标（Prometheus 文本格式）：GET /api/metrics/
+    管理员登录后可访问，采集程序使用 Authorization: Metrics <LIBRARY_METRICS_TOKEN>
+    """
+    permission_classes = [IsAdminUser | HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -11,6 +11,12 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from .asgi_static import StaticFilesApplication
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_system.settings')
+# 在 ASGI 服务器（如 uvicorn）下，只读接口使用基于异步 ORM 的原生异步视图
+os.environ.setdefault('LIBRARY_ASYNC_READS', '1')
+# 静态文件在中间件链之外处理（见 asgi_static.py），中间件链中不含同步的 WhiteNoiseMiddleware
+os.environ['LIBRARY_ASGI'] = '1'
 
-application = get_asgi_application()
+application = StaticFilesApplication(get_asgi_application())
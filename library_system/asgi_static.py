@@ -0,0 +1,70 @@
+"""
+ASGI 入口的静态文件服务
+
+WhiteNoiseMiddleware 只有同步实现，放在中间件链中时 Django 会让整条链（包括异步视图）经过同步适配，
+每个请求都要切换线程。ASGI 部署时把它移出中间件链（见 settings.LIBRARY_ASGI），由这里在进入 Django 之前
+按路径处理静态文件：查找、缓存头、预压缩文件及条件请求仍由 WhiteNoise 完成（配置同 WHITENOISE_* 设置），
+只有读取文件内容在线程池中进行；其余请求直接交给 Django 的 ASGI 应用
+"""
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StaticFilesApplication:
+    def __init__(self, application):
+        self.application = application
+        # 只借用 WhiteNoise 的文件索引和响应头，不作为中间件调用
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            static_file = await self.find_file(self.get_path_info(scope))
+            if static_file is not None:
+                await self.serve(static_file, scope, send)
+                return
+        await self.application(scope, receive, send)
+
+    @staticmethod
+    def get_path_info(scope):
+        # 与 Django 的 ASGIRequest 相同：去掉挂载路径 root_path
+        path, root_path = scope['path'], scope.get('root_path', '')
+        if root_path and path.startswith(root_path):
+            return path[len(root_path):]
+        return path
+
+    async def find_file(self, path_info):
+        if not path_info.startswith(self.whitenoise.static_prefix):
+            return None
+        if self.whitenoise.autorefresh:
+            # 开发模式每次都检查文件系统
+            return await sync_to_async(self.whitenoise.find_file, thread_sensitive=False)(path_info)
+        return self.whitenoise.files.get(path_info)
+
+    async def serve(self, static_file, scope, send):
+        request_headers = {
+            'HTTP_' + name.decode('latin1').upper().replace('-', '_'): value.decode('latin1')
+            for name, value in scope['headers']
+        }
+        response = await sync_to_async(static_file.get_response, thread_sensitive=False)(
+            scope['method'], request_headers
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(key.lower().encode('latin1'), value.encode('latin1')) for key, value in response.headers],
+        })
+        if response.file is None:
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        read = sync_to_async(response.file.read, thread_sensitive=False)
+        try:
+            while True:
+                chunk = await read(CHUNK_SIZE)
+                more = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more})
+                if not more:
+                    break
+        finally:
+            response.file.close()
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 请求指标及慢请求日志（library/metrics.py），放在最前面以计入其余中间件的耗时
+    'library.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -93,8 +95,17 @@ DATABASES = {
     }
 }
 
+# 只读接口是否使用原生异步视图：由 ASGI 入口 (asgi.py) 开启，WSGI 部署保持同步视图
+LIBRARY_ASYNC_READS = os.environ.get('LIBRARY_ASYNC_READS') == '1'
+# 是否由 ASGI 入口启动（asgi.py 设置）：WhiteNoiseMiddleware 只有同步实现，会让整条中间件链经过同步适配，
+# 因此从中间件链中移除，静态文件改由 asgi.py 在进入 Django 之前处理
+LIBRARY_ASGI = os.environ.get('LIBRARY_ASGI') == '1'
+if LIBRARY_ASGI:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 # 如果环境变量中有 DATABASE_URL，则使用它覆盖默认配置
-db_from_env = dj_database_url.config(conn_max_age=500)
+# ASGI 下每个请求的数据库访问在不同线程中进行，持久连接无法复用，按 Django 文档的建议关闭
+db_from_env = dj_database_url.config(conn_max_age=0 if LIBRARY_ASYNC_READS else 500)
 DATABASES['default'].update(db_from_env)
 
 
@@ -153,9 +164,73 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 REST_FRAMEWORK = {
+    # 读请求使用进程内缓存的用户，登录凭证的吊销记录保存在数据库中，见 library/authentication.py
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'library.authentication.LibraryJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # 令牌桶限流（library/throttling.py）：'<范围>' 按用户，'<范围>_ip' 按客户端 IP，删除某项即不限流
+    'DEFAULT_THROTTLE_RATES': {
+        'borrow': '10/min',
+        'borrow_ip': '60/min',
+        'return_book': '10/min',
+        'return_book_ip': '60/min',
+        'reserve': '10/min',
+        'reserve_ip': '60/min',
+        'cancel': '10/min',
+        'cancel_ip': '60/min',
+        'register_ip': '5/hour',
+        'token': '10/min',
+        'token_ip': '30/min',
+    },
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'library.authentication.LibraryTokenObtainPairSerializer',
+}
+# 读接口需要完整用户及读者资料时的进程内缓存时间（秒）
+LIBRARY_AUTH_USER_CACHE_TTL = int(os.environ.get('LIBRARY_AUTH_USER_CACHE_TTL', 60))
+
+# 缓存：默认使用进程内存，生产环境多进程部署时可换成 Redis / Memcached 等共享后端
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# 匿名目录响应缓存使用的缓存别名及过期时间（秒）
+LIBRARY_CACHE_ALIAS = 'default'
+LIBRARY_CACHE_TIMEOUT = 300
+
+# 封面衍生图：各尺寸的 (宽, 高)，每个尺寸生成 JPEG 和 WebP 两种格式
+# 衍生图保存在 media/book_covers/derived/，文件名含内容哈希，Web 服务器可对该目录设置 Cache-Control: immutable
+LIBRARY_COVER_SIZES = {
+    'thumb': (120, 180),
+    'card': (240, 360),
+    'detail': (480, 720),
 }
+# 上传封面后生成衍生图的后台线程数；为 0 时在保存图书的请求中同步生成
+LIBRARY_COVER_WORKERS = int(os.environ.get('LIBRARY_COVER_WORKERS', 2))
+
+# 相关图书推荐：每本书预先计算的相关图书数量，以及共现矩阵状态文件（增量更新时读取，丢失后会自动全量重建）
+LIBRARY_RECOMMENDATIONS_TOP_K = int(os.environ.get('LIBRARY_RECOMMENDATIONS_TOP_K', 20))
+LIBRARY_RECOMMENDER_STATE = os.environ.get('LIBRARY_RECOMMENDER_STATE', str(BASE_DIR / 'var' / 'recommender.npz'))
+
+# 请求指标（GET /api/metrics/）：除管理员外，采集程序可使用请求头 Authorization: Metrics <令牌>，留空则只允许管理员
+LIBRARY_METRICS_TOKEN = os.environ.get('LIBRARY_METRICS_TOKEN', '')
+# 总耗时超过该毫秒数的请求按比例抽样写入 library.slow_requests 日志
+LIBRARY_SLOW_REQUEST_MS = int(os.environ.get('LIBRARY_SLOW_REQUEST_MS', 500))
+LIBRARY_SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get('LIBRARY_SLOW_REQUEST_SAMPLE_RATE', 1.0))
+
+# 基准测试（manage.py run_benchmark）默认比较和保存的基线文件
+LIBRARY_BENCHMARK_BASELINE = os.environ.get('LIBRARY_BENCHMARK_BASELINE', str(BASE_DIR / 'var' / 'benchmark-baseline.json'))
+
+# 图书馆借阅策略
+# 读者默认最多同时借阅的数量，可在读者资料中单独设置
+LIBRARY_MAX_BORROW_LIMIT = int(os.environ.get('LIBRARY_MAX_BORROW_LIMIT', 5))
+# 每位读者最多同时有效的预约数量；归还的副本为预约读者保留的天数
+LIBRARY_MAX_RESERVATIONS = int(os.environ.get('LIBRARY_MAX_RESERVATIONS', 5))
+LIBRARY_RESERVATION_HOLD_DAYS = int(os.environ.get('LIBRARY_RESERVATION_HOLD_DAYS', 3))
+# 归还超过这么多天的借阅记录由 archive_borrows 移到归档表
+LIBRARY_BORROW_ARCHIVE_DAYS = int(os.environ.get('LIBRARY_BORROW_ARCHIVE_DAYS', 365))